@@ -0,0 +1,118 @@
+import json
+import os
+import pickle
+
+import numpy as np
+
+MANIFEST_NAME = "manifest.json"
+FORMAT_VERSION = 1
+
+# Types de stockage: features en float32 dès l'écriture, labels en int64
+DEFAULT_DTYPES = {
+    "X": np.float32,
+    "y": np.int64,
+}
+
+
+def _default_dtype(name):
+    return DEFAULT_DTYPES.get(name.split("_")[0])
+
+
+def read_manifest(data_path):
+    """Manifeste JSON du répertoire (None pour un répertoire d'anciens pickles)"""
+    manifest_path = os.path.join(data_path, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def write_manifest(data_path, entries, metadata=None):
+    """
+    Écrit manifest.json de façon atomique (fichier temporaire puis rename)
+    entries: {nom: {"file", "dtype", "shape"}}
+    """
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "arrays": entries,
+        "metadata": metadata or {},
+    }
+    manifest_path = os.path.join(data_path, MANIFEST_NAME)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+
+def manifest_entry(file_name, array):
+    return {"file": file_name, "dtype": str(array.dtype), "shape": list(array.shape)}
+
+
+def register_arrays(data_path, entries, metadata=None):
+    """Fusionne des entrées (et métadonnées) dans le manifeste existant"""
+    existing = read_manifest(data_path) or {}
+    merged_entries = {**existing.get("arrays", {}), **entries}
+    merged_metadata = {**existing.get("metadata", {}), **(metadata or {})}
+    return write_manifest(data_path, merged_entries, merged_metadata)
+
+
+def save_arrays(data_path, arrays, metadata=None):
+    """
+    Sauvegarde chaque tableau en <nom>.npy (X_* en float32, y_* en int64) et
+    fusionne les entrées dans le manifeste existant
+    """
+    os.makedirs(data_path, exist_ok=True)
+    entries = {}
+    for name, array in arrays.items():
+        dtype = _default_dtype(name)
+        array = np.ascontiguousarray(array, dtype=dtype)
+        file_name = f"{name}.npy"
+        np.save(os.path.join(data_path, file_name), array)
+        entries[name] = manifest_entry(file_name, array)
+    return register_arrays(data_path, entries, metadata)
+
+
+def create_array(data_path, name, shape, dtype=None):
+    """
+    Crée <nom>.npy en mémoire mappée, en écriture, pour un remplissage par morceaux
+    Retourne (tableau, entrée de manifeste) - à enregistrer avec register_arrays
+    une fois le tableau rempli
+    """
+    os.makedirs(data_path, exist_ok=True)
+    file_name = f"{name}.npy"
+    array = np.lib.format.open_memmap(os.path.join(data_path, file_name), mode="w+",
+                                      dtype=dtype or _default_dtype(name) or np.float32,
+                                      shape=tuple(shape))
+    return array, manifest_entry(file_name, array)
+
+
+def load_array(data_path, name, mmap_mode="r"):
+    """
+    Ouvre un tableau du manifeste en mémoire mappée (O(1), pages chargées à la demande)
+    Sans manifeste, relit l'ancien pickle <nom>.pkl
+    """
+    manifest = read_manifest(data_path)
+    if manifest is None:
+        with open(os.path.join(data_path, f"{name}.pkl"), "rb") as f:
+            return pickle.load(f)
+
+    entry = manifest["arrays"].get(name)
+    if entry is None:
+        raise KeyError(f"{name} absent de {os.path.join(data_path, MANIFEST_NAME)}")
+    array = np.load(os.path.join(data_path, entry["file"]), mmap_mode=mmap_mode)
+    if list(array.shape) != entry["shape"] or str(array.dtype) != entry["dtype"]:
+        raise ValueError(f"{entry['file']} ne correspond pas au manifeste: "
+                         f"{array.dtype}{list(array.shape)} au lieu de "
+                         f"{entry['dtype']}{entry['shape']}")
+    return array
+
+
+def load_arrays(data_path, names, mmap_mode="r"):
+    return {name: load_array(data_path, name, mmap_mode) for name in names}
+
+
+def load_splits(data_path="data", mmap_mode="r"):
+    """(X_train, X_test, y_train, y_test) depuis le répertoire de données"""
+    arrays = load_arrays(data_path, ["X_train", "X_test", "y_train", "y_test"], mmap_mode)
+    return arrays["X_train"], arrays["X_test"], arrays["y_train"], arrays["y_test"]
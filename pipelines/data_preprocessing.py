@@ -1,3 +1,5 @@
+# En premier: horodate le début des imports (span "imports")
+import instrumentation
 import os
 import pickle
 import numpy as np
@@ -6,12 +8,27 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 import argparse
 
-def preprocess_data(output_path="data"):
+from artifact_store import save_arrays
+from instrumentation import span
+
+def preprocess_data(output_path="data", source=None, target_column=None, chunk_size=None):
+    # Source volumineuse (CSV / Parquet / NPY): prétraitement en flux, mémoire bornée
+    source = source or os.getenv("PREPROCESS_SOURCE")
+    if source:
+        from streaming_preprocessing import DEFAULT_CHUNK_SIZE, preprocess_stream
+        chunk_size = chunk_size or int(os.getenv("PREPROCESS_CHUNK_SIZE", DEFAULT_CHUNK_SIZE))
+        if target_column is None:
+            target_column = os.getenv("PREPROCESS_TARGET_COLUMN", "target")
+        with span("stream"):
+            preprocess_stream(source, output_path, target_column, chunk_size)
+        return
+    
     print("🔄 Chargement des données Iris...")
     
-    # Charger les données Iris
-    iris = load_iris()
-    X, y = iris.data, iris.target
+    with span("load"):
+        # Charger les données Iris
+        iris = load_iris()
+        X, y = iris.data, iris.target
     
     print(f"📊 Dataset: {X.shape[0]} échantillons, {X.shape[1]} features")
     print(f"📊 Classes: {iris.target_names}")
@@ -21,39 +38,37 @@ def preprocess_data(output_path="data"):
     target_names = list(iris.target_names) if hasattr(iris.target_names, '__iter__') else iris.target_names
     
     print("🔄 Division train/test (80/20)...")
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, 
-        test_size=0.2, 
-        random_state=42,
-        stratify=y
-    )
+    with span("split"):
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, 
+            test_size=0.2, 
+            random_state=42,
+            stratify=y
+        )
     
     print("🔄 Normalisation des features...")
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
+    with span("scale"):
+        scaler = StandardScaler()
+        X_train_scaled = scaler.fit_transform(X_train)
+        X_test_scaled = scaler.transform(X_test)
     
     # Créer le dossier de sortie
     os.makedirs(output_path, exist_ok=True)
     
     print(f"💾 Sauvegarde des données dans {output_path}...")
     
-    # Sauvegarder les données d'entraînement
-    with open(os.path.join(output_path, 'X_train.pkl'), 'wb') as f:
-        pickle.dump(X_train_scaled, f)
-    
-    with open(os.path.join(output_path, 'X_test.pkl'), 'wb') as f:
-        pickle.dump(X_test_scaled, f)
+    with span("save"):
+        # Sauvegarder les données (.npy float32/int64 + manifest.json, ouverts en mmap par la suite)
+        save_arrays(output_path, {
+            "X_train": X_train_scaled,
+            "X_test": X_test_scaled,
+            "y_train": y_train,
+            "y_test": y_test,
+        }, metadata={"feature_names": feature_names, "target_names": target_names})
     
-    with open(os.path.join(output_path, 'y_train.pkl'), 'wb') as f:
-        pickle.dump(y_train, f)
-    
-    with open(os.path.join(output_path, 'y_test.pkl'), 'wb') as f:
-        pickle.dump(y_test, f)
-    
-    # Sauvegarder le scaler
-    with open(os.path.join(output_path, 'scaler.pkl'), 'wb') as f:
-        pickle.dump(scaler, f)
+        # Sauvegarder le scaler
+        with open(os.path.join(output_path, 'scaler.pkl'), 'wb') as f:
+            pickle.dump(scaler, f)
     
     # Préparer les métadonnées - CORRECTION ICI
     metadata = {
@@ -84,6 +99,30 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Préprocessing des données Iris")
     parser.add_argument("--output_path", type=str, default="data",
                        help="Chemin de sortie pour les données preprocessées")
+    parser.add_argument("--source", type=str, default=None,
+                       help="Source CSV/Parquet/NPY à prétraiter en flux (Iris par défaut)")
+    parser.add_argument("--target_column", type=str, default=None,
+                       help="Colonne cible de la source (indice de colonne pour un .npy); "
+                            "défaut: PREPROCESS_TARGET_COLUMN ou target")
+    parser.add_argument("--chunk_size", type=int, default=None,
+                       help="Lignes par chunk en mode flux")
     
     args = parser.parse_args()
-    preprocess_data(args.output_path)
\ No newline at end of file
+    
+    # Cache de l'étape: même source, même code et mêmes paramètres -> sorties restaurées
+    from step_cache import env_params, library_versions, module_paths, run_cached
+    source = args.source or os.getenv("PREPROCESS_SOURCE")
+    instrumentation.start("preprocess", started=instrumentation.IMPORTED_AT)
+    with span("compute"):
+        run_cached(
+            "preprocess",
+            lambda: preprocess_data(args.output_path, args.source, args.target_column, args.chunk_size),
+            outputs=[args.output_path],
+            inputs=[source] if source else [],
+            code=module_paths("data_preprocessing.py", "artifact_store.py",
+                              "streaming_preprocessing.py"),
+            params={"source": source, "target_column": args.target_column,
+                    "chunk_size": args.chunk_size, **env_params("PREPROCESS_"),
+                    **library_versions("numpy", "scikit-learn")},
+        )
+    instrumentation.finish()
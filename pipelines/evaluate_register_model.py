@@ -1,50 +1,61 @@
+# En premier: horodate le début des imports (span "imports")
+import instrumentation
 import os
+import time
 import json
 import pickle
 import numpy as np
 from pathlib import Path
-from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 
-def try_install_onnx():
-    """Tentative d'installation ONNX sans forcer"""
-    
-    print("🔧 Tentative d'installation ONNX optionnelle...")
-    
-    import subprocess
-    import sys
-    
-    try:
-        # Essayer les versions les plus récentes disponibles
-        subprocess.check_call([
-            sys.executable, "-m", "pip", "install", 
-            "onnx", "onnxruntime", "skl2onnx", 
-            "--upgrade", "--quiet"
-        ])
-        print("✅ ONNX installé avec versions disponibles")
-        return True
-    except Exception as e:
-        print(f"⚠️ Installation ONNX échouée: {e}")
-        print("💡 Continuer avec modèle sklearn uniquement")
-        return False
+from instrumentation import span
 
-def install_model_registry():
-    """Installation Model Registry uniquement"""
+# Opset du modèle déployé sur Triton (exporté par train_model.py, cf. models/artifacts.json)
+ONNX_OPSET = 9
+
+# Modules optionnels, importés uniquement dans les branches qui les utilisent
+OPTIONAL_MODULES = {
+    "onnxruntime": "vérification, optimisation et autotuning du modèle ONNX",
+    "onnx": "optimisation hors ligne du graphe",
+    "skl2onnx": "conversion de secours si models/artifacts.json est absent",
+    "model_registry": "enregistrement dans le Model Registry",
+    "aiohttp_retry": "client HTTP du Model Registry",
+    "boto3": "envoi du dépôt de modèles vers S3/MinIO",
+}
+REGISTRY_MODULES = ("model_registry", "aiohttp_retry")
+
+def preflight(registry_required=None):
+    """
+    Capacités disponibles, vérifiées avec importlib.util.find_spec: aucun module n'est
+    importé ni installé (image du runtime ou PIP_EXTRA_PACKAGES, cf. requirements.txt)
+    MODEL_REGISTRY_REQUIRED=true: RuntimeError si l'enregistrement est impossible
+    """
+    import importlib.util
     
-    print("🔧 Installation Model Registry...")
+    if registry_required is None:
+        registry_required = os.getenv("MODEL_REGISTRY_REQUIRED", "false").lower() == "true"
     
-    import subprocess
-    import sys
+    capabilities = {name: importlib.util.find_spec(name) is not None for name in OPTIONAL_MODULES}
+    print("🔎 Preflight des dépendances optionnelles:")
+    for name, purpose in OPTIONAL_MODULES.items():
+        print(f"  {'✅' if capabilities[name] else '⚠️'} {name}: {purpose}")
+    missing = [name for name, available in capabilities.items() if not available]
+    if missing:
+        print(f"💡 Absents de l'image: {', '.join(missing)} (pipelines/requirements.txt)")
     
-    try:
-        subprocess.check_call([
-            sys.executable, "-m", "pip", "install", 
-            "aiohttp-retry", "model-registry==0.2.7a1", "--quiet"
-        ])
-        print("✅ Model Registry installé")
-        return True
-    except Exception as e:
-        print(f"⚠️ Erreur Model Registry: {e}")
-        return False
+    capabilities["registry"] = all(capabilities[name] for name in REGISTRY_MODULES)
+    if registry_required and not capabilities["registry"]:
+        raise RuntimeError("Enregistrement Model Registry requis (MODEL_REGISTRY_REQUIRED=true) mais "
+                           f"modules absents: {', '.join(n for n in REGISTRY_MODULES if n in missing)}")
+    return capabilities
+
+def save_evaluation_metrics(evaluation_metrics):
+    """evaluation_metrics.pkl (format attendu par Elyra) et .json (lisible)"""
+    eval_dir = Path("evaluation")
+    eval_dir.mkdir(exist_ok=True)
+    with open(eval_dir / "evaluation_metrics.pkl", "wb") as f:
+        pickle.dump(evaluation_metrics, f)
+    with open(eval_dir / "evaluation_metrics.json", "w") as f:
+        json.dump(evaluation_metrics, f, indent=2)
 
 def evaluate_model():
     """Évalue le modèle sur les données de test"""
@@ -52,61 +63,51 @@ def evaluate_model():
     print("🔍 Chargement du modèle et des données...")
     
     try:
-        # Charger le modèle
-        with open('models/iris_model.pkl', 'rb') as f:
-            model = pickle.load(f)
-        
-        # Charger les données de test
-        with open('data/X_test.pkl', 'rb') as f:
-            X_test = pickle.load(f)
-        with open('data/y_test.pkl', 'rb') as f:
-            y_test = pickle.load(f)
-        
-        # Charger les métadonnées du modèle
-        with open('models/model_metadata.json', 'r') as f:
-            model_metadata = json.load(f)
+        with span("load"):
+            # Charger le modèle
+            with open('models/iris_model.pkl', 'rb') as f:
+                model = pickle.load(f)
+            
+            # Charger les données de test (mémoire mappée, pickles en repli)
+            from artifact_store import load_array
+            X_test = load_array('data', 'X_test')
+            y_test = load_array('data', 'y_test')
+            
+            # Features dans l'espace du scaler du modèle (différent après un entraînement incrémental)
+            from onnx_export import load_model_scaler, load_scaler, rescale
+            X_test = rescale(X_test, load_scaler('data'), load_model_scaler())
+            
+            # Charger les métadonnées du modèle
+            with open('models/model_metadata.json', 'r') as f:
+                model_metadata = json.load(f)
         
         print(f"📊 Données de test: {X_test.shape}")
         print(f"📊 Labels de test: {y_test.shape}")
         
-        # Faire les prédictions
-        print("🧪 Prédictions sur les données de test...")
-        y_pred = model.predict(X_test)
+        # Matrice de confusion accumulée par chunks, métriques par classe et intervalles
+        # de confiance bootstrap (tirages multinomiaux répartis sur un pool de process)
+        from evaluation_engine import evaluate_predictions
         
-        # Calculer les métriques
-        accuracy = accuracy_score(y_test, y_pred)
-        class_report = classification_report(y_test, y_pred, output_dict=True)
-        conf_matrix = confusion_matrix(y_test, y_pred)
-        
-        # Compter les erreurs
-        errors = np.sum(y_test != y_pred)
-        total_samples = len(y_test)
+        print("🧪 Prédictions sur les données de test (par chunks)...")
+        with span("score"):
+            evaluation_metrics = evaluate_predictions(model.predict, X_test, y_test)
+        evaluation_metrics["model_metadata"] = model_metadata
+        accuracy = evaluation_metrics["accuracy"]
         
         print(f"📈 Précision du modèle: {accuracy:.4f}")
-        print(f"📊 Erreurs de classification: {errors}/{total_samples} échantillons")
+        print(f"📊 Erreurs de classification: {evaluation_metrics['errors']}/"
+              f"{evaluation_metrics['total_samples']} échantillons")
+        intervals = evaluation_metrics["confidence_intervals"]
+        if intervals:
+            low, high = intervals["accuracy"]
+            print(f"📏 IC {intervals['level']:.0%} de l'accuracy: [{low:.4f}, {high:.4f}] "
+                  f"({intervals['n_bootstrap']} tirages bootstrap, {intervals['workers']} process)")
         
         # Créer le répertoire evaluation
         eval_dir = Path("evaluation")
         eval_dir.mkdir(exist_ok=True)
         
-        # Préparer les métriques complètes
-        evaluation_metrics = {
-            "accuracy": float(accuracy),
-            "error_rate": float(errors / total_samples),
-            "errors": int(errors),
-            "total_samples": int(total_samples),
-            "classification_report": class_report,
-            "confusion_matrix": conf_matrix.tolist(),
-            "model_metadata": model_metadata
-        }
-        
-        # Sauvegarder les métriques pour Elyra (format pkl attendu)
-        with open(eval_dir / "evaluation_metrics.pkl", "wb") as f:
-            pickle.dump(evaluation_metrics, f)
-        
-        # Sauvegarder aussi en JSON pour lisibilité
-        with open(eval_dir / "evaluation_metrics.json", "w") as f:
-            json.dump(evaluation_metrics, f, indent=2)
+        save_evaluation_metrics(evaluation_metrics)
         
         # Sauvegarder accuracy pour KFP
         with open(eval_dir / "accuracy.txt", "w") as f:
@@ -132,50 +133,70 @@ def evaluate_model():
             
         return 0.0, {}, None, None
 
-def try_convert_to_onnx(model, X_sample):
-    """Tentative de conversion ONNX si possible"""
+def convert_to_onnx_fallback(model, X_sample, scaler):
+    """Conversion locale, seulement si train_model.py n'a pas fourni l'opset attendu"""
+    
+    import importlib.util
+    
+    if importlib.util.find_spec("skl2onnx") is None:
+        print("⚠️ skl2onnx non installé - pas de conversion ONNX dans cette étape")
+        return None
+    
+    from model_artifacts import onnx_artifact_name
+    from onnx_export import convert_to_onnx
+    
+    print(f"🔄 Conversion ONNX locale (opset {ONNX_OPSET})...")
+    onnx_model = convert_to_onnx(model, X_sample.shape[1], scaler=scaler,
+                                 target_opset=ONNX_OPSET)
+    models_dir = Path("models")
+    models_dir.mkdir(exist_ok=True)
+    onnx_path = models_dir / onnx_artifact_name(ONNX_OPSET, primary_opset=None)
+    with open(onnx_path, "wb") as f:
+        f.write(onnx_model.SerializeToString())
+    return str(onnx_path)
+
+def prepare_onnx_model(model, X_sample):
+    """
+    Modèle ONNX (scaler + forêt fusionnés) exporté par train_model.py pour l'opset servi,
+    vérifié par empreinte via models/artifacts.json puis par parité avec scikit-learn
+    """
     
-    print("🔄 Tentative de conversion ONNX...")
+    print(f"🔄 Récupération du modèle ONNX (opset {ONNX_OPSET})...")
     
     try:
-        from skl2onnx import convert_sklearn
-        from skl2onnx.common.data_types import FloatTensorType
-        import onnx
-        import onnxruntime as ort
-        
-        print(f"📦 ONNX disponible - tentative de conversion...")
-        
-        n_features = X_sample.shape[1]
-        initial_type = [('float_input', FloatTensorType([None, n_features]))]
-        
-        # Conversion simple pour ONNX 1.9 (compatible Triton 23.10)
-        onnx_model = convert_sklearn(
-            model, 
-            initial_types=initial_type,
-            options={'zipmap': False},
-            target_opset=9
-        )
-        
-        # Sauvegarder
-        models_dir = Path("models")
-        models_dir.mkdir(exist_ok=True)
-        onnx_path = models_dir / "iris_model.onnx"
-        
-        with open(onnx_path, "wb") as f:
-            f.write(onnx_model.SerializeToString())
-        
-        # Test rapide
-        session = ort.InferenceSession(str(onnx_path))
-        test_input = X_sample[:1].astype(np.float32)
-        result = session.run(None, {session.get_inputs()[0].name: test_input})
-        
-        print(f"✅ Modèle ONNX créé avec succès!")
+        from onnx_export import check_fused_parity, load_model_scaler
+        from model_artifacts import resolve_onnx_artifact
+        
+        # Scaler + forêt dans un seul graphe: Triton reçoit les features brutes
+        scaler = load_model_scaler()
+        
+        try:
+            onnx_path, entry = resolve_onnx_artifact("models", ONNX_OPSET, X_sample.shape[1])
+            print(f"✅ {entry['file']} réutilisé (sha256 {entry['sha256'][:12]} vérifié)")
+            print(f"  🔌 Entrées: {[t['name'] for t in entry['inputs']]} / "
+                  f"Sorties: {[t['name'] for t in entry['outputs']]}")
+        except Exception as e:
+            print(f"⚠️ Artefact ONNX non réutilisable: {e}")
+            onnx_path = convert_to_onnx_fallback(model, X_sample, scaler)
+            if onnx_path is None:
+                return None
+        
+        # Vérification de cohérence avec le modèle scikit-learn
+        from local_inference import LocalInferenceBackend
+        backend = LocalInferenceBackend(onnx_path)
+        consistent, mismatches, max_proba_diff = check_fused_parity(backend, model, X_sample,
+                                                                    scaler)
+        if not consistent:
+            print(f"⚠️ ONNX différent de scikit-learn: {mismatches} prédiction(s), "
+                  f"écart max des probabilités {max_proba_diff:.2e}")
+        
+        print(f"✅ Modèle ONNX prêt: {onnx_path}")
         print(f"📊 Taille: {os.path.getsize(onnx_path)} bytes")
         
         return str(onnx_path)
         
     except Exception as e:
-        print(f"❌ Conversion ONNX échouée: {e}")
+        print(f"❌ Modèle ONNX indisponible: {e}")
         return None
 
 def get_model_registry_config():
@@ -193,7 +214,7 @@ def get_model_registry_config():
         print(f"❌ Token ServiceAccount non trouvé")
         return None, None
 
-def create_triton_structure_local(onnx_path):
+def create_triton_structure_local(onnx_path, settings=None):
     """Crée la structure de répertoire Triton locale parfaite"""
     
     if not onnx_path or not os.path.exists(onnx_path):
@@ -212,41 +233,16 @@ def create_triton_structure_local(onnx_path):
         import shutil
         shutil.copy2(onnx_path, triton_model_path)
         
-        # Créer le fichier de configuration Triton DANS le répertoire iris_model
+        # Générer config.pbtxt à partir des paramètres typés et du graphe ONNX réel
+        from triton_config import TritonModelSettings, write_triton_config
+        
+        if settings is None:
+            settings = TritonModelSettings.from_env()
+        settings = settings.with_io_from_onnx(triton_model_path)
+        
         config_path = Path("models/iris_model/config.pbtxt")
-        config_content = f"""name: "iris_model"
-platform: "onnxruntime_onnx"
-max_batch_size: 0
-default_model_filename: "iris_model.onnx"
-input [
-  {{
-    name: "float_input"
-    data_type: TYPE_FP32
-    dims: [ -1, 4 ]
-  }}
-]
-output [
-  {{
-    name: "output"
-    data_type: TYPE_FP32
-    dims: [ 1 ]
-  }},
-  {{
-    name: "probabilities"
-    data_type: TYPE_FP32
-    dims: [ -1, 3 ]
-  }}
-]
-instance_group [
-  {{
-    count: 1
-    kind: KIND_CPU
-  }}
-]
-"""
         config_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(config_path, 'w') as f:
-            f.write(config_content)
+        config_summary = write_triton_config(settings, config_path)
         
         print(f"✅ Structure Triton parfaite créée:")
         print(f"  📁 {triton_model_path}")
@@ -256,6 +252,10 @@ instance_group [
         print(f"    ├── config.pbtxt")
         print(f"    └── 1/")
         print(f"        └── iris_model.onnx")
+        print(f"  ⚙️ Batching: max_batch_size={config_summary['max_batch_size']}, "
+              f"dynamic_batching={config_summary['dynamic_batching']}, "
+              f"instances={config_summary['instance_count']}")
+        print(f"  🔌 Entrées: {config_summary['inputs']} / Sorties: {config_summary['outputs']}")
         
         return True
         
@@ -263,8 +263,201 @@ instance_group [
         print(f"❌ Erreur création structure Triton locale: {e}")
         return False
 
-def register_model_in_registry(metrics, onnx_path):
-    """Enregistrement dans Model Registry"""
+def optimize_exported_model(onnx_path, X_raw):
+    """
+    Optimisation hors ligne du modèle exporté (ORT, attributs compactés, float16)
+    Retourne le chemin du modèle le plus rapide à accuracy égale (l'export brut en cas d'échec)
+    """
+    try:
+        from onnx_optimize import optimize_onnx_model
+        
+        print("🔧 Optimisation hors ligne du modèle ONNX...")
+        from artifact_store import load_array
+        y_test = load_array('data', 'y_test')
+        serving_path, report = optimize_onnx_model(onnx_path, X_raw, y_test)
+        
+        eval_dir = Path("evaluation")
+        eval_dir.mkdir(exist_ok=True)
+        with open(eval_dir / "onnx_optimization_report.json", "w") as f:
+            json.dump(report, f, indent=2)
+        
+        for name, result in report["candidates"].items():
+            latencies = ", ".join(f"b{bs}={ms:.3f}ms" for bs, ms in result["latency_ms"].items())
+            print(f"  {'🏆' if name == report['winner'] else '  '} {name}: "
+                  f"{result['size_bytes']} bytes, chargement {result['load_ms']:.1f}ms, "
+                  f"accuracy {result['accuracy']:.4f}, {latencies}")
+        print(f"✅ Modèle retenu pour Triton: {serving_path}")
+        return serving_path
+        
+    except Exception as e:
+        print(f"⚠️ Optimisation ONNX échouée, modèle exporté conservé: {e}")
+        return onnx_path
+
+def profile_serving_latency(metrics, serving_path, X_test, X_raw):
+    """
+    Profil de service du modèle ONNX retenu, du pickle (predict_proba de scikit-learn) et
+    de la forêt compilée (batch 1 à 4096): latences à froid et à chaud, lignes/s et pic de RSS,
+    ajouté à evaluation_metrics.json
+    LATENCY_PROFILE=true active la mesure (~6 s); LATENCY_BUDGET_MS active le contrôle de budget
+    """
+    if os.getenv("LATENCY_PROFILE", "false").lower() != "true":
+        print("⏭️ Profil de latence désactivé (LATENCY_PROFILE=true pour l'activer)")
+        return None
+    
+    try:
+        from latency_profile import profile_serving
+        
+        print("⏱️ Profil de latence de service...")
+        artifacts = {}
+        if serving_path:
+            artifacts["onnx"] = (serving_path, X_raw)
+        artifacts["pickle"] = ("models/iris_model.pkl", X_test, {"forest_backend": "sklearn"})
+        artifacts["compiled_forest"] = ("models/iris_model.pkl", X_test,
+                                        {"forest_backend": "compiled"})
+        report = profile_serving(artifacts)
+        
+        for name, profile in report["artifacts"].items():
+            print(f"  {'🏆' if name == report['served'] else '  '} {name}: "
+                  f"pic RSS {profile['peak_rss_mb']:.0f}MB, "
+                  f"chargement p50 {profile['load_ms']['p50']:.1f}ms")
+            for batch_size, batch in profile["batches"].items():
+                print(f"      batch {batch_size}: p50 {batch['warm_ms']['p50']:.3f}ms, "
+                      f"p99 {batch['warm_ms']['p99']:.3f}ms, froid p50 "
+                      f"{batch['cold_ms']['p50']:.1f}ms, {batch['rows_per_s']:.0f} lignes/s")
+        gate = report["latency_gate"]
+        if gate:
+            print(f"{'✅' if gate['passed'] else '❌'} Budget de latence: {gate['percentile']} "
+                  f"batch {gate['batch_size']} = {gate['observed_ms']:.3f}ms "
+                  f"(budget {gate['budget_ms']}ms)")
+        
+        metrics["serving_profile"] = report
+        save_evaluation_metrics(metrics)
+        return report
+        
+    except Exception as e:
+        print(f"⚠️ Profil de latence échoué: {e}")
+        return None
+
+def summarize_autotune(report):
+    """Résumé de autotune_report.json enregistré dans les métadonnées du registry"""
+    best = report["best"]
+    return {
+        "instance_count": best["instance_count"],
+        "intra_op_threads": best["intra_op_threads"],
+        "max_batch_size": best["max_batch_size"],
+        "max_queue_delay_us": best["max_queue_delay_us"],
+        "throughput_rps": round(best["throughput_rps"], 1),
+        "latency_p99_ms": round(best["latency_p99_ms"], 3),
+        "pareto_points": len(report["pareto_frontier"]),
+        "budget_met": report["budget_met"],
+    }
+
+def autotune_triton_config(onnx_path, X_sample):
+    """
+    Choisit instances, threads ORT et paramètres du batcher dynamique par un
+    balayage local (simulation du scheduler Triton avec ONNX Runtime)
+    Retourne (TritonModelSettings, résumé) ou (None, None) si désactivé/en échec
+    """
+    if os.getenv("TRITON_AUTOTUNE", "false").lower() != "true":
+        print("⏭️ Autotuning Triton désactivé (TRITON_AUTOTUNE=true pour l'activer)")
+        return None, None
+    
+    try:
+        from triton_autotune import autotune
+        
+        print("🔧 Autotuning de la configuration Triton...")
+        settings, report = autotune(onnx_path, X_sample)
+        
+        eval_dir = Path("evaluation")
+        eval_dir.mkdir(exist_ok=True)
+        with open(eval_dir / "autotune_report.json", "w") as f:
+            json.dump(report, f, indent=2)
+        
+        best = report["best"]
+        summary = summarize_autotune(report)
+        print(f"✅ Configuration retenue: {best['instance_count']} instance(s), "
+              f"{best['intra_op_threads']} thread(s) intra-op, max_batch_size={best['max_batch_size']}, "
+              f"délai={best['max_queue_delay_us']}µs")
+        print(f"  📈 {summary['throughput_rps']} req/s, p99 {summary['latency_p99_ms']}ms "
+              f"({summary['pareto_points']} point(s) sur la frontière de Pareto)")
+        print(f"  📄 evaluation/autotune_report.json")
+        return settings, summary
+        
+    except Exception as e:
+        print(f"⚠️ Autotuning échoué, paramètres par défaut conservés: {e}")
+        return None, None
+
+def latency_gate_passed(metrics):
+    """Budget de latence respecté (vrai si aucun budget n'est défini)"""
+    gate = (metrics.get("serving_profile") or {}).get("latency_gate")
+    return gate is None or gate["passed"]
+
+def serving_profile_metadata(metrics):
+    """Résumé du profil de service pour les métadonnées du registry (valeurs simples)"""
+    report = metrics.get("serving_profile")
+    if not report:
+        return {}
+    from latency_profile import summarize_serving_profile
+    
+    metadata = {"serving_profile": json.dumps(summarize_serving_profile(report))}
+    if report["latency_gate"]:
+        metadata["latency_budget_ms"] = report["latency_gate"]["budget_ms"]
+        metadata["latency_budget_met"] = report["latency_gate"]["passed"]
+    return metadata
+
+def upload_model_repository(onnx_path, pipeline_id):
+    """
+    Envoie le dépôt Triton (ou le pickle sans ONNX) vers S3/MinIO sous
+    s3://<bucket>/<pipeline_id>/models/ et retourne le rapport avec l'URI réellement écrite
+    Bucket: MODEL_S3_BUCKET, sinon AWS_S3_BUCKET; S3_UPLOAD=false désactive l'envoi
+    """
+    if os.getenv("S3_UPLOAD", "true").lower() != "true":
+        print("⏭️ Envoi S3 désactivé (S3_UPLOAD=false)")
+        return None
+    
+    try:
+        from s3_upload import s3_uri, upload_paths
+        
+        bucket = os.getenv("MODEL_S3_BUCKET") or os.getenv("AWS_S3_BUCKET", "mlpipeline")
+        prefix = f"{pipeline_id}/models"
+        if onnx_path:
+            paths, model_key = ["models/iris_model"], f"{prefix}/iris_model/1/iris_model.onnx"
+        else:
+            paths, model_key = ["models/iris_model.pkl"], f"{prefix}/iris_model.pkl"
+        
+        print(f"☁️ Envoi vers s3://{bucket}/{prefix}/ ...")
+        report = upload_paths(paths, bucket, prefix)
+        if model_key not in {item["key"] for item in report["objects"]}:
+            raise FileNotFoundError(f"{model_key} absent des objets envoyés")
+        report["model_uri"] = s3_uri(bucket, model_key)
+        
+        eval_dir = Path("evaluation")
+        eval_dir.mkdir(exist_ok=True)
+        with open(eval_dir / "s3_upload_report.json", "w") as f:
+            json.dump(report, f, indent=2)
+        
+        for item in report["objects"]:
+            print(f"  {'⬆️' if item['status'] == 'uploaded' else '⏭️'} {item['key']} "
+                  f"({item['size_bytes']} bytes)")
+        print(f"✅ {report['uploaded']} objet(s) envoyé(s) ({report['uploaded_bytes']} bytes), "
+              f"{report['skipped']} inchangé(s) ignoré(s) en {report['duration_s']:.2f}s")
+        print(f"  📦 {report['model_uri']}")
+        return report
+        
+    except Exception as e:
+        print(f"⚠️ Envoi S3 échoué: {e}")
+        return None
+
+def register_model_in_registry(metrics, onnx_path, autotune_summary=None, pipeline_id=None,
+                               model_uri=None):
+    """
+    Enregistrement dans Model Registry, avec l'URI de l'artefact envoyé sur S3
+    Sans envoi (boto3 absent, S3_UPLOAD=false ou échec), rien n'est enregistré:
+    aucune URI ne désignerait un artefact vérifié
+    """
+    if model_uri is None:
+        print("⚠️ Artefact non envoyé sur S3 par cette étape - enregistrement ignoré")
+        return False
     
     try:
         from model_registry import ModelRegistry
@@ -287,18 +480,15 @@ def register_model_in_registry(metrics, onnx_path):
         )
         
         # Version unique
-        import time
-        pipeline_id = os.getenv('PIPELINE_RUN_NAME', f'iris-{int(time.time())}')
         unique_version = f"v{int(time.time())}"
         
         # Déterminer format
-        if onnx_path and os.path.exists(onnx_path):
+        s3_uri = model_uri
+        if model_uri.endswith(".onnx"):
             # Structure pour Triton: iris_model/1/iris_model.onnx
-            s3_uri = f"s3://mlpipeline/{pipeline_id}/models/iris_model/1/iris_model.onnx"
             model_format = "onnx"
             description = f"🎯 Modèle Iris ONNX - Accuracy: {metrics.get('accuracy', 0):.4f} - Prêt pour déploiement"
         else:
-            s3_uri = f"s3://mlpipeline/{pipeline_id}/models/iris_model.pkl"
             model_format = "sklearn"
             description = f"📊 Modèle Iris sklearn - Accuracy: {metrics.get('accuracy', 0):.4f}"
         
@@ -314,8 +504,13 @@ def register_model_in_registry(metrics, onnx_path):
             metadata={
                 "pipeline": "iris-elyra-final",
                 "accuracy": float(metrics.get('accuracy', 0)),
-                "deployment_ready": onnx_path is not None,
-                "pipeline_run": pipeline_id
+                **({"accuracy_ci_low": metrics["confidence_intervals"]["accuracy"][0],
+                    "accuracy_ci_high": metrics["confidence_intervals"]["accuracy"][1]}
+                   if metrics.get("confidence_intervals") else {}),
+                "deployment_ready": onnx_path is not None and latency_gate_passed(metrics),
+                "pipeline_run": pipeline_id,
+                **serving_profile_metadata(metrics),
+                **({"triton_autotune": json.dumps(autotune_summary)} if autotune_summary else {})
             }
         )
         
@@ -324,15 +519,6 @@ def register_model_in_registry(metrics, onnx_path):
         print(f"🎯 Format: {model_format.upper()}")
         print(f"🔢 Version: {unique_version}")
         
-        # Créer la structure Triton dans S3 si c'est un modèle ONNX
-        if onnx_path and os.path.exists(onnx_path):
-            print("\n🔧 Création de la structure Triton locale...")
-            triton_structure_created = create_triton_structure_local(onnx_path)
-            if triton_structure_created:
-                print("✅ Structure Triton prête pour déploiement!")
-            else:
-                print("⚠️ Structure Triton non créée - déploiement manuel requis")
-        
         return True
         
     except Exception as e:
@@ -354,51 +540,160 @@ def create_fallback_files():
     
     with open(eval_dir / "registry_info.json", "w") as f:
         json.dump(fallback_info, f, indent=2)
+    
+    # Rapports d'optimisation déclarés en sortie du noeud
+    for report_name in ("onnx_optimization_report.json", "autotune_report.json",
+                        "s3_upload_report.json"):
+        report_path = eval_dir / report_name
+        if not report_path.exists():
+            with open(report_path, "w") as f:
+                json.dump({"status": "not_run"}, f, indent=2)
+
+def evaluate_and_prepare(onnx_available):
+    """
+    Évaluation, conversion ONNX, optimisation, autotuning et structure Triton
+    Retourne (metrics, onnx_path, autotune_summary); lève RuntimeError sans métriques
+    pour qu'un échec ne soit jamais mis en cache
+    """
+    # 2. Évaluation (priorité absolue)
+    with span("evaluate"):
+        accuracy, metrics, model, X_test = evaluate_model()
+    
+    if not metrics:
+        raise RuntimeError("évaluation impossible")
+    
+    # 3. Modèle ONNX exporté à l'entraînement (optionnel)
+    onnx_path = None
+    if onnx_available and model is not None and X_test is not None:
+        with span("onnx_load"):
+            onnx_path = prepare_onnx_model(model, X_test)
+    
+    # 4. Optimisation ONNX, autotuning et structure Triton (modèle et config.pbtxt retenus)
+    autotune_summary = None
+    serving_path = X_raw = None
+    if onnx_path:
+        from onnx_export import load_model_scaler, raw_features
+        X_raw = raw_features(X_test, load_model_scaler())
+        with span("onnx_optimize"):
+            serving_path = optimize_exported_model(onnx_path, X_raw)
+        with span("autotune"):
+            triton_settings, autotune_summary = autotune_triton_config(serving_path, X_raw)
+        print("\n🔧 Création de la structure Triton locale...")
+        with span("triton_structure"):
+            triton_ready = create_triton_structure_local(serving_path, settings=triton_settings)
+        if triton_ready:
+            print("✅ Structure Triton prête pour déploiement!")
+        else:
+            print("⚠️ Structure Triton non créée - déploiement manuel requis")
+    
+    # 5. Coût de service des artefacts (pickle et ONNX retenu)
+    with span("latency_profile"):
+        profile_serving_latency(metrics, serving_path, X_test, X_raw)
+    
+    return metrics, onnx_path, autotune_summary
+
+def restored_evaluation_outputs():
+    """(metrics, onnx_path, autotune_summary) relus depuis les sorties restaurées du cache"""
+    with open("evaluation/evaluation_metrics.json") as f:
+        metrics = json.load(f)
+    triton_model = "models/iris_model/1/iris_model.onnx"
+    onnx_path = triton_model if os.path.exists(triton_model) else None
+    
+    autotune_summary = None
+    if os.path.exists("evaluation/autotune_report.json"):
+        with open("evaluation/autotune_report.json") as f:
+            report = json.load(f)
+        if "best" in report:
+            autotune_summary = summarize_autotune(report)
+    return metrics, onnx_path, autotune_summary
 
 def main():
     """Fonction principale simplifiée et robuste"""
     
     print("🚀 Pipeline Iris Final - Robuste et Fonctionnel")
     
-    # 1. Installation optionnelle
-    onnx_available = try_install_onnx()
-    registry_available = install_model_registry()
+    instrumentation.start("evaluate", started=instrumentation.IMPORTED_AT)
     
-    # 2. Évaluation (priorité absolue)
-    accuracy, metrics, model, X_test = evaluate_model()
+    # 1. Capacités disponibles (rien n'est installé à l'exécution)
+    with span("preflight"):
+        capabilities = preflight()
+    onnx_available = capabilities["onnxruntime"]
+    registry_available = capabilities["registry"]
+    pipeline_id = os.getenv('PIPELINE_RUN_NAME', f'iris-{int(time.time())}')
     
-    if not metrics:
-        print("❌ Impossible de continuer sans métriques")
+    # 2-5. Étapes de calcul, réutilisées depuis le cache si modèle, données, code et
+    # paramètres (opset, autotuning, optimisation, profil de latence) sont inchangés
+    from step_cache import env_params, library_versions, module_paths, run_cached
+    try:
+        with span("compute"):
+            hit, result = run_cached(
+                "evaluate",
+                lambda: evaluate_and_prepare(onnx_available),
+                outputs=lambda: ["evaluation", "models/iris_model"] + sorted(
+                    str(path) for pattern in ("*.optimized*.onnx", "*.ort")
+                    for path in Path("models").glob(pattern)),
+                inputs=["data", "models/iris_model.pkl", "models/model_metadata.json",
+                        "models/scaler.pkl", "models/artifacts.json"],
+                code=module_paths("evaluate_register_model.py", "artifact_store.py",
+                                  "evaluation_engine.py",
+                                  "onnx_export.py", "model_artifacts.py", "onnx_optimize.py",
+                                  "local_inference.py", "latency_profile.py", "instrumentation.py",
+                                  "forest_compiler.py", "triton_config.py", "triton_autotune.py"),
+                params={"opset": ONNX_OPSET, "onnx_available": onnx_available,
+                        **env_params("TRITON_", "AUTOTUNE_", "ONNX_", "LATENCY_", "EVAL_"),
+                        **library_versions("numpy", "scikit-learn", "skl2onnx", "onnx",
+                                           "onnxruntime")},
+            )
+    except RuntimeError as e:
+        print(f"❌ Impossible de continuer sans métriques ({e})")
         create_fallback_files()
+        instrumentation.finish()
         return
+    metrics, onnx_path, autotune_summary = restored_evaluation_outputs() if hit else result
     
-    # 3. Conversion ONNX (optionnelle)
-    onnx_path = None
-    if onnx_available and model is not None and X_test is not None:
-        onnx_path = try_convert_to_onnx(model, X_test)
+    # 6. Envoi du dépôt de modèles vers S3/MinIO
+    model_uri = None
+    if capabilities["boto3"]:
+        print("\n☁️ Envoi des artefacts vers S3...")
+        with span("s3_upload"):
+            upload_report = upload_model_repository(onnx_path, pipeline_id)
+        model_uri = upload_report["model_uri"] if upload_report else None
     
-    # 4. Enregistrement Model Registry (optionnel)
+    # 6b. Enregistrement Model Registry (optionnel)
     registry_success = False
     if registry_available:
         print("\n🏛️ Enregistrement Model Registry...")
-        registry_success = register_model_in_registry(metrics, onnx_path)
+        with span("registry"):
+            registry_success = register_model_in_registry(metrics, onnx_path, autotune_summary,
+                                                          pipeline_id, model_uri)
     
-    # 5. Créer les fichiers attendus par Elyra
+    # 7. Créer les fichiers attendus par Elyra
     create_fallback_files()
     
-    # 6. Rapport final
+    # 8. Rapport final
     print(f"\n💾 Fichiers créés:")
     print(f"  📄 evaluation/evaluation_metrics.pkl")
     print(f"  📄 evaluation/evaluation_metrics.json") 
     print(f"  📄 evaluation/accuracy.txt")
     print(f"  📄 evaluation/registry_info.json")
     if onnx_path:
-        print(f"  📄 models/iris_model.onnx")
+        print(f"  📄 {onnx_path}")
+    if onnx_path:
+        print(f"  📄 evaluation/onnx_optimization_report.json")
+    if autotune_summary:
+        print(f"  📄 evaluation/autotune_report.json")
+    print(f"  📄 instrumentation/evaluate.json")
+    gate = (metrics.get("serving_profile") or {}).get("latency_gate")
+    
+    instrumentation.finish()
     
     print(f"\n🎯 RÉSUMÉ FINAL:")
     print(f"  📊 Accuracy: {metrics.get('accuracy', 0):.4f}")
     print(f"  🎯 ONNX: {'✅ Créé' if onnx_path else '❌ Non disponible'}")
     print(f"  🏛️ Registry: {'✅ Enregistré' if registry_success else '❌ Non disponible'}")
+    if gate:
+        print(f"  ⏱️ Budget de latence: {'✅ respecté' if gate['passed'] else '❌ dépassé'} "
+              f"({gate['observed_ms']:.3f}ms / {gate['budget_ms']}ms)")
     
     if onnx_path and registry_success:
         print(f"\n🎉 SUCCÈS COMPLET!")
@@ -0,0 +1,179 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+DEFAULT_CHUNK_SIZE = 65_536
+DEFAULT_BOOTSTRAP_SAMPLES = 1000
+CONFIDENCE_LEVEL = 0.95
+
+
+class StreamingConfusionMatrix:
+    """
+    Matrice de confusion accumulée chunk par chunk: seuls les couples (vrai, prédit)
+    distincts sont conservés, la mémoire ne dépend pas de la taille du jeu de test.
+    Les labels sont ceux observés dans y_true ou y_pred, comme confusion_matrix de sklearn.
+    """
+
+    def __init__(self):
+        self.counts = {}
+
+    def update(self, y_true, y_pred):
+        pairs, counts = np.unique(np.stack([np.asarray(y_true), np.asarray(y_pred)]),
+                                  axis=1, return_counts=True)
+        for (true_label, predicted_label), count in zip(pairs.T.tolist(), counts.tolist()):
+            key = (true_label, predicted_label)
+            self.counts[key] = self.counts.get(key, 0) + count
+
+    @property
+    def labels(self):
+        return sorted({label for pair in self.counts for label in pair})
+
+    def matrix(self):
+        labels = self.labels
+        index = {label: i for i, label in enumerate(labels)}
+        cm = np.zeros((len(labels), len(labels)), dtype=np.int64)
+        for (true_label, predicted_label), count in self.counts.items():
+            cm[index[true_label], index[predicted_label]] += count
+        return labels, cm
+
+
+def streaming_confusion_matrix(predict, X, y, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Prédit X (tableau en mémoire mappée accepté) par chunks; retourne (labels, matrice)"""
+    accumulator = StreamingConfusionMatrix()
+    for start in range(0, len(y), chunk_size):
+        accumulator.update(np.asarray(y[start:start + chunk_size]),
+                           predict(np.asarray(X[start:start + chunk_size])))
+    return accumulator.matrix()
+
+
+def _safe_divide(numerator, denominator):
+    """Division avec 0 quand le dénominateur est nul (zero_division de sklearn)"""
+    return np.divide(numerator, denominator, out=np.zeros(np.broadcast(numerator, denominator).shape),
+                     where=denominator != 0)
+
+
+def confusion_metrics(cms):
+    """
+    Métriques vectorisées pour une ou plusieurs matrices [..., k, k] (lignes: vrai, colonnes: prédit)
+    Retourne accuracy [...], precision / recall / f1 / support [..., k], moyennes macro et pondérée
+    """
+    cms = np.asarray(cms, dtype=np.float64)
+    tp = np.diagonal(cms, axis1=-2, axis2=-1)
+    support = cms.sum(axis=-1)
+    predicted = cms.sum(axis=-2)
+    total = support.sum(axis=-1)
+
+    precision = _safe_divide(tp, predicted)
+    recall = _safe_divide(tp, support)
+    f1 = _safe_divide(2 * tp, support + predicted)
+    metrics = {
+        "accuracy": _safe_divide(tp.sum(axis=-1), total),
+        "precision": precision,
+        "recall": recall,
+        "f1-score": f1,
+        "support": support,
+    }
+    for name in ("precision", "recall", "f1-score"):
+        metrics[f"macro {name}"] = metrics[name].mean(axis=-1)
+        metrics[f"weighted {name}"] = _safe_divide((metrics[name] * support).sum(axis=-1), total)
+    return metrics
+
+
+def classification_report_from_matrix(labels, cm):
+    """Même structure que classification_report(..., output_dict=True) de sklearn"""
+    metrics = confusion_metrics(cm)
+    report = {}
+    for i, label in enumerate(labels):
+        report[str(label)] = {name: float(metrics[name][i])
+                              for name in ("precision", "recall", "f1-score", "support")}
+    report["accuracy"] = float(metrics["accuracy"])
+    total = float(cm.sum())
+    for average in ("macro", "weighted"):
+        report[f"{average} avg"] = {
+            **{name: float(metrics[f"{average} {name}"])
+               for name in ("precision", "recall", "f1-score")},
+            "support": total,
+        }
+    return report
+
+
+def _bootstrap_worker(cm, n_samples, seed):
+    """
+    Rééchantillonnage des lignes de test avec remise, fait directement sur les cellules de
+    la matrice: tirer n lignes revient à tirer une multinomiale(n, cellules / n).
+    """
+    rng = np.random.default_rng(seed)
+    flat = np.asarray(cm, dtype=np.int64).ravel()
+    total = int(flat.sum())
+    samples = rng.multinomial(total, flat / total, size=n_samples).reshape((n_samples,) + cm.shape)
+    return confusion_metrics(samples)
+
+
+def bootstrap_confidence_intervals(labels, cm, n_samples=None, workers=None, seed=None,
+                                   level=CONFIDENCE_LEVEL):
+    """
+    Intervalles de confiance bootstrap (percentiles) de l'accuracy et des métriques par classe
+    Les tirages sont répartis entre workers process (graines indépendantes via SeedSequence);
+    le résultat est reproductible à nombre de workers constant.
+    Variables: EVAL_BOOTSTRAP_SAMPLES (0 désactive), EVAL_BOOTSTRAP_WORKERS, EVAL_BOOTSTRAP_SEED
+    """
+    n_samples = (int(os.getenv("EVAL_BOOTSTRAP_SAMPLES", DEFAULT_BOOTSTRAP_SAMPLES))
+                 if n_samples is None else n_samples)
+    if n_samples <= 0 or cm.sum() == 0:
+        return None
+    workers = workers or int(os.getenv("EVAL_BOOTSTRAP_WORKERS", min(4, os.cpu_count() or 1)))
+    workers = max(1, min(workers, n_samples))
+    seed = int(os.getenv("EVAL_BOOTSTRAP_SEED", 42)) if seed is None else seed
+
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    sizes = [len(part) for part in np.array_split(np.arange(n_samples), workers)]
+    if workers == 1:
+        parts = [_bootstrap_worker(cm, sizes[0], seeds[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_bootstrap_worker, [cm] * workers, sizes, seeds))
+    samples = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+    tail = (1.0 - level) / 2.0 * 100.0
+    bounds = (tail, 100.0 - tail)
+
+    def interval(values):
+        low, high = np.percentile(values, bounds, axis=0)
+        return [float(low), float(high)] if np.ndim(low) == 0 else [low.tolist(), high.tolist()]
+
+    intervals = {
+        "level": level,
+        "n_bootstrap": n_samples,
+        "workers": workers,
+        "seed": seed,
+        "accuracy": interval(samples["accuracy"]),
+    }
+    for i, label in enumerate(labels):
+        intervals[str(label)] = {name: [float(v) for v in np.percentile(samples[name][:, i], bounds)]
+                                 for name in ("precision", "recall", "f1-score")}
+    for average in ("macro", "weighted"):
+        intervals[f"{average} avg"] = {name: interval(samples[f"{average} {name}"])
+                                       for name in ("precision", "recall", "f1-score")}
+    return intervals
+
+
+def evaluate_predictions(predict, X, y, chunk_size=None, **bootstrap_options):
+    """
+    Évaluation complète: matrice de confusion en flux, rapport par classe et intervalles
+    de confiance. Retourne le dictionnaire de métriques au format de evaluation_metrics.json
+    """
+    chunk_size = chunk_size or int(os.getenv("EVAL_CHUNK_SIZE", DEFAULT_CHUNK_SIZE))
+    labels, cm = streaming_confusion_matrix(predict, X, y, chunk_size)
+    total = int(cm.sum())
+    errors = total - int(np.trace(cm))
+    report = classification_report_from_matrix(labels, cm)
+    return {
+        "accuracy": report["accuracy"],
+        "error_rate": float(errors / total) if total else 0.0,
+        "errors": errors,
+        "total_samples": total,
+        "classification_report": report,
+        "confusion_matrix": cm.tolist(),
+        "confidence_intervals": bootstrap_confidence_intervals(labels, cm, **bootstrap_options),
+    }
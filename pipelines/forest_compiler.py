@@ -0,0 +1,196 @@
+import argparse
+import os
+import pickle
+import statistics
+import time
+
+import numpy as np
+
+
+class CompiledForest:
+    """
+    Forêt scikit-learn aplatie en tableaux NumPy contigus (tous les arbres bout à bout)
+
+    - feature, threshold: un élément par noeud
+    - children: [2 * n_noeuds], enfant droit en 2i, enfant gauche en 2i + 1; les feuilles
+      pointent sur elles-mêmes, ce qui permet un parcours à nombre d'étapes fixe
+    - leaf_proba: probabilités normalisées de chaque noeud, calculées comme sklearn
+    - roots: indice du premier noeud de chaque arbre
+
+    Le parcours se fait niveau par niveau pour toutes les lignes et tous les arbres
+    à la fois; les probabilités sont sommées arbre par arbre dans l'ordre des
+    estimateurs puis divisées par n_estimators, comme RandomForestClassifier.predict_proba
+    avec n_jobs=1: le résultat est identique au bit près.
+    """
+
+    def __init__(self, model, chunk_size=256):
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+
+        self.classes_ = np.asarray(model.classes_)
+        self.n_estimators = len(trees)
+        self.n_features = model.n_features_in_
+        self.max_depth = max(tree.max_depth for tree in trees)
+        self.chunk_size = chunk_size
+        self.roots = offsets[:-1].astype(np.intp)
+
+        features, thresholds, children, probas = [], [], [], []
+        for tree, offset in zip(trees, offsets[:-1]):
+            nodes = np.arange(tree.node_count, dtype=np.intp) + offset
+            is_leaf = tree.children_left == -1
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.intp))
+            thresholds.append(tree.threshold.astype(np.float64))
+            children.append(np.column_stack([
+                np.where(is_leaf, nodes, tree.children_right + offset),
+                np.where(is_leaf, nodes, tree.children_left + offset),
+            ]).ravel())
+
+            # Même normalisation que DecisionTreeClassifier.predict_proba
+            proba = tree.value[:, 0, :len(self.classes_)].astype(np.float64)
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            probas.append(proba / normalizer)
+
+        self.feature = np.ascontiguousarray(np.concatenate(features))
+        self.threshold = np.ascontiguousarray(np.concatenate(thresholds))
+        self.children = np.ascontiguousarray(np.concatenate(children))
+        self.leaf_proba = np.ascontiguousarray(np.concatenate(probas))
+
+    @property
+    def node_count(self):
+        return len(self.feature)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.children,
+                                      self.leaf_proba, self.roots))
+
+    def apply(self, X):
+        """Indices (globaux) des feuilles atteintes: [N, n_estimators]"""
+        X = np.ascontiguousarray(X)
+        flat = X.ravel()
+        row_offsets = (np.arange(len(X)) * X.shape[1])[:, np.newaxis]
+        nodes = np.broadcast_to(self.roots, (len(X), self.n_estimators)).copy()
+        for _ in range(self.max_depth):
+            go_left = flat[row_offsets + self.feature[nodes]] <= self.threshold[nodes]
+            nodes = self.children[2 * nodes + go_left]
+        return nodes
+
+    def predict_proba(self, X):
+        # sklearn convertit en float32 puis compare au seuil float64
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        proba = np.empty((len(X), len(self.classes_)), dtype=np.float64)
+        for start in range(0, len(X), self.chunk_size):
+            chunk = X[start:start + self.chunk_size]
+            leaves = self.apply(chunk)
+            # cumsum additionne séquentiellement dans l'ordre des arbres (np.sum
+            # utiliserait une somme par paires et changerait les derniers bits)
+            total = np.cumsum(self.leaf_proba[leaves], axis=1)[:, -1]
+            total /= self.n_estimators
+            proba[start:start + len(chunk)] = total
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+def compile_forest(model, chunk_size=256):
+    """Aplati un RandomForestClassifier entraîné (cf. CompiledForest)"""
+    return CompiledForest(model, chunk_size=chunk_size)
+
+
+def check_bit_identical(compiled, model, X):
+    """Compare au bit près avec sklearn (n_jobs=1: ordre de sommation déterministe)"""
+    n_jobs = model.n_jobs
+    model.n_jobs = 1
+    try:
+        reference = model.predict_proba(X)
+    finally:
+        model.n_jobs = n_jobs
+    proba = compiled.predict_proba(X)
+    return bool(np.array_equal(proba, reference)), float(np.max(np.abs(proba - reference)))
+
+
+def _median_ms(fn, batch, repeats):
+    fn(batch)  # warm-up
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn(batch)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000.0
+
+
+def benchmark(model, X, onnx_path=None, batch_sizes=(1, 16, 256, 4096), repeats=20,
+              onnx_features=None):
+    """
+    Latence médiane (ms) par taille de batch: sklearn, forêt compilée et ONNX Runtime
+    onnx_features: entrées du modèle ONNX si elles diffèrent de X (graphe fusionné
+    scaler + forêt: features brutes), mêmes lignes dans le même ordre
+    """
+    compiled = compile_forest(model)
+    predictors = {
+        "sklearn": model.predict_proba,
+        "compiled": compiled.predict_proba,
+    }
+    if onnx_path and os.path.exists(onnx_path):
+        from local_inference import LocalInferenceBackend
+        backend = LocalInferenceBackend(onnx_path)
+        predictors["onnxruntime"] = lambda batch: backend.predict_with_proba(batch)
+
+    X = np.asarray(X, dtype=np.float32)
+    X_onnx = np.asarray(X if onnx_features is None else onnx_features, dtype=np.float32)
+    results = {}
+    for batch_size in batch_sizes:
+        batch = np.resize(X, (batch_size, X.shape[1]))
+        onnx_batch = np.resize(X_onnx, (batch_size, X_onnx.shape[1]))
+        results[str(batch_size)] = {
+            name: _median_ms(fn, onnx_batch if name == "onnxruntime" else batch, repeats)
+            for name, fn in predictors.items()
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compilation et benchmark de la forêt Iris")
+    parser.add_argument("--model", default="models/iris_model.pkl", help="Modèle scikit-learn")
+    parser.add_argument("--data", default="data",
+                        help="Répertoire de données (X_test du manifeste ou X_test.pkl)")
+    parser.add_argument("--onnx", default=None,
+                        help="Modèle ONNX à comparer (graphe fusionné: reçoit les features "
+                             "brutes, reconstruites avec le scaler du modèle)")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 256, 4096])
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(args.model, "rb") as f:
+        model = pickle.load(f)
+    from artifact_store import load_array
+    X = np.asarray(load_array(args.data, "X_test"))
+
+    compiled = compile_forest(model)
+    print(f"🌳 Forêt compilée: {compiled.n_estimators} arbres, {compiled.node_count} noeuds, "
+          f"profondeur {compiled.max_depth}, {compiled.nbytes / 1024:.1f} KiB")
+
+    identical, max_diff = check_bit_identical(compiled, model, np.resize(X, (4096, X.shape[1])))
+    print(f"{'✅' if identical else '❌'} Probabilités identiques à sklearn au bit près: "
+          f"{identical} (écart max {max_diff:.2e})")
+
+    onnx_features = None
+    if args.onnx:
+        from onnx_export import load_model_scaler, raw_features
+        onnx_features = raw_features(X, load_model_scaler(os.path.dirname(args.model) or ".",
+                                                          args.data))
+
+    print("⏱️ Latence médiane par batch (ms):")
+    for batch_size, timings in benchmark(model, X, args.onnx, args.batch_sizes,
+                                         args.repeats, onnx_features).items():
+        line = ", ".join(f"{name}={ms:.3f}" for name, ms in timings.items())
+        print(f"  batch {batch_size}: {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Début des imports de l'étape: les scripts importent ce module en premier
+IMPORTED_AT = time.perf_counter()
+
+DEFAULT_OUTPUT_DIR = "instrumentation"
+TOP_ENTRIES = 20
+
+_current = None
+
+
+def rss_mb(field="VmHWM"):
+    """
+    Mémoire résidente du process (VmHWM: pic, VmRSS: courante) depuis /proc/self/status.
+    ru_maxrss sert de repli hors Linux, mais il hérite du pic du parent au fork/exec.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def reset_peak_rss():
+    """Remet VmHWM à la RSS courante (Linux >= 4.0); False si impossible"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _env_flag(name):
+    return os.getenv(name, "false").lower() == "true"
+
+
+def _new_node(name):
+    return {"name": name, "calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_rss_mb": 0.0,
+            "rss_delta_mb": 0.0, "allocated_blocks": 0, "children": []}
+
+
+class _Frame:
+    """Span ouvert: valeurs de départ et pics observés avant les remises à zéro des enfants"""
+
+    def __init__(self, node):
+        self.node = node
+        self.peak_rss = 0.0
+        self.traced_peak = 0
+        self.started = time.perf_counter()
+        self.cpu_started = time.process_time()
+        self.rss_started = rss_mb("VmRSS")
+        self.blocks_started = sys.getallocatedblocks()
+        self.traced_started = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+
+
+class Instrumentation:
+    """
+    Spans imbriqués d'une étape du pipeline: durée, temps CPU, pic de RSS, variation de RSS
+    et blocs alloués par span; tracemalloc et cProfile en option.
+    Un span appelé plusieurs fois au même niveau est cumulé (calls, durées) et garde le pic max.
+    Le pic de RSS est propre au span quand VmHWM peut être remis à zéro (Linux), sinon
+    c'est le pic du process à la sortie du span (peak_rss_scope). Seul ce process est
+    mesuré: les process enfants (profil de latence, bootstrap) n'y figurent pas.
+    """
+
+    def __init__(self, step, output_dir=DEFAULT_OUTPUT_DIR, started=None, trace_memory=None,
+                 profile=None):
+        self.step = step
+        self.output_dir = output_dir
+        self.trace_memory = (_env_flag("INSTRUMENT_TRACEMALLOC")
+                             if trace_memory is None else trace_memory)
+        self.profile = _env_flag("INSTRUMENT_CPROFILE") if profile is None else profile
+
+        self.root = _new_node(step)
+        self._stack = [_Frame(self.root)]
+        if started is not None:
+            self._stack[0].started = started
+            self._stack[0].cpu_started = 0.0
+            imports = _new_node("imports")
+            imports.update(calls=1, wall_s=time.perf_counter() - started)
+            self.root["children"].append(imports)
+        self._fold_peaks(self._stack[0])
+        if started is not None:
+            imports["peak_rss_mb"] = self._stack[0].peak_rss
+        self.peak_scope = "span" if reset_peak_rss() else "process"
+
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._stack[0].traced_started = 0
+        self._profiler = None
+        if self.profile:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def _fold_peaks(self, frame):
+        """Reporte dans frame les pics courants, avant qu'un enfant ne les remette à zéro"""
+        frame.peak_rss = max(frame.peak_rss, rss_mb())
+        if tracemalloc.is_tracing():
+            frame.traced_peak = max(frame.traced_peak, tracemalloc.get_traced_memory()[1])
+
+    def _close(self, frame):
+        node = frame.node
+        self._fold_peaks(frame)
+        node["calls"] += 1
+        node["wall_s"] += time.perf_counter() - frame.started
+        node["cpu_s"] += time.process_time() - frame.cpu_started
+        node["rss_delta_mb"] += rss_mb("VmRSS") - frame.rss_started
+        node["allocated_blocks"] += sys.getallocatedblocks() - frame.blocks_started
+        node["peak_rss_mb"] = max(node["peak_rss_mb"], frame.peak_rss)
+        if tracemalloc.is_tracing():
+            current, _ = tracemalloc.get_traced_memory()
+            node["traced_net_mb"] = (node.get("traced_net_mb", 0.0)
+                                     + (current - frame.traced_started) / 1024 ** 2)
+            node["traced_peak_mb"] = max(node.get("traced_peak_mb", 0.0),
+                                         frame.traced_peak / 1024 ** 2)
+
+    @contextmanager
+    def span(self, name):
+        parent = self._stack[-1]
+        node = next((child for child in parent.node["children"] if child["name"] == name), None)
+        if node is None:
+            node = _new_node(name)
+            parent.node["children"].append(node)
+
+        self._fold_peaks(parent)
+        if self.peak_scope == "span":
+            reset_peak_rss()
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        frame = _Frame(node)
+        self._stack.append(frame)
+        try:
+            yield node
+        finally:
+            self._stack.pop()
+            self._close(frame)
+            parent.peak_rss = max(parent.peak_rss, frame.peak_rss)
+            parent.traced_peak = max(parent.traced_peak, frame.traced_peak)
+
+    def _profile_report(self):
+        self._profiler.disable()
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"{self.step}.prof")
+        self._profiler.dump_stats(path)
+        stats = pstats.Stats(self._profiler, stream=io.StringIO())
+        top = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_ENTRIES]
+        return {
+            "file": path,
+            "top_cumulative": [{"function": f"{filename}:{line}({function})", "calls": calls,
+                                "total_s": total, "cumulative_s": cumulative}
+                               for (filename, line, function), (_, calls, total, cumulative, _)
+                               in top],
+        }
+
+    def _tracemalloc_report(self):
+        snapshot = tracemalloc.take_snapshot()
+        return [{"location": str(stat.traceback), "size_mb": stat.size / 1024 ** 2,
+                 "blocks": stat.count}
+                for stat in snapshot.statistics("lineno")[:TOP_ENTRIES]]
+
+    def report(self):
+        """Arbre des spans (le span racine couvre toute l'étape) et captures optionnelles"""
+        root = self._stack[0]
+        self._close(root)
+        report = {
+            "step": self.step,
+            "created_at": time.time(),
+            "peak_rss_scope": self.peak_scope,
+            "spans": self.root,
+        }
+        if self.trace_memory and tracemalloc.is_tracing():
+            report["tracemalloc_top"] = self._tracemalloc_report()
+        if self._profiler is not None:
+            report["cprofile"] = self._profile_report()
+        return report
+
+    def kfp_metrics(self, report):
+        """<étape>-<span>-seconds pour chaque span, pic de RSS pour l'étape et ses spans directs"""
+        metrics = {}
+
+        def visit(node, path):
+            name = re.sub(r"[^a-z0-9]+", "-", "-".join(path).lower()).strip("-")[:50]
+            metrics[f"{name}-seconds"] = node["wall_s"]
+            if len(path) <= 2:
+                metrics[f"{name}-peak-rss-mb"] = node["peak_rss_mb"]
+            for child in node["children"]:
+                visit(child, path + [child["name"]])
+
+        visit(report["spans"], [self.step])
+        return metrics
+
+    def finish(self):
+        """Écrit <output_dir>/<étape>.json, les métriques KFP et affiche le résumé"""
+        from step_cache import log_kfp_metrics
+
+        report = self.report()
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"{self.step}.json")
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        log_kfp_metrics(self.kfp_metrics(report))
+
+        root = report["spans"]
+        print(f"\n⏱️ Instrumentation {self.step}: {root['wall_s']:.2f}s, "
+              f"pic RSS {root['peak_rss_mb']:.0f}MB ({path})")
+
+        def show(node, depth):
+            for child in node["children"]:
+                calls = f" x{child['calls']}" if child["calls"] > 1 else ""
+                print(f"  {'  ' * depth}{child['name']}{calls}: {child['wall_s']:.2f}s, "
+                      f"pic {child['peak_rss_mb']:.0f}MB, {child['allocated_blocks']:+d} blocs")
+                show(child, depth + 1)
+
+        show(root, 0)
+        return report
+
+
+def start(step, output_dir=None, started=None, **options):
+    """
+    Démarre l'instrumentation de l'étape courante (span() est sans effet avant)
+    Variables: INSTRUMENT_DIR, INSTRUMENT_TRACEMALLOC, INSTRUMENT_CPROFILE
+    """
+    global _current
+    _current = Instrumentation(step, output_dir or os.getenv("INSTRUMENT_DIR", DEFAULT_OUTPUT_DIR),
+                               started=started, **options)
+    return _current
+
+
+@contextmanager
+def span(name):
+    """Span imbriqué dans l'instrumentation courante"""
+    if _current is None:
+        yield None
+        return
+    with _current.span(name) as node:
+        yield node
+
+
+def finish():
+    """Termine l'instrumentation courante et écrit son rapport (None si non démarrée)"""
+    global _current
+    if _current is None:
+        return None
+    instrumentation, _current = _current, None
+    return instrumentation.finish()
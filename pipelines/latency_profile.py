@@ -0,0 +1,147 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from instrumentation import rss_mb
+
+DEFAULT_BATCH_SIZES = (1, 4, 16, 64, 256, 1024, 4096)
+PERCENTILES = (50, 90, 99)
+
+
+def _percentiles(timings_s):
+    values = np.asarray(timings_s) * 1000.0
+    return {f"p{p}": float(np.percentile(values, p)) for p in PERCENTILES}
+
+
+def _profile_in_process(model_path, X, batch_sizes, repeats, cold_loads, backend_options):
+    """
+    Exécuté dans un process neuf (spawn): le pic de RSS ne mesure que cet artefact.
+    backend_options: arguments de LocalInferenceBackend (ex. forest_backend pour le pickle)
+    - froid: chargement + première inférence, sur cold_loads chargements indépendants
+    - chaud: repeats inférences après une inférence d'échauffement
+    """
+    from local_inference import LocalInferenceBackend
+
+    baseline_rss = rss_mb("VmRSS")
+    X = np.asarray(X, dtype=np.float32)
+    batches = {batch_size: np.resize(X, (batch_size, X.shape[1])) for batch_size in batch_sizes}
+
+    load_timings = []
+    cold = {batch_size: [] for batch_size in batch_sizes}
+    for _ in range(cold_loads):
+        for batch_size, batch in batches.items():
+            started = time.perf_counter()
+            backend = LocalInferenceBackend(model_path, **backend_options)
+            loaded = time.perf_counter()
+            backend.predict_with_proba(batch)
+            cold[batch_size].append(time.perf_counter() - started)
+            load_timings.append(loaded - started)
+            backend.close()
+
+    backend = LocalInferenceBackend(model_path, **backend_options)
+    results = {}
+    for batch_size, batch in batches.items():
+        backend.predict_with_proba(batch)  # échauffement
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            backend.predict_with_proba(batch)
+            timings.append(time.perf_counter() - started)
+        warm = _percentiles(timings)
+        results[str(batch_size)] = {
+            "warm_ms": {**warm, "mean": float(np.mean(timings) * 1000.0)},
+            "cold_ms": _percentiles(cold[batch_size]),
+            "rows_per_s": float(batch_size / np.median(timings)),
+        }
+
+    return {
+        "path": str(model_path),
+        "format": backend.format,
+        "backend_options": backend_options,
+        "size_bytes": os.path.getsize(model_path),
+        "load_ms": _percentiles(load_timings),
+        "batches": results,
+        "baseline_rss_mb": baseline_rss,
+        "peak_rss_mb": rss_mb(),
+    }
+
+
+def profile_artifact(model_path, X, batch_sizes=DEFAULT_BATCH_SIZES, repeats=20, cold_loads=3,
+                     backend_options=None):
+    """Profil de service d'un artefact (.onnx ou .pkl) mesuré dans un process dédié"""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(_profile_in_process, str(model_path), np.asarray(X),
+                           tuple(batch_sizes), repeats, cold_loads,
+                           dict(backend_options or {})).result()
+
+
+def check_latency_budget(profile, budget_ms, batch_size=1, percentile="p99"):
+    """Compare la latence à chaud de l'artefact servi au budget (None si pas de budget)"""
+    if budget_ms is None:
+        return None
+    batch = profile["batches"].get(str(batch_size))
+    if batch is None:
+        raise ValueError(f"Batch {batch_size} absent du profil "
+                         f"(mesurés: {', '.join(profile['batches'])})")
+    observed = batch["warm_ms"][percentile]
+    return {
+        "budget_ms": float(budget_ms),
+        "batch_size": batch_size,
+        "percentile": percentile,
+        "observed_ms": observed,
+        "passed": observed <= budget_ms,
+    }
+
+
+def profile_serving(artifacts, batch_sizes=None, repeats=None, cold_loads=None,
+                    budget_ms=None, budget_batch_size=None, served=None):
+    """
+    Profile chaque artefact {nom: (chemin, features d'entrée[, options du backend])} et
+    évalue le budget de latence sur l'artefact servi (served, par défaut le premier)
+    Variables: LATENCY_BATCH_SIZES, LATENCY_REPEATS, LATENCY_COLD_LOADS,
+    LATENCY_BUDGET_MS, LATENCY_BUDGET_BATCH_SIZE
+    """
+    if batch_sizes is None:
+        value = os.getenv("LATENCY_BATCH_SIZES", "")
+        batch_sizes = [int(v) for v in value.split(",") if v.strip()] or DEFAULT_BATCH_SIZES
+    repeats = repeats or int(os.getenv("LATENCY_REPEATS", 20))
+    cold_loads = cold_loads or int(os.getenv("LATENCY_COLD_LOADS", 3))
+    if budget_ms is None and os.getenv("LATENCY_BUDGET_MS"):
+        budget_ms = float(os.getenv("LATENCY_BUDGET_MS"))
+    budget_batch_size = budget_batch_size or int(os.getenv("LATENCY_BUDGET_BATCH_SIZE", 1))
+
+    profiles = {name: profile_artifact(path, X, batch_sizes, repeats, cold_loads, *options)
+                for name, (path, X, *options) in artifacts.items()}
+    served = served or next(iter(artifacts))
+    return {
+        "batch_sizes": list(batch_sizes),
+        "repeats": repeats,
+        "cold_loads": cold_loads,
+        "served": served,
+        "artifacts": profiles,
+        "latency_gate": check_latency_budget(profiles[served], budget_ms, budget_batch_size),
+    }
+
+
+def summarize_serving_profile(report):
+    """Résumé compact (p50/p99 à chaud, lignes/s, pic de RSS) pour les métadonnées du registry"""
+    return {
+        "served": report["served"],
+        "latency_gate": report["latency_gate"],
+        "artifacts": {
+            name: {
+                "peak_rss_mb": round(profile["peak_rss_mb"], 1),
+                "cold_start_p99_ms": round(profile["batches"][str(report["batch_sizes"][0])]
+                                           ["cold_ms"]["p99"], 3),
+                "batches": {batch_size: {"p50_ms": round(batch["warm_ms"]["p50"], 3),
+                                         "p99_ms": round(batch["warm_ms"]["p99"], 3),
+                                         "rows_per_s": round(batch["rows_per_s"])}
+                            for batch_size, batch in profile["batches"].items()},
+            }
+            for name, profile in report["artifacts"].items()
+        },
+    }
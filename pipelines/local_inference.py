@@ -0,0 +1,162 @@
+import os
+import pickle
+import time
+import numpy as np
+
+# Mêmes noms que config.pbtxt et le client Triton (scripts/triton_client.py)
+from triton_config import INPUT_NAME, LABEL_OUTPUT, OUTPUT_NAMES, PROBABILITIES_OUTPUT
+
+# Taille de batch au-delà de laquelle scikit-learn redevient plus rapide que la forêt
+# compilée (parcours NumPy niveau par niveau, cf. forest_compiler.py --batch-sizes)
+COMPILED_FOREST_MAX_BATCH = 256
+FOREST_BACKENDS = ("auto", "sklearn", "compiled")
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+
+
+def make_session_options(intra_op_threads=None, inter_op_threads=None,
+                         graph_optimization="all", parallel_execution=False):
+    """Options de session ONNX Runtime (threads, niveau d'optimisation du graphe)"""
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = getattr(ort.GraphOptimizationLevel,
+                                               GRAPH_OPTIMIZATION_LEVELS[graph_optimization])
+    if intra_op_threads:
+        options.intra_op_num_threads = intra_op_threads
+    if inter_op_threads:
+        options.inter_op_num_threads = inter_op_threads
+    options.execution_mode = (ort.ExecutionMode.ORT_PARALLEL if parallel_execution
+                              else ort.ExecutionMode.ORT_SEQUENTIAL)
+    return options
+
+
+class LocalInferenceBackend:
+    """
+    Backend d'inférence en process, sans réseau: charge iris_model.onnx (ou le pickle)
+    une seule fois et expose les mêmes formes de requête/réponse que le client Triton.
+    Avec le pickle, forest_backend choisit le prédicteur d'une forêt aléatoire:
+    "sklearn" (predict_proba), "compiled" (tableaux NumPy de forest_compiler) ou "auto"
+    (défaut: forêt compilée jusqu'à COMPILED_FOREST_MAX_BATCH lignes, sklearn au-delà).
+
+    - infer(rows) -> {"predictions", "probabilities", "shape"} comme TritonHTTPClient.infer
+    - infer_request(request) -> réponse v2 {"outputs": [...]} pour une requête v2 JSON
+    """
+
+    def __init__(self, model_path, intra_op_threads=None, inter_op_threads=None,
+                 graph_optimization="all", parallel_execution=False, forest_backend="auto"):
+        if forest_backend not in FOREST_BACKENDS:
+            raise ValueError(f"forest_backend inconnu: {forest_backend} "
+                             f"(attendu: {', '.join(FOREST_BACKENDS)})")
+        self.model_path = str(model_path)
+        self.model_name = os.path.splitext(os.path.basename(self.model_path))[0]
+        self.model_version = "local"
+        self.format = "onnx" if self.model_path.endswith(".onnx") else "pickle"
+        self.forest_backend = forest_backend
+
+        started = time.perf_counter()
+        if self.format == "onnx":
+            import onnxruntime as ort
+
+            options = make_session_options(intra_op_threads, inter_op_threads,
+                                           graph_optimization, parallel_execution)
+            self.session = ort.InferenceSession(self.model_path, sess_options=options,
+                                                providers=["CPUExecutionProvider"])
+            self.input_name = self.session.get_inputs()[0].name
+            self.output_names = [o.name for o in self.session.get_outputs()]
+            self.model = None
+            self.forest = None
+        else:
+            with open(self.model_path, "rb") as f:
+                self.model = pickle.load(f)
+            self.session = None
+            self.forest = None
+            if (forest_backend != "sklearn" and hasattr(self.model, "estimators_")
+                    and hasattr(self.model, "predict_proba")):
+                from forest_compiler import compile_forest
+                self.forest = compile_forest(self.model)
+            self.input_name = INPUT_NAME
+            self.output_names = OUTPUT_NAMES
+        self.load_time_s = time.perf_counter() - started
+
+    def _onnx_outputs(self, features):
+        """Exécute la session; sorties skl2onnx: label int64 [N] puis probabilités [N, C]"""
+        outputs = dict(zip(self.output_names,
+                           self.session.run(None, {self.input_name: features})))
+        label_name = next((n for n in self.output_names if LABEL_OUTPUT in n),
+                          self.output_names[0])
+        proba_name = next((n for n in self.output_names if "prob" in n), self.output_names[-1])
+        return outputs[label_name], outputs[proba_name]
+
+    def predict_with_proba(self, features):
+        """Retourne (predictions int64 [N], probabilities float32 [N, C])"""
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        if features.ndim == 1:
+            features = features.reshape(1, -1)
+
+        if self.session is not None:
+            predictions, probabilities = self._onnx_outputs(features)
+        else:
+            use_forest = self.forest is not None and (
+                self.forest_backend == "compiled" or len(features) <= COMPILED_FOREST_MAX_BATCH)
+            predictor = self.forest if use_forest else self.model
+            probabilities = predictor.predict_proba(features)
+            predictions = self.model.classes_[np.argmax(probabilities, axis=1)]
+        return (np.asarray(predictions, dtype=np.int64).reshape(len(features)),
+                np.asarray(probabilities, dtype=np.float32))
+
+    def predict(self, features):
+        return self.predict_with_proba(features)[0]
+
+    def infer(self, rows, timeout=None):
+        """Même contrat que TritonHTTPClient.infer (timeout ignoré, pas de réseau)"""
+        predictions, probabilities = self.predict_with_proba(rows)
+        return {"predictions": predictions, "probabilities": probabilities,
+                "shape": [len(predictions)]}
+
+    def infer_request(self, request, timeout=None):
+        """Exécute une requête v2 (format prepare_triton_request) et retourne une réponse v2"""
+        tensor = request["inputs"][0]
+        features = np.asarray(tensor["data"], dtype=np.float32).reshape(tensor["shape"])
+        predictions, probabilities = self.predict_with_proba(features)
+
+        requested = [o["name"] for o in request.get("outputs") or []] or OUTPUT_NAMES
+        available = {
+            LABEL_OUTPUT: {"datatype": "INT64", "shape": list(predictions.shape),
+                           "data": predictions.tolist()},
+            PROBABILITIES_OUTPUT: {"datatype": "FP32", "shape": list(probabilities.shape),
+                                   "data": probabilities.ravel().tolist()},
+        }
+        return {
+            "model_name": self.model_name,
+            "model_version": self.model_version,
+            "outputs": [{"name": name, **available[name]} for name in requested]
+        }
+
+    def close(self):
+        self.session = None
+        self.model = None
+        self.forest = None
+
+
+def check_parity(backend, model, X, n_rows=None, atol=1e-5, reference_dtype=np.float32):
+    """
+    Compare les prédictions du backend local à celles du modèle scikit-learn
+    Le backend reçoit X en float32 (contrat Triton); le modèle de référence reçoit ces mêmes
+    valeurs en reference_dtype. Cohérent: aucune prédiction différente et probabilités à atol près
+    Retourne (cohérent, nb de prédictions différentes, écart max des probabilités)
+    """
+    X_check = np.asarray(X[:n_rows] if n_rows else X, dtype=np.float32)
+    predictions, probabilities = backend.predict_with_proba(X_check)
+    X_reference = X_check.astype(reference_dtype)
+    sklearn_pred = model.predict(X_reference)
+    sklearn_proba = model.predict_proba(X_reference)
+
+    mismatches = int(np.sum(predictions != sklearn_pred))
+    max_proba_diff = float(np.max(np.abs(probabilities - sklearn_proba))) if len(X_check) else 0.0
+    return mismatches == 0 and max_proba_diff <= atol, mismatches, max_proba_diff
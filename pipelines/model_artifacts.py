@@ -0,0 +1,177 @@
+import json
+import os
+import time
+
+from step_cache import file_digest
+
+MANIFEST_NAME = "artifacts.json"
+FORMAT_VERSION = 1
+DEFAULT_OPSETS = (11, 9)
+
+
+def onnx_artifact_name(opset, primary_opset, stem="iris_model"):
+    """iris_model.onnx pour l'opset principal, iris_model.opset<N>.onnx pour les autres"""
+    return f"{stem}.onnx" if opset == primary_opset else f"{stem}.opset{opset}.onnx"
+
+
+def _tensor_spec(value_info):
+    import onnx
+
+    tensor_type = value_info.type.tensor_type
+    return {
+        "name": value_info.name,
+        "dtype": onnx.TensorProto.DataType.Name(tensor_type.elem_type).lower(),
+        "shape": [dim.dim_value if dim.HasField("dim_value") else None
+                  for dim in tensor_type.shape.dim],
+    }
+
+
+def describe_onnx(model):
+    """Opsets par domaine et tenseurs d'entrée/sortie d'un ModelProto"""
+    return {
+        "opsets": {(opset.domain or "ai.onnx"): opset.version for opset in model.opset_import},
+        "inputs": [_tensor_spec(value) for value in model.graph.input],
+        "outputs": [_tensor_spec(value) for value in model.graph.output],
+    }
+
+
+def _with_opset(model, opset):
+    """
+    Dérive le graphe pour un autre opset du domaine par défaut avec onnx.version_converter
+    (les noeuds ai.onnx.ml sont inchangés). L'opset_import est dédoublonné: skl2onnx
+    peut déclarer deux fois le domaine par défaut.
+    """
+    from onnx import helper, version_converter
+
+    converted = version_converter.convert_version(model, opset)
+    versions = {}
+    for entry in converted.opset_import:
+        versions[entry.domain] = max(versions.get(entry.domain, 0), entry.version)
+    versions[""] = opset
+    del converted.opset_import[:]
+    converted.opset_import.extend(helper.make_opsetid(domain, version)
+                                  for domain, version in sorted(versions.items()))
+    return converted
+
+
+def export_onnx_opsets(model, n_features, scaler, output_path, opsets=DEFAULT_OPSETS):
+    """
+    Exporte scaler + forêt pour plusieurs opsets en une seule conversion skl2onnx
+    (au plus petit opset), les autres étant dérivés par onnx.version_converter;
+    skl2onnx n'est rappelé que si la dérivation échoue.
+    Le premier opset de la liste donne iris_model.onnx.
+    Retourne {opset: chemin}
+    """
+    import onnx
+    from onnx_export import convert_to_onnx
+
+    opsets = [int(opset) for opset in opsets]
+    base_opset = min(opsets)
+    base = convert_to_onnx(model, n_features, scaler=scaler, target_opset=base_opset)
+
+    paths = {}
+    for opset in opsets:
+        if opset == base_opset:
+            onnx_model = base
+        else:
+            try:
+                onnx_model = _with_opset(base, opset)
+                onnx.checker.check_model(onnx_model)
+            except Exception as e:
+                print(f"⚠️  Dérivation opset {opset} impossible ({e}) - conversion skl2onnx")
+                onnx_model = convert_to_onnx(model, n_features, scaler=scaler,
+                                             target_opset=opset)
+        path = os.path.join(output_path, onnx_artifact_name(opset, opsets[0]))
+        with open(path, "wb") as f:
+            f.write(onnx_model.SerializeToString())
+        paths[opset] = path
+    return paths
+
+
+def artifact_entry(path, artifact_format, **extra):
+    return {
+        "file": os.path.basename(path),
+        "format": artifact_format,
+        "sha256": file_digest(path),
+        "size_bytes": os.path.getsize(path),
+        **extra,
+    }
+
+
+def onnx_entry(path, target_opset, **extra):
+    import onnx
+
+    description = describe_onnx(onnx.load(path))
+    return artifact_entry(path, "onnx", target_opset=int(target_opset), **description, **extra)
+
+
+def write_artifact_manifest(output_path, entries, metadata=None):
+    """Écrit models/artifacts.json de façon atomique (fichier temporaire puis rename)"""
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "created_at": time.time(),
+        "artifacts": entries,
+        "metadata": metadata or {},
+    }
+    manifest_path = os.path.join(output_path, MANIFEST_NAME)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+
+def read_artifact_manifest(model_dir="models"):
+    """Manifeste des artefacts du modèle (None s'il est absent)"""
+    manifest_path = os.path.join(model_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def verify_artifact(model_dir, entry):
+    """Vérifie taille et SHA-256 d'un artefact du manifeste; retourne son chemin"""
+    path = os.path.join(model_dir, entry["file"])
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} absent (référencé par {MANIFEST_NAME})")
+    if os.path.getsize(path) != entry["size_bytes"] or file_digest(path) != entry["sha256"]:
+        raise ValueError(f"{path} ne correspond pas à son empreinte dans {MANIFEST_NAME}")
+    return path
+
+
+def find_artifact(manifest, artifact_format, target_opset=None):
+    for entry in manifest["artifacts"]:
+        if entry["format"] != artifact_format:
+            continue
+        if target_opset is None or entry.get("target_opset") == int(target_opset):
+            return entry
+    return None
+
+
+def resolve_onnx_artifact(model_dir="models", target_opset=9, n_features=None):
+    """
+    Modèle ONNX exporté par train_model.py pour l'opset demandé, après vérification
+    des empreintes du pickle (le modèle évalué est bien celui qui a été converti)
+    et de l'ONNX, et du nombre de features en entrée
+    Retourne (chemin, entrée du manifeste); lève une exception si l'artefact est inutilisable
+    """
+    manifest = read_artifact_manifest(model_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"{os.path.join(model_dir, MANIFEST_NAME)} absent")
+
+    source = find_artifact(manifest, "sklearn")
+    if source is None:
+        raise ValueError(f"Modèle scikit-learn absent de {MANIFEST_NAME}")
+    verify_artifact(model_dir, source)
+
+    entry = find_artifact(manifest, "onnx", target_opset)
+    if entry is None:
+        available = [e.get("target_opset") for e in manifest["artifacts"] if e["format"] == "onnx"]
+        raise ValueError(f"Opset {target_opset} non exporté (disponibles: {available})")
+    path = verify_artifact(model_dir, entry)
+
+    if n_features is not None and entry["inputs"][0]["shape"][-1] != n_features:
+        raise ValueError(f"Entrée {entry['inputs'][0]['name']} de {entry['file']}: "
+                         f"{entry['inputs'][0]['shape']} au lieu de [None, {n_features}]")
+    return path, entry
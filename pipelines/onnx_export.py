@@ -0,0 +1,128 @@
+import os
+import pickle
+
+import numpy as np
+
+from triton_config import INPUT_NAME
+
+# Écart max toléré entre probabilités ONNX et scikit-learn (arrondis float32 des feuilles)
+PARITY_ATOL = 1e-5
+
+
+def load_scaler(data_path="data"):
+    """Charge le StandardScaler ajusté par data_preprocessing.py (None s'il est absent)"""
+    scaler_path = os.path.join(data_path, "scaler.pkl")
+    if not os.path.exists(scaler_path):
+        return None
+    with open(scaler_path, "rb") as f:
+        return pickle.load(f)
+
+
+def load_model_scaler(model_dir="models", data_path="data"):
+    """
+    Scaler intégré au modèle (models/scaler.pkl, écrit par train_model.py); à défaut
+    celui des données. Après un entraînement incrémental, il peut différer de data/scaler.pkl
+    """
+    scaler = load_scaler(model_dir)
+    return scaler if scaler is not None else load_scaler(data_path)
+
+
+def rescale(X_scaled, from_scaler, to_scaler):
+    """Ramène des features normalisées par from_scaler dans l'espace de to_scaler"""
+    if from_scaler is None or to_scaler is None or from_scaler is to_scaler:
+        return X_scaled
+    if (np.array_equal(from_scaler.mean_, to_scaler.mean_)
+            and np.array_equal(from_scaler.scale_, to_scaler.scale_)):
+        return X_scaled
+    return to_scaler.transform(from_scaler.inverse_transform(X_scaled))
+
+
+def serving_pipeline(model, scaler=None):
+    """
+    Pipeline scikit-learn servi: scaler + forêt déjà ajustés, sans ré-entraînement
+    Sans scaler, le modèle est retourné tel quel
+    """
+    if scaler is None:
+        return model
+    from sklearn.pipeline import Pipeline
+    return Pipeline([("scaler", scaler), ("classifier", model)])
+
+
+def _prepend_double_scaler(onnx_model, scaler, input_name=INPUT_NAME):
+    """
+    Ajoute la normalisation en tête du graphe de la forêt, calculée en double comme
+    StandardScaler.transform puis arrondie en float32 comme le fait l'arbre scikit-learn:
+    Cast(double) -> Sub(mean_) -> Div(scale_) -> Cast(float).
+    L'opérateur Scaler d'ai.onnx.ml calcule en float32 et fait basculer des seuils.
+    """
+    from onnx import TensorProto, helper, numpy_helper
+
+    graph = onnx_model.graph
+    forest_input = graph.input[0]
+    n_features = scaler.n_features_in_
+    mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(n_features)
+    scale = scaler.scale_ if scaler.scale_ is not None else np.ones(n_features)
+
+    graph.initializer.extend([
+        numpy_helper.from_array(np.asarray(mean, dtype=np.float64), "scaler_mean"),
+        numpy_helper.from_array(np.asarray(scale, dtype=np.float64), "scaler_scale"),
+    ])
+    scaler_nodes = [
+        helper.make_node("Cast", [input_name], ["raw_double"], to=TensorProto.DOUBLE,
+                         name="scaler_cast_double"),
+        helper.make_node("Sub", ["raw_double", "scaler_mean"], ["centered"], name="scaler_sub"),
+        helper.make_node("Div", ["centered", "scaler_scale"], ["scaled_double"],
+                         name="scaler_div"),
+        helper.make_node("Cast", ["scaled_double"], [forest_input.name], to=TensorProto.FLOAT,
+                         name="scaler_cast_float"),
+    ]
+    nodes = scaler_nodes + list(graph.node)
+    del graph.node[:]
+    graph.node.extend(nodes)
+
+    raw_input = helper.make_tensor_value_info(input_name, TensorProto.FLOAT, [None, n_features])
+    del graph.input[:]
+    graph.input.append(raw_input)
+    return onnx_model
+
+
+def convert_to_onnx(model, n_features, scaler=None, target_opset=11):
+    """
+    Convertit scaler + forêt en un seul graphe ONNX (normalisation en double -> TreeEnsembleClassifier)
+    Entrée: float_input [N, n_features] en unités brutes (cm); sorties label et probabilities
+    """
+    from skl2onnx import convert_sklearn
+    from skl2onnx.common.data_types import FloatTensorType
+
+    forest_input = "scaled_input" if scaler is not None else INPUT_NAME
+    onnx_model = convert_sklearn(
+        model,
+        initial_types=[(forest_input, FloatTensorType([None, n_features]))],
+        target_opset=target_opset,
+        options={id(model): {"zipmap": False}}  # Sortie simplifiée
+    )
+    if scaler is not None:
+        _prepend_double_scaler(onnx_model, scaler)
+    return onnx_model
+
+
+def raw_features(X_scaled, scaler=None):
+    """Retrouve les features brutes envoyées par les clients à partir des données normalisées"""
+    if scaler is None:
+        return np.asarray(X_scaled)
+    return scaler.inverse_transform(X_scaled)
+
+
+def check_fused_parity(backend, model, X_scaled, scaler=None, atol=PARITY_ATOL):
+    """
+    Parité du graphe fusionné: backend ONNX et pipeline scikit-learn (scaler + forêt)
+    reçoivent les mêmes features brutes float32, reconstruites à partir des données normalisées.
+    La référence normalise en double comme à l'entraînement (en float32, StandardScaler
+    arrondit différemment et fait lui-même basculer des seuils)
+    Retourne (cohérent, nb de prédictions différentes, écart max des probabilités)
+    """
+    from local_inference import check_parity
+
+    X_raw = np.asarray(raw_features(X_scaled, scaler), dtype=np.float32)
+    return check_parity(backend, serving_pipeline(model, scaler), X_raw, atol=atol,
+                        reference_dtype=np.float64)
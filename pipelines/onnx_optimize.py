@@ -0,0 +1,196 @@
+import os
+import statistics
+import time
+
+import numpy as np
+
+from local_inference import make_session_options
+
+TREE_OPS = ("TreeEnsembleClassifier", "TreeEnsembleRegressor")
+
+# Attributs optionnels dont la valeur par défaut est implicite dans la spec ai.onnx.ml
+DEFAULT_TREE_ATTRIBUTES = {
+    "nodes_hitrates": 1.0,
+    "nodes_missing_value_tracks_true": 0,
+}
+
+FP16_MAX = float(np.finfo(np.float16).max)
+
+
+def _tree_nodes(model):
+    return [node for node in model.graph.node if node.op_type in TREE_OPS]
+
+
+def strip_default_attributes(model):
+    """
+    Supprime les attributs d'arbres égaux partout à leur valeur par défaut
+    (nodes_hitrates=1.0, nodes_missing_value_tracks_true=0) et les doc_string
+    Retourne le nombre d'attributs supprimés
+    """
+    from onnx import helper
+
+    removed = 0
+    model.doc_string = ""
+    for node in model.graph.node:
+        node.doc_string = ""
+    for node in _tree_nodes(model):
+        kept = []
+        for attribute in node.attribute:
+            default = DEFAULT_TREE_ATTRIBUTES.get(attribute.name)
+            values = helper.get_attribute_value(attribute) if default is not None else None
+            if default is not None and all(v == default for v in values):
+                removed += 1
+            else:
+                kept.append(attribute)
+        del node.attribute[:]
+        node.attribute.extend(kept)
+    return removed
+
+
+def round_tree_values(model, names=("nodes_values", "class_weights", "target_weights")):
+    """
+    Arrondit seuils et valeurs des feuilles à la précision float16 (stockés en float32:
+    le graphe reste exécutable par tout runtime ONNX). Retourne False si une valeur
+    dépasse la plage float16, auquel cas le modèle n'est pas modifié.
+    """
+    from onnx import helper
+
+    attributes = [a for node in _tree_nodes(model) for a in node.attribute if a.name in names]
+    rounded = []
+    for attribute in attributes:
+        values = np.asarray(helper.get_attribute_value(attribute), dtype=np.float32)
+        if values.size and np.max(np.abs(values)) > FP16_MAX:
+            return False
+        rounded.append(values.astype(np.float16).astype(np.float32))
+    for attribute, values in zip(attributes, rounded):
+        del attribute.floats[:]
+        attribute.floats.extend(values.tolist())
+    return bool(attributes)
+
+
+def optimize_offline(src_path, dst_path, level="basic", ort_format=False):
+    """
+    Applique hors ligne les optimisations de graphe ONNX Runtime et sauvegarde le résultat
+    (format .ort si ort_format). Le niveau "basic" reste portable entre versions/machines.
+    """
+    import onnxruntime as ort
+
+    options = make_session_options(graph_optimization=level)
+    options.optimized_model_filepath = str(dst_path)
+    if ort_format:
+        options.add_session_config_entry("session.save_model_format", "ORT")
+    ort.InferenceSession(str(src_path), sess_options=options, providers=["CPUExecutionProvider"])
+    return str(dst_path)
+
+
+def benchmark_models(model_paths, X, y=None, batch_sizes=(1, 64, 1024), repeats=50, loads=3):
+    """
+    Taille, temps de chargement médian, latence médiane par taille de batch et accuracy
+    Les mesures alternent entre modèles à chaque répétition pour que la dérive de la
+    machine (fréquence CPU, voisins) pèse de la même façon sur tous les candidats
+    """
+    from local_inference import LocalInferenceBackend
+
+    backends, load_times = {}, {}
+    for name, path in model_paths.items():
+        times = []
+        for _ in range(loads):
+            backends[name] = LocalInferenceBackend(path)
+            times.append(backends[name].load_time_s)
+        load_times[name] = statistics.median(times) * 1000.0
+
+    X = np.asarray(X, dtype=np.float32)
+    latencies = {name: {} for name in model_paths}
+    for batch_size in batch_sizes:
+        batch = np.resize(X, (batch_size, X.shape[1]))
+        timings = {name: [] for name in model_paths}
+        for backend in backends.values():
+            backend.predict_with_proba(batch)  # warm-up
+        for _ in range(repeats):
+            for name, backend in backends.items():
+                started = time.perf_counter()
+                backend.predict_with_proba(batch)
+                timings[name].append(time.perf_counter() - started)
+        for name in model_paths:
+            latencies[name][str(batch_size)] = statistics.median(timings[name]) * 1000.0
+
+    results = {}
+    for name, path in model_paths.items():
+        predictions = backends[name].predict(X)
+        results[name] = {
+            "path": str(path),
+            "size_bytes": os.path.getsize(path),
+            "load_ms": load_times[name],
+            "latency_ms": latencies[name],
+            "latency_score_ms": sum(latencies[name].values()),
+            "accuracy": float(np.mean(predictions == y)) if y is not None else None,
+            "predictions": predictions,
+        }
+    return results
+
+
+def optimize_onnx_model(onnx_path, X, y, output_dir=None, level=None, save_ort=None,
+                        batch_sizes=(1, 64, 1024)):
+    """
+    Produit les variantes du modèle exporté et retient la plus rapide à accuracy égale
+    - baseline: modèle exporté tel quel
+    - optimized: attributs par défaut supprimés + optimisations ORT hors ligne
+    - optimized_fp16: idem avec seuils/feuilles arrondis en float16
+    Retourne (chemin du modèle retenu, rapport sérialisable JSON)
+    """
+    import onnx
+
+    level = level or os.getenv("ONNX_OPTIMIZATION_LEVEL", "basic")
+    if save_ort is None:
+        save_ort = os.getenv("ONNX_SAVE_ORT", "false").lower() == "true"
+    output_dir = str(output_dir or os.path.dirname(str(onnx_path)) or ".")
+    stem = os.path.splitext(os.path.basename(str(onnx_path)))[0]
+
+    candidates = {"baseline": str(onnx_path)}
+
+    compact = onnx.load(str(onnx_path))
+    stripped = strip_default_attributes(compact)
+    compact_path = os.path.join(output_dir, f"{stem}.compact.onnx")
+    onnx.save(compact, compact_path)
+    candidates["optimized"] = optimize_offline(
+        compact_path, os.path.join(output_dir, f"{stem}.optimized.onnx"), level)
+
+    if round_tree_values(compact):
+        fp16_path = os.path.join(output_dir, f"{stem}.fp16.onnx")
+        onnx.save(compact, fp16_path)
+        candidates["optimized_fp16"] = optimize_offline(
+            fp16_path, os.path.join(output_dir, f"{stem}.optimized_fp16.onnx"), level)
+        os.remove(fp16_path)
+    os.remove(compact_path)
+
+    results = benchmark_models(candidates, X, y, batch_sizes)
+    baseline = results["baseline"]
+    baseline_predictions = baseline["predictions"]
+    for result in results.values():
+        predictions = result.pop("predictions")
+        result["prediction_mismatches"] = int(np.sum(predictions != baseline_predictions))
+        result["eligible"] = (result["accuracy"] is None
+                              or result["accuracy"] >= baseline["accuracy"])
+
+    eligible = {name: r for name, r in results.items() if r["eligible"]}
+    winner = min(eligible, key=lambda name: eligible[name]["latency_score_ms"])
+
+    report = {
+        "optimization_level": level,
+        "stripped_attributes": stripped,
+        "batch_sizes": list(batch_sizes),
+        "candidates": results,
+        "winner": winner,
+    }
+
+    if save_ort:
+        ort_path = optimize_offline(candidates[winner],
+                                    os.path.join(output_dir, f"{stem}.ort"), level, ort_format=True)
+        report["ort_format"] = {
+            "path": ort_path,
+            "size_bytes": os.path.getsize(ort_path),
+            "note": "format .ort pour ONNX Runtime embarqué; Triton charge le .onnx retenu",
+        }
+
+    return candidates[winner], report
+
@@ -0,0 +1,160 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from step_cache import file_digest
+
+CHECKSUM_METADATA = "sha256"
+MB = 1024 * 1024
+
+
+def s3_client(endpoint_url=None):
+    """
+    Client S3 compatible (MinIO): AWS_S3_ENDPOINT, AWS_S3_FORCE_PATH_STYLE et les
+    identifiants AWS_* standards; pool de connexions dimensionné pour les envois concurrents
+    """
+    import boto3
+    from botocore.config import Config
+
+    path_style = os.getenv("AWS_S3_FORCE_PATH_STYLE", "true").lower() == "true"
+    config = Config(
+        s3={"addressing_style": "path" if path_style else "auto"},
+        max_pool_connections=int(os.getenv("S3_MAX_POOL_CONNECTIONS", 32)),
+        retries={"max_attempts": 5, "mode": "standard"},
+    )
+    return boto3.client("s3", endpoint_url=endpoint_url or os.getenv("AWS_S3_ENDPOINT"),
+                        config=config)
+
+
+def transfer_config():
+    """
+    Multipart au-delà de S3_MULTIPART_THRESHOLD_MB, parts de S3_MULTIPART_CHUNK_MB envoyées
+    par S3_PART_CONCURRENCY threads; les fichiers sont lus par parts, jamais en entier
+    """
+    from boto3.s3.transfer import TransferConfig
+
+    return TransferConfig(
+        multipart_threshold=int(os.getenv("S3_MULTIPART_THRESHOLD_MB", 8)) * MB,
+        multipart_chunksize=int(os.getenv("S3_MULTIPART_CHUNK_MB", 8)) * MB,
+        max_concurrency=int(os.getenv("S3_PART_CONCURRENCY", 8)),
+        use_threads=True,
+    )
+
+
+def s3_uri(bucket, key):
+    return f"s3://{bucket}/{key}"
+
+
+def _is_missing(error):
+    return error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound",
+                                                           "NoSuchBucket")
+
+
+def ensure_bucket(client, bucket):
+    """Crée le bucket s'il n'existe pas (MinIO ou moto vierges)"""
+    from botocore.exceptions import ClientError
+
+    try:
+        client.head_bucket(Bucket=bucket)
+    except ClientError as e:
+        if not _is_missing(e):
+            raise
+        client.create_bucket(Bucket=bucket)
+        print(f"🪣 Bucket {bucket} créé")
+
+
+def remote_checksum(client, bucket, key):
+    """SHA-256 enregistré dans les métadonnées de l'objet (None si l'objet est absent)"""
+    from botocore.exceptions import ClientError
+
+    try:
+        response = client.head_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        if _is_missing(e):
+            return None
+        raise
+    return response.get("Metadata", {}).get(CHECKSUM_METADATA)
+
+
+def _upload_file(client, config, bucket, path, key):
+    size = os.path.getsize(path)
+    digest = file_digest(path)
+    if remote_checksum(client, bucket, key) == digest:
+        return {"key": key, "size_bytes": size, "sha256": digest, "status": "skipped"}
+
+    started = time.perf_counter()
+    client.upload_file(path, bucket, key, ExtraArgs={"Metadata": {CHECKSUM_METADATA: digest}},
+                       Config=config)
+    return {"key": key, "size_bytes": size, "sha256": digest, "status": "uploaded",
+            "duration_s": time.perf_counter() - started}
+
+
+def _local_files(paths, prefix):
+    """(chemin local, clé) pour des fichiers et arborescences; la clé garde le dernier répertoire"""
+    for path in paths:
+        path = os.path.normpath(str(path))
+        parent = os.path.dirname(path)
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    local = os.path.join(root, name)
+                    yield local, "/".join([prefix, os.path.relpath(local, parent).replace(os.sep, "/")])
+        elif os.path.isfile(path):
+            yield path, f"{prefix}/{os.path.basename(path)}"
+        else:
+            raise FileNotFoundError(path)
+
+
+def upload_paths(paths, bucket, prefix, client=None, config=None, workers=None):
+    """
+    Envoie fichiers et arborescences sous s3://<bucket>/<prefix>/, plusieurs fichiers à la fois
+    (S3_UPLOAD_WORKERS) et chacun en multipart concurrent; les objets dont le SHA-256
+    (métadonnée x-amz-meta-sha256) correspond déjà sont ignorés.
+    Retourne un rapport sérialisable JSON avec la liste des objets
+    """
+    client = client or s3_client()
+    config = config or transfer_config()
+    workers = workers or int(os.getenv("S3_UPLOAD_WORKERS", 4))
+    prefix = prefix.strip("/")
+
+    ensure_bucket(client, bucket)
+    files = list(_local_files(paths, prefix))
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(files) or 1))) as pool:
+        objects = list(pool.map(lambda item: _upload_file(client, config, bucket, *item), files))
+    duration = time.perf_counter() - started
+
+    uploaded = [o for o in objects if o["status"] == "uploaded"]
+    uploaded_bytes = sum(o["size_bytes"] for o in uploaded)
+    return {
+        "bucket": bucket,
+        "prefix": prefix,
+        "endpoint": client.meta.endpoint_url,
+        "objects": objects,
+        "uploaded": len(uploaded),
+        "skipped": len(objects) - len(uploaded),
+        "uploaded_bytes": uploaded_bytes,
+        "duration_s": duration,
+        "throughput_mb_s": uploaded_bytes / MB / duration if duration and uploaded else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Envoi d'artefacts vers S3/MinIO")
+    parser.add_argument("paths", nargs="+", help="Fichiers ou répertoires (ex: models/iris_model)")
+    parser.add_argument("--bucket", default=os.getenv("AWS_S3_BUCKET", "mlpipeline"))
+    parser.add_argument("--prefix", default="models")
+    parser.add_argument("--endpoint", default=None, help="Défaut: AWS_S3_ENDPOINT")
+    args = parser.parse_args()
+
+    report = upload_paths(args.paths, args.bucket, args.prefix, client=s3_client(args.endpoint))
+    for item in report["objects"]:
+        print(f"  {'⬆️' if item['status'] == 'uploaded' else '⏭️'} "
+              f"{s3_uri(report['bucket'], item['key'])} ({item['size_bytes']} bytes)")
+    print(json.dumps({k: v for k, v in report.items() if k != "objects"}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+CACHE_FORMAT_VERSION = 1
+MANIFEST_NAME = "_manifest.json"
+KFP_METRICS_FILE = "mlpipeline-metrics.json"
+
+
+def file_digest(path, block_size=1 << 20):
+    """SHA-256 du contenu d'un fichier, lu par blocs"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def module_paths(*names):
+    """Chemins des modules du pipeline (même répertoire que ce fichier), pour la version du code"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    return [os.path.join(here, name) for name in names]
+
+
+def env_params(*prefixes):
+    """Variables d'environnement du pipeline commençant par l'un des préfixes"""
+    return {key: value for key, value in sorted(os.environ.items())
+            if key.startswith(prefixes)}
+
+
+def library_versions(*names):
+    """Versions des bibliothèques installées (None si absentes), sans les importer"""
+    from importlib import metadata
+
+    versions = {}
+    for name in names:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+
+def _iter_files(paths):
+    """Fichiers (chemins relatifs) désignés par une liste de fichiers et de répertoires"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    yield os.path.join(root, name)
+        elif os.path.exists(path):
+            yield path
+
+
+def cache_relative_path(path):
+    """
+    Chemin d'une sortie relatif au répertoire de l'étape, sous lequel elle est stockée puis
+    restaurée; une sortie hors de ce répertoire (../, autre racine) lève ValueError
+    """
+    relative = os.path.relpath(os.path.abspath(path))
+    if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+        raise ValueError(f"Sortie hors du répertoire de l'étape ({os.getcwd()}), "
+                         f"non cacheable: {path}")
+    return relative
+
+
+def compute_cache_key(step, inputs=(), code=(), params=None):
+    """
+    Clé de cache: hash du nom de l'étape, du contenu des entrées et du code, et des
+    paramètres (hyperparamètres, opset, versions des bibliothèques)
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps({"step": step, "format": CACHE_FORMAT_VERSION,
+                              "python": sys.version_info[:2]}).encode())
+    for label, paths in (("input", inputs), ("code", code)):
+        for path in sorted(_iter_files(paths)):
+            name = os.path.basename(path) if label == "code" else os.path.normpath(path)
+            digest.update(f"{label}:{name}:{file_digest(path)}".encode())
+    digest.update(json.dumps(params or {}, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+class LocalStepCache:
+    """Cache sur disque (volume monté): <root>/<étape>/<clé>/..."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def describe(self):
+        return f"local:{self.root}"
+
+    def _entry(self, step, key):
+        return os.path.join(self.root, step, key)
+
+    def restore(self, step, key):
+        entry = self._entry(step, key)
+        manifest_path = os.path.join(entry, MANIFEST_NAME)
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        for relative in manifest["files"]:
+            target = os.path.normpath(relative)
+            os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+            shutil.copy2(os.path.join(entry, relative), target)
+        return manifest
+
+    def store(self, step, key, files, manifest):
+        entry = self._entry(step, key)
+        if os.path.exists(os.path.join(entry, MANIFEST_NAME)):
+            return
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        staging = tempfile.mkdtemp(dir=os.path.dirname(entry))
+        for relative in files:
+            destination = os.path.join(staging, relative)
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            shutil.copy2(relative, destination)
+        with open(os.path.join(staging, MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f, indent=2)
+        try:
+            os.replace(staging, entry)
+        except OSError:
+            # Entrée écrite entre-temps par une exécution concurrente
+            shutil.rmtree(staging, ignore_errors=True)
+
+
+class S3StepCache:
+    """
+    Cache sur stockage compatible S3 (MinIO): s3://<bucket>/<prefix>/<étape>/<clé>/...
+    Le manifeste est écrit en dernier et sert de marqueur d'entrée complète
+    """
+
+    def __init__(self, bucket, prefix="step-cache", endpoint_url=None):
+        import boto3
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+
+    def describe(self):
+        return f"s3://{self.bucket}/{self.prefix}"
+
+    def _key(self, step, key, relative):
+        return f"{self.prefix}/{step}/{key}/{relative.replace(os.sep, '/')}"
+
+    def restore(self, step, key):
+        try:
+            response = self.client.get_object(Bucket=self.bucket,
+                                              Key=self._key(step, key, MANIFEST_NAME))
+        except self.client.exceptions.NoSuchKey:
+            return None
+        manifest = json.loads(response["Body"].read())
+        for relative in manifest["files"]:
+            target = os.path.normpath(relative)
+            os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+            self.client.download_file(self.bucket, self._key(step, key, relative), target)
+        return manifest
+
+    def store(self, step, key, files, manifest):
+        for relative in files:
+            self.client.upload_file(relative, self.bucket, self._key(step, key, relative))
+        self.client.put_object(Bucket=self.bucket, Key=self._key(step, key, MANIFEST_NAME),
+                               Body=json.dumps(manifest, indent=2).encode())
+
+
+def cache_from_env():
+    """
+    STEP_CACHE=off|local|s3 (défaut: local si STEP_CACHE_DIR est défini,
+    s3 si STEP_CACHE_BUCKET est défini, sinon désactivé)
+    """
+    mode = os.getenv("STEP_CACHE", "").lower()
+    if not mode:
+        mode = ("local" if os.getenv("STEP_CACHE_DIR")
+                else "s3" if os.getenv("STEP_CACHE_BUCKET") else "off")
+    if mode == "local":
+        return LocalStepCache(os.getenv("STEP_CACHE_DIR", ".step-cache"))
+    if mode == "s3":
+        bucket = os.getenv("STEP_CACHE_BUCKET") or os.getenv("AWS_S3_BUCKET")
+        return S3StepCache(bucket, os.getenv("STEP_CACHE_PREFIX", "step-cache"),
+                           endpoint_url=os.getenv("AWS_S3_ENDPOINT"))
+    return None
+
+
+def log_kfp_metrics(metrics, path=KFP_METRICS_FILE):
+    """Ajoute des métriques numériques au fichier mlpipeline-metrics.json lu par KFP"""
+    existing = []
+    if os.path.exists(path):
+        with open(path) as f:
+            existing = json.load(f).get("metrics", [])
+    names = set(metrics)
+    entries = [m for m in existing if m["name"] not in names]
+    entries += [{"name": name, "numberValue": float(value), "format": "RAW"}
+                for name, value in metrics.items()]
+    with open(path, "w") as f:
+        json.dump({"metrics": entries}, f, indent=2)
+
+
+def run_cached(step, fn, outputs, inputs=(), code=(), params=None, cache=None):
+    """
+    Exécute fn() sauf si une entrée de cache existe pour (entrées, code, paramètres);
+    sinon restaure les sorties (fichiers ou répertoires) depuis le cache.
+    outputs peut être une fonction appelée après fn() quand les sorties en dépendent.
+    Les sorties sont des chemins relatifs ou absolus sous le répertoire courant (ValueError sinon).
+    Retourne (hit, résultat de fn ou None sur hit). Les erreurs du cache ne font
+    jamais échouer l'étape: elle est alors simplement exécutée.
+    """
+    cache = cache if cache is not None else cache_from_env()
+    started = time.perf_counter()
+    if cache is None:
+        return False, fn()
+    if not callable(outputs):
+        for path in outputs:
+            cache_relative_path(path)
+
+    key = None
+    try:
+        key = compute_cache_key(step, inputs, code, params)
+        manifest = cache.restore(step, key)
+    except Exception as e:
+        print(f"⚠️ Cache {step} indisponible ({e}) - exécution normale")
+        manifest = None
+
+    if manifest is not None:
+        elapsed = time.perf_counter() - started
+        print(f"♻️ Cache {step}: HIT {key[:12]} ({cache.describe()}), "
+              f"{len(manifest['files'])} fichier(s) restauré(s) en {elapsed:.2f}s")
+        log_kfp_metrics({f"{step}-cache-hit": 1, f"{step}-duration-seconds": elapsed})
+        return True, None
+
+    print(f"🔎 Cache {step}: MISS {key[:12] if key else '-'} ({cache.describe()})")
+    result = fn()
+    elapsed = time.perf_counter() - started
+
+    if key is not None:
+        files = sorted({cache_relative_path(path) for path in
+                        _iter_files(outputs() if callable(outputs) else outputs)})
+        try:
+            manifest = {"step": step, "key": key, "created_at": time.time(),
+                        "duration_s": elapsed, "params": params or {}, "files": files}
+            cache.store(step, key, files, manifest)
+            print(f"💾 Cache {step}: {len(files)} fichier(s) enregistré(s)")
+        except Exception as e:
+            print(f"⚠️ Écriture du cache {step} impossible: {e}")
+    log_kfp_metrics({f"{step}-cache-hit": 0, f"{step}-duration-seconds": elapsed})
+    return False, result
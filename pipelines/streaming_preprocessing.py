@@ -0,0 +1,297 @@
+import csv
+import itertools
+import os
+import pickle
+import tempfile
+
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+from artifact_store import create_array, register_arrays
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+def iter_csv_chunks(path, target_column, chunk_size):
+    """CSV avec en-tête; toutes les colonnes sauf la cible sont des features"""
+    with open(path, "r", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        if target_column not in header:
+            raise ValueError(f"Colonne cible {target_column!r} absente de {path}: {header}")
+        target_index = header.index(target_column)
+        feature_index = [i for i in range(len(header)) if i != target_index]
+        feature_names = [header[i] for i in feature_index]
+
+        def rows():
+            for row in reader:
+                if not row:
+                    continue
+                if len(row) != len(header):
+                    raise ValueError(f"{path}, ligne {reader.line_num}: {len(row)} colonne(s), "
+                                     f"{len(header)} attendue(s) d'après l'en-tête")
+                yield row
+
+        rows = rows()
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                return
+            table = np.asarray(chunk, dtype=object)
+            yield feature_names, table[:, feature_index].astype(np.float64), table[:, target_index]
+
+
+def iter_parquet_chunks(path, target_column, chunk_size):
+    """Parquet lu par row groups / batches (pyarrow requis)"""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("pyarrow requis pour les sources Parquet: pip install pyarrow") from e
+
+    parquet_file = pq.ParquetFile(path)
+    names = parquet_file.schema_arrow.names
+    if target_column not in names:
+        raise ValueError(f"Colonne cible {target_column!r} absente de {path}: {names}")
+    feature_names = [name for name in names if name != target_column]
+    for batch in parquet_file.iter_batches(batch_size=chunk_size):
+        X = np.column_stack([batch.column(name).to_numpy(zero_copy_only=False)
+                             for name in feature_names]).astype(np.float64)
+        yield feature_names, X, batch.column(target_column).to_numpy(zero_copy_only=False)
+
+
+def iter_npy_chunks(path, target_column, chunk_size):
+    """
+    Tableau 2D ouvert en mmap; target_column est l'indice de la colonne cible
+    (un nom non numérique, comme la valeur par défaut "target", désigne la dernière colonne)
+    """
+    array = np.load(path, mmap_mode="r")
+    if array.ndim != 2:
+        raise ValueError(f"Tableau 2D attendu dans {path}, reçu {array.shape}")
+    try:
+        target_index = int(target_column) % array.shape[1]
+    except ValueError:
+        target_index = array.shape[1] - 1
+    feature_index = [i for i in range(array.shape[1]) if i != target_index]
+    feature_names = [f"feature_{i}" for i in range(len(feature_index))]
+    for start in range(0, array.shape[0], chunk_size):
+        chunk = np.asarray(array[start:start + chunk_size])
+        yield feature_names, chunk[:, feature_index].astype(np.float64), chunk[:, target_index]
+
+
+READERS = {
+    ".csv": iter_csv_chunks,
+    ".parquet": iter_parquet_chunks,
+    ".npy": iter_npy_chunks,
+}
+
+
+def _as_integers(labels):
+    """Labels entiers en int64, None si l'un d'eux n'est pas un entier"""
+    try:
+        values = np.asarray(labels, dtype=np.float64)
+    except (TypeError, ValueError):
+        return None
+    if not np.all(np.isfinite(values) & (values == np.round(values))):
+        return None
+    return values.astype(np.int64)
+
+
+class LabelEncoder:
+    """
+    Codes provisoires attribués au fil des chunks dans l'ordre d'apparition, renumérotés
+    par final_codes(): labels entiers dans l'ordre croissant (0, 1, 2 restent inchangés,
+    1, 2, 3 deviennent 0, 1, 2), labels texte dans l'ordre d'apparition.
+    Le premier chunk fixe le type; un label non entier après des labels entiers lève ValueError.
+    """
+
+    def __init__(self):
+        self.numeric = None
+        self.codes = {}
+
+    def encode(self, labels):
+        """Codes provisoires (int64) des labels du chunk"""
+        integers = _as_integers(labels)
+        if self.numeric is None:
+            self.numeric = integers is not None
+        elif self.numeric and integers is None:
+            bad = next(label for label in labels if _as_integers([label]) is None)
+            raise ValueError(f"Label {bad!r} non entier alors que les chunks précédents "
+                             f"n'avaient que des labels entiers")
+
+        keys = integers if self.numeric else np.asarray([str(label) for label in labels])
+        uniques, first_seen, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        lookup = np.empty(len(uniques), dtype=np.int64)
+        for position in np.argsort(first_seen, kind="stable"):
+            key = uniques[position].item()
+            lookup[position] = self.codes.setdefault(key, len(self.codes))
+        return lookup[inverse.reshape(-1)]
+
+    def _ordered_labels(self):
+        return sorted(self.codes) if self.numeric else list(self.codes)
+
+    def final_codes(self):
+        """Table code provisoire -> code final"""
+        final = {label: code for code, label in enumerate(self._ordered_labels())}
+        return np.array([final[label] for label in self.codes], dtype=np.int64)
+
+    @property
+    def target_names(self):
+        """Noms des classes dans l'ordre des codes finaux"""
+        return [str(label) for label in self._ordered_labels()]
+
+
+class StratifiedSplitter:
+    """
+    Découpage train/test stratifié au fil de l'eau: pour chaque classe, la k-ième
+    occurrence part en test quand floor(k * test_size + phase) augmente, avec une
+    phase aléatoire par classe. Chaque classe garde exactement la proportion test_size
+    (à une ligne près) sans connaître la taille du jeu de données.
+    """
+
+    def __init__(self, test_size=0.2, random_state=42):
+        self.test_size = test_size
+        self.rng = np.random.default_rng(random_state)
+        self.seen = {}
+        self.phase = {}
+
+    def assign(self, y):
+        """Masque booléen des lignes de test du chunk"""
+        is_test = np.zeros(len(y), dtype=bool)
+        for label in np.unique(y):
+            positions = np.flatnonzero(y == label)
+            if label not in self.phase:
+                self.phase[label] = self.rng.random()
+                self.seen[label] = 0
+            seen, phase = self.seen[label], self.phase[label]
+            counts = np.floor(np.arange(seen, seen + len(positions) + 1) * self.test_size + phase)
+            is_test[positions] = np.diff(counts) > 0
+            self.seen[label] = seen + len(positions)
+        return is_test
+
+
+def _scale_to_array(raw_path, n_rows, n_features, scaler, name, output_path, chunk_size):
+    """Deuxième passe: features brutes (fichier temporaire) -> <name>.npy normalisé float32"""
+    out, entry = create_array(output_path, name, (n_rows, n_features))
+    raw = np.memmap(raw_path, dtype=np.float64, mode="r", shape=(n_rows, n_features)) \
+        if n_rows else np.empty((0, n_features))
+    total = np.zeros(n_features)
+    total_sq = np.zeros(n_features)
+    for start in range(0, n_rows, chunk_size):
+        scaled = scaler.transform(raw[start:start + chunk_size])
+        out[start:start + len(scaled)] = scaled
+        total += scaled.sum(axis=0)
+        total_sq += np.square(scaled).sum(axis=0)
+    out.flush()
+    return entry, total, total_sq
+
+
+def _copy_labels(raw_path, n_rows, name, output_path, chunk_size, final_codes):
+    """Deuxième passe: codes provisoires (fichier temporaire) -> <name>.npy en codes finaux"""
+    out, entry = create_array(output_path, name, (n_rows,))
+    if n_rows:
+        raw = np.memmap(raw_path, dtype=np.int64, mode="r", shape=(n_rows,))
+        for start in range(0, n_rows, chunk_size):
+            out[start:start + chunk_size] = final_codes[raw[start:start + chunk_size]]
+    out.flush()
+    return entry
+
+
+def preprocess_stream(source, output_path="data", target_column="target",
+                      chunk_size=DEFAULT_CHUNK_SIZE, test_size=0.2, random_state=42):
+    """
+    Prétraitement hors mémoire d'une source CSV / Parquet / NPY
+
+    1. lecture par chunks: codage provisoire des labels, découpage stratifié, moments du scaler
+       (StandardScaler.partial_fit) sur le train, features brutes en fichiers temporaires
+    2. normalisation chunk par chunk vers X_train.npy / X_test.npy (float32, mémoire mappée),
+       labels renumérotés en codes finaux alignés sur target_names
+
+    La mémoire maximale dépend de chunk_size, pas de la taille de la source.
+    Écrit les mêmes artefacts que preprocess_data (manifest.json, scaler.pkl, metadata.pkl).
+    """
+    extension = os.path.splitext(source)[1].lower()
+    if extension not in READERS:
+        raise ValueError(f"Format non supporté: {extension} (attendu: {', '.join(READERS)})")
+
+    os.makedirs(output_path, exist_ok=True)
+    scaler = StandardScaler()
+    encoder = LabelEncoder()
+    splitter = StratifiedSplitter(test_size, random_state)
+    feature_names = None
+    counts = {"train": 0, "test": 0}
+
+    print(f"🔄 Lecture en flux de {source} (chunks de {chunk_size} lignes)...")
+    with tempfile.TemporaryDirectory(dir=output_path) as tmp_dir:
+        raw_paths = {split: (os.path.join(tmp_dir, f"X_{split}.raw"),
+                             os.path.join(tmp_dir, f"y_{split}.raw"))
+                     for split in counts}
+        handles = {split: (open(x_path, "wb"), open(y_path, "wb"))
+                   for split, (x_path, y_path) in raw_paths.items()}
+        try:
+            for chunk_index, (names, X, labels) in enumerate(
+                    READERS[extension](source, target_column, chunk_size)):
+                feature_names = feature_names or names
+                y = encoder.encode(labels)
+                is_test = splitter.assign(y)
+                if np.any(~is_test):
+                    scaler.partial_fit(X[~is_test])
+                for split, mask in (("train", ~is_test), ("test", is_test)):
+                    x_handle, y_handle = handles[split]
+                    x_handle.write(np.ascontiguousarray(X[mask]).tobytes())
+                    y_handle.write(y[mask].tobytes())
+                    counts[split] += int(mask.sum())
+                if chunk_index % 10 == 0:
+                    print(f"  📦 {counts['train'] + counts['test']} lignes lues")
+        finally:
+            for x_handle, y_handle in handles.values():
+                x_handle.close()
+                y_handle.close()
+
+        if feature_names is None or counts["train"] == 0:
+            raise ValueError(f"Aucune ligne d'entraînement lue depuis {source}")
+
+        print("🔄 Normalisation des features...")
+        n_features = len(feature_names)
+        entries = {}
+        entries["X_train"], total, total_sq = _scale_to_array(
+            raw_paths["train"][0], counts["train"], n_features, scaler, "X_train",
+            output_path, chunk_size)
+        entries["X_test"], _, _ = _scale_to_array(
+            raw_paths["test"][0], counts["test"], n_features, scaler, "X_test",
+            output_path, chunk_size)
+        final_codes = encoder.final_codes()
+        entries["y_train"] = _copy_labels(raw_paths["train"][1], counts["train"], "y_train",
+                                          output_path, chunk_size, final_codes)
+        entries["y_test"] = _copy_labels(raw_paths["test"][1], counts["test"], "y_test",
+                                         output_path, chunk_size, final_codes)
+
+    target_names = encoder.target_names
+    register_arrays(output_path, entries, metadata={"feature_names": feature_names,
+                                                    "target_names": target_names})
+
+    with open(os.path.join(output_path, 'scaler.pkl'), 'wb') as f:
+        pickle.dump(scaler, f)
+
+    # Même contenu que preprocess_data; moments calculés sur les features normalisées
+    mean = total / counts["train"]
+    std = np.sqrt(np.maximum(total_sq / counts["train"] - np.square(mean), 0.0))
+    metadata = {
+        "feature_names": feature_names,
+        "target_names": target_names,
+        "n_features": n_features,
+        "n_classes": len(target_names),
+        "train_size": counts["train"],
+        "test_size": counts["test"],
+        "feature_stats": {
+            "mean": mean.tolist(),
+            "std": std.tolist()
+        }
+    }
+    with open(os.path.join(output_path, 'metadata.pkl'), 'wb') as f:
+        pickle.dump(metadata, f)
+
+    print("✅ Preprocessing en flux terminé avec succès!")
+    print(f"📊 Données d'entraînement: ({counts['train']}, {n_features})")
+    print(f"📊 Données de test: ({counts['test']}, {n_features})")
+    print(f"🎯 Classes: {target_names}")
+    return metadata
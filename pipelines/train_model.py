@@ -1,9 +1,191 @@
+# En premier: horodate le début des imports (span "imports")
+import instrumentation
 import os
+import time
+import json
 import pickle
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from instrumentation import span
+
+SWEEP_BATCH_SIZES = (1, 64, 1024)
+ONNX_OPSET = 11
+# Opsets exportés par défaut: 11 (iris_model.onnx) et 9 (Triton 23.10, étape d'évaluation)
+ONNX_OPSETS = (ONNX_OPSET, 9)
+
+def _parse_grid(value):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+def fit_candidate(n_estimators, max_depth, random_state, X_train, y_train, X_test, y_test, scaler):
+    """Entraîne et exporte un candidat du balayage (exécuté dans un process du pool)"""
+    model = RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth,
+                                   random_state=random_state, n_jobs=1)
+    model.fit(X_train, y_train)
+    
+    candidate = {
+        "n_estimators": n_estimators,
+        "max_depth": max_depth,
+        "test_accuracy": float(model.score(X_test, y_test)),
+        "pickle_bytes": len(pickle.dumps(model)),
+        "node_count": int(sum(e.tree_.node_count for e in model.estimators_)),
+        "onnx": None,
+    }
+    try:
+        from onnx_export import convert_to_onnx
+        candidate["onnx"] = convert_to_onnx(model, X_train.shape[1], scaler=scaler,
+                                            target_opset=ONNX_OPSET).SerializeToString()
+    except ImportError:
+        pass
+    return candidate
+
+def measure_candidate(candidate, X_bench, repeats=30):
+    """Taille ONNX, temps de chargement et latence médiane par taille de batch"""
+    onnx_bytes = candidate.pop("onnx")
+    candidate["onnx_bytes"] = len(onnx_bytes) if onnx_bytes else None
+    candidate["onnx_load_ms"] = None
+    candidate["latency_ms"] = {}
+    if not onnx_bytes:
+        return candidate
+    
+    import onnxruntime as ort
+    from local_inference import make_session_options
+    
+    started = time.perf_counter()
+    session = ort.InferenceSession(onnx_bytes, sess_options=make_session_options(),
+                                   providers=["CPUExecutionProvider"])
+    candidate["onnx_load_ms"] = (time.perf_counter() - started) * 1000
+    input_name = session.get_inputs()[0].name
+    
+    for batch_size in SWEEP_BATCH_SIZES:
+        batch = np.resize(X_bench, (batch_size, X_bench.shape[1])).astype(np.float32)
+        session.run(None, {input_name: batch})
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            session.run(None, {input_name: batch})
+            timings.append(time.perf_counter() - started)
+        candidate["latency_ms"][str(batch_size)] = float(np.median(timings) * 1000)
+    return candidate
+
+def _cost(candidate):
+    """Coût d'inférence: somme des latences médianes (octets du modèle à défaut)"""
+    if candidate["latency_ms"]:
+        return sum(candidate["latency_ms"].values())
+    return candidate["pickle_bytes"]
+
+def select_candidate(candidates, tolerance):
+    """
+    Marque la frontière de Pareto accuracy / coût (pareto) et les candidats à moins de
+    `tolerance` de la meilleure accuracy (within_tolerance); retourne (meilleure accuracy,
+    candidat le moins coûteux dans la tolérance, le plus petit pickle à coût égal)
+    """
+    best_accuracy = max(c["test_accuracy"] for c in candidates)
+    for c in candidates:
+        c["pareto"] = not any(
+            o["test_accuracy"] >= c["test_accuracy"] and o["cost"] <= c["cost"]
+            and (o["test_accuracy"] > c["test_accuracy"] or o["cost"] < c["cost"])
+            for o in candidates)
+        c["within_tolerance"] = c["test_accuracy"] >= best_accuracy - tolerance
+    
+    selected = min((c for c in candidates if c["within_tolerance"]),
+                   key=lambda c: (c["cost"], c["pickle_bytes"]))
+    return best_accuracy, selected
+
+def run_sweep(n_estimators_grid, max_depth_grid, random_state, tolerance,
+              X_train, y_train, X_test, y_test, scaler, output_path):
+    """
+    Balayage nombre d'arbres x profondeur: entraînement/export en parallèle, mesures de
+    latence en séquentiel (pour ne pas mesurer des candidats en concurrence pour le CPU)
+    Retourne le candidat le moins coûteux dont l'accuracy est à moins de `tolerance` de la meilleure
+    """
+    from onnx_export import raw_features
+    
+    grid = [(n, d) for n in n_estimators_grid for d in max_depth_grid]
+    print(f"🔍 Balayage de {len(grid)} candidats (tolérance d'accuracy: {tolerance})...")
+    
+    with ProcessPoolExecutor(max_workers=min(len(grid), os.cpu_count() or 1)) as pool:
+        futures = [pool.submit(fit_candidate, n, d, random_state,
+                               X_train, y_train, X_test, y_test, scaler) for n, d in grid]
+        candidates = [future.result() for future in futures]
+    
+    X_bench = raw_features(X_test, scaler)
+    for candidate in candidates:
+        measure_candidate(candidate, X_bench)
+        candidate["cost"] = _cost(candidate)
+    
+    best_accuracy, selected = select_candidate(candidates, tolerance)
+    
+    for c in sorted(candidates, key=lambda c: c["cost"]):
+        latencies = ", ".join(f"b{bs}={ms:.3f}ms" for bs, ms in c["latency_ms"].items())
+        marker = "🏆" if c is selected else ("⭐" if c["pareto"] else "  ")
+        print(f"  {marker} {c['n_estimators']:>4} arbres, profondeur {c['max_depth']:>3}: "
+              f"accuracy {c['test_accuracy']:.4f}, {c['onnx_bytes'] or c['pickle_bytes']} bytes"
+              f"{', ' + latencies if latencies else ''}")
+    
+    report = {
+        "tolerance": tolerance,
+        "best_accuracy": best_accuracy,
+        "batch_sizes": list(SWEEP_BATCH_SIZES),
+        "candidates": candidates,
+        "pareto_frontier": [c for c in candidates if c["pareto"]],
+        "selected": selected,
+    }
+    with open(os.path.join(output_path, 'sweep_report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Candidat retenu: {selected['n_estimators']} arbres, profondeur {selected['max_depth']}")
+    return selected
+
+def load_base_model(base_model_path):
+    """Modèle précédent et son scaler pour l'entraînement incrémental (None si absent)"""
+    if not os.path.exists(base_model_path):
+        return None, None
+    from onnx_export import load_scaler
+    
+    with open(base_model_path, 'rb') as f:
+        model = pickle.load(f)
+    if not isinstance(model, RandomForestClassifier):
+        raise ValueError(f"{base_model_path}: RandomForestClassifier attendu, "
+                         f"reçu {type(model).__name__}")
+    return model, load_scaler(os.path.dirname(base_model_path))
+
+
+def grow_forest(model, X_new, y_new, n_new, max_total=None, generation=1):
+    """
+    Ajoute n_new arbres entraînés uniquement sur les nouvelles données (warm_start), puis
+    retire les plus anciens au-delà de max_total arbres. Le coût ne dépend que de len(X_new).
+    La graine change à chaque génération: sklearn saute len(estimators_) tirages avant de
+    générer les nouveaux arbres, ce qui après un retrait rejouerait des graines déjà utilisées.
+    Retourne (arbres ajoutés, arbres retirés)
+    """
+    missing = set(model.classes_.tolist()) - set(np.unique(y_new).tolist())
+    unknown = set(np.unique(y_new).tolist()) - set(model.classes_.tolist())
+    if missing or unknown:
+        # fit recalculerait classes_ et désaligne les probabilités des arbres existants
+        raise ValueError(f"Les nouvelles données doivent contenir exactement les classes "
+                         f"{model.classes_.tolist()} (absentes: {sorted(missing)}, "
+                         f"inconnues: {sorted(unknown)})")
+    if X_new.shape[1] != model.n_features_in_:
+        raise ValueError(f"{X_new.shape[1]} features au lieu de {model.n_features_in_}")
+    
+    base_state = model.random_state if isinstance(model.random_state, int) else 0
+    model.random_state = base_state + generation
+    model.warm_start = True
+    model.n_estimators = len(model.estimators_) + n_new
+    model.fit(X_new, y_new)
+    model.warm_start = False
+    model.random_state = base_state
+    
+    retired = 0
+    if max_total and len(model.estimators_) > max_total:
+        retired = len(model.estimators_) - max_total
+        model.estimators_ = model.estimators_[retired:]
+        model.n_estimators = len(model.estimators_)
+    return n_new, retired
+
 
 def train_model_with_onnx(data_path="data", output_path="models"):
     print("🤖 Entraînement du modèle Random Forest + Export ONNX")
@@ -14,32 +196,24 @@ def train_model_with_onnx(data_path="data", output_path="models"):
     
     print("📂 Chargement des données d'entraînement...")
     
-    # Charger les données d'entraînement et de test
-    with open(os.path.join(data_path, 'X_train.pkl'), 'rb') as f:
-        X_train = pickle.load(f)
-    
-    with open(os.path.join(data_path, 'y_train.pkl'), 'rb') as f:
-        y_train = pickle.load(f)
-    
-    with open(os.path.join(data_path, 'X_test.pkl'), 'rb') as f:
-        X_test = pickle.load(f)
-    
-    with open(os.path.join(data_path, 'y_test.pkl'), 'rb') as f:
-        y_test = pickle.load(f)
+    with span("load"):
+        # Charger les données d'entraînement et de test (mémoire mappée, pickles en repli)
+        from artifact_store import load_splits
+        X_train, X_test, y_train, y_test = load_splits(data_path)
     
-    # Charger les métadonnées si disponibles, sinon utiliser les valeurs par défaut
-    metadata = {}
-    metadata_file = os.path.join(data_path, 'metadata.pkl')
-    if os.path.exists(metadata_file):
-        with open(metadata_file, 'rb') as f:
-            metadata = pickle.load(f)
-        feature_names = metadata['feature_names']
-        target_names = metadata['target_names']
-    else:
-        # Valeurs par défaut pour le dataset Iris si métadonnées non disponibles
-        feature_names = ['sepal length (cm)', 'sepal width (cm)', 'petal length (cm)', 'petal width (cm)']
-        target_names = ['setosa', 'versicolor', 'virginica']
-        print("⚠️  Métadonnées non trouvées - utilisation des valeurs par défaut Iris")
+        # Charger les métadonnées si disponibles, sinon utiliser les valeurs par défaut
+        metadata = {}
+        metadata_file = os.path.join(data_path, 'metadata.pkl')
+        if os.path.exists(metadata_file):
+            with open(metadata_file, 'rb') as f:
+                metadata = pickle.load(f)
+            feature_names = metadata['feature_names']
+            target_names = metadata['target_names']
+        else:
+            # Valeurs par défaut pour le dataset Iris si métadonnées non disponibles
+            feature_names = ['sepal length (cm)', 'sepal width (cm)', 'petal length (cm)', 'petal width (cm)']
+            target_names = ['setosa', 'versicolor', 'virginica']
+            print("⚠️  Métadonnées non trouvées - utilisation des valeurs par défaut Iris")
     
     print(f"📊 Données chargées: {X_train.shape[0]} échantillons d'entraînement")
     print(f"📊 Features: {feature_names}")
@@ -50,26 +224,94 @@ def train_model_with_onnx(data_path="data", output_path="models"):
     max_depth = int(os.getenv('MAX_DEPTH', 10))
     random_state = int(os.getenv('RANDOM_STATE', 42))
     
-    print(f"🌳 Configuration: {n_estimators} arbres, profondeur max: {max_depth}")
+    # Mode incrémental: data_path ne contient que les nouvelles données, le modèle précédent
+    # (et le scaler intégré à son graphe ONNX) est complété par de nouveaux arbres
+    from onnx_export import load_scaler, rescale
+    scaler = load_scaler(data_path)
+    base_model = None
+    training = {"mode": "full", "generation": 0}
+    if os.getenv('INCREMENTAL_TRAINING', 'false').lower() == 'true':
+        base_model_path = os.getenv('INCREMENTAL_BASE_MODEL',
+                                    os.path.join(output_path, 'iris_model.pkl'))
+        base_model, base_scaler = load_base_model(base_model_path)
+        if base_model is None:
+            print(f"⚠️  {base_model_path} introuvable - entraînement complet")
+        else:
+            # Nouvelles données ramenées dans l'espace du scaler du modèle existant
+            X_train = rescale(X_train, scaler, base_scaler)
+            X_test = rescale(X_test, scaler, base_scaler)
+            scaler = base_scaler if base_scaler is not None else scaler
+            previous = {}
+            previous_path = os.path.join(os.path.dirname(base_model_path), 'model_metadata.json')
+            if os.path.exists(previous_path):
+                with open(previous_path) as f:
+                    previous = json.load(f).get("training") or {}
+            training = {"mode": "incremental", "base_model": base_model_path,
+                        "generation": previous.get("generation", 0) + 1}
     
-    # Créer et entraîner le modèle
-    model = RandomForestClassifier(
-        n_estimators=n_estimators,
-        max_depth=max_depth,
-        random_state=random_state,
-        n_jobs=-1  # Utiliser tous les CPU disponibles
-    )
+    # Balayage optionnel: SWEEP_N_ESTIMATORS / SWEEP_MAX_DEPTH remplacent les valeurs uniques
+    sweep = None
+    n_estimators_grid = _parse_grid(os.getenv('SWEEP_N_ESTIMATORS', ''))
+    max_depth_grid = _parse_grid(os.getenv('SWEEP_MAX_DEPTH', ''))
+    if base_model is not None:
+        if n_estimators_grid or max_depth_grid:
+            print("⚠️  Balayage ignoré en mode incrémental (architecture du modèle existant)")
+        with open(os.path.join(output_path, 'sweep_report.json'), 'w') as f:
+            json.dump({"status": "not_run", "reason": "incremental"}, f, indent=2)
+    elif n_estimators_grid or max_depth_grid:
+        with span("sweep"):
+            sweep = run_sweep(n_estimators_grid or [n_estimators], max_depth_grid or [max_depth],
+                              random_state, float(os.getenv('ACCURACY_TOLERANCE', 0.01)),
+                              X_train, y_train, X_test, y_test, scaler, output_path)
+        n_estimators, max_depth = sweep['n_estimators'], sweep['max_depth']
+    else:
+        with open(os.path.join(output_path, 'sweep_report.json'), 'w') as f:
+            json.dump({"status": "not_run"}, f, indent=2)
     
-    print("🔄 Entraînement en cours...")
-    model.fit(X_train, y_train)
+    if base_model is not None:
+        model = base_model
+        n_new = int(os.getenv('INCREMENTAL_N_ESTIMATORS', 20))
+        max_total = int(os.getenv('MAX_TOTAL_ESTIMATORS', 0)) or None
+        print(f"🌳 Modèle existant: {len(model.estimators_)} arbres, +{n_new} sur "
+              f"{len(X_train)} nouveaux échantillons (génération {training['generation']})")
+        
+        print("🔄 Entraînement incrémental en cours...")
+        started = time.perf_counter()
+        with span("fit"):
+            added, retired = grow_forest(model, X_train, y_train, n_new, max_total,
+                                         training["generation"])
+        training.update(trees_added=added, trees_retired=retired,
+                        fit_seconds=time.perf_counter() - started)
+        if retired:
+            print(f"🗑️  {retired} arbre(s) les plus anciens retirés (max {max_total})")
+        n_estimators, max_depth = model.n_estimators, model.max_depth
+    else:
+        print(f"🌳 Configuration: {n_estimators} arbres, profondeur max: {max_depth}")
+        
+        # Créer et entraîner le modèle
+        model = RandomForestClassifier(
+            n_estimators=n_estimators,
+            max_depth=max_depth,
+            random_state=random_state,
+            n_jobs=-1  # Utiliser tous les CPU disponibles
+        )
+        
+        print("🔄 Entraînement en cours...")
+        started = time.perf_counter()
+        with span("fit"):
+            model.fit(X_train, y_train)
+        training["fit_seconds"] = time.perf_counter() - started
+    training["train_samples"] = int(len(X_train))
+    print(f"⏱️  Entraînement: {training['fit_seconds']:.2f}s")
     
     # Évaluation du modèle
     print("📈 Évaluation du modèle...")
-    train_accuracy = model.score(X_train, y_train)
-    test_accuracy = model.score(X_test, y_test)
+    with span("score"):
+        train_accuracy = model.score(X_train, y_train)
+        test_accuracy = model.score(X_test, y_test)
     
-    # Prédictions pour le rapport détaillé
-    y_pred = model.predict(X_test)
+        # Prédictions pour le rapport détaillé
+        y_pred = model.predict(X_test)
     
     print(f"✅ Accuracy d'entraînement: {train_accuracy:.4f}")
     print(f"✅ Accuracy de test: {test_accuracy:.4f}")
@@ -85,69 +327,68 @@ def train_model_with_onnx(data_path="data", output_path="models"):
         print(f"  {feature}: {importance:.4f}")
     
     # 1. Sauvegarder le modèle scikit-learn (format pickle)
-    model_pkl_path = os.path.join(output_path, 'iris_model.pkl')
-    with open(model_pkl_path, 'wb') as f:
-        pickle.dump(model, f)
+    with span("save"):
+        model_pkl_path = os.path.join(output_path, 'iris_model.pkl')
+        with open(model_pkl_path, 'wb') as f:
+            pickle.dump(model, f)
     print(f"💾 Modèle scikit-learn sauvegardé: {model_pkl_path}")
     
-    # 2. Exporter vers ONNX
+    # Scaler du modèle, conservé pour les entraînements incrémentaux suivants
+    if scaler is not None:
+        with open(os.path.join(output_path, 'scaler.pkl'), 'wb') as f:
+            pickle.dump(scaler, f)
+    
+    # 2. Exporter vers ONNX: un fichier par opset cible (ONNX_TARGET_OPSETS), une seule conversion
     print("\n🔄 Export vers ONNX...")
+    # Opsets explicites (noeud Elyra): leurs fichiers sont des sorties déclarées, l'export est obligatoire
+    requested_opsets = _parse_grid(os.getenv('ONNX_TARGET_OPSETS', ''))
+    opsets = requested_opsets or list(ONNX_OPSETS)
+    onnx_paths = {}
+    onnx_path = None
     try:
-        from skl2onnx import convert_sklearn
-        from skl2onnx.common.data_types import FloatTensorType
-        
-        # Définir le type d'entrée ONNX
-        initial_type = [('float_input', FloatTensorType([None, X_train.shape[1]]))]
-        
-        # Convertir le modèle vers ONNX
-        onnx_model = convert_sklearn(
-            model, 
-            initial_types=initial_type,
-            target_opset=11,  # Version ONNX compatible
-            options={id(model): {'zipmap': False}}  # Sortie simplifiée
-        )
+        from onnx_export import PARITY_ATOL, check_fused_parity
+        from model_artifacts import export_onnx_opsets
         
-        # Sauvegarder le modèle ONNX
-        onnx_path = os.path.join(output_path, 'iris_model.onnx')
-        with open(onnx_path, 'wb') as f:
-            f.write(onnx_model.SerializeToString())
+        # Graphe unique scaler + forêt: les clients envoient les features brutes (cm)
+        if scaler is None:
+            if requested_opsets:
+                raise RuntimeError("scaler.pkl introuvable: sortie models/scaler.pkl non produite")
+            print("⚠️  scaler.pkl introuvable - export de la forêt seule (entrée normalisée)")
+        with span("onnx_export"):
+            onnx_paths = export_onnx_opsets(model, X_train.shape[1], scaler, output_path, opsets)
+        onnx_path = onnx_paths[opsets[0]]
         
-        print(f"✅ Modèle ONNX exporté: {onnx_path}")
+        for opset, path in onnx_paths.items():
+            print(f"✅ Modèle ONNX exporté (opset {opset}): {path}")
         
-        # Vérifier le modèle ONNX
+        # Vérifier les modèles ONNX
         try:
             import onnx
-            onnx_model_check = onnx.load(onnx_path)
-            onnx.checker.check_model(onnx_model_check)
-            print("✅ Modèle ONNX validé avec succès")
+            for path in onnx_paths.values():
+                onnx.checker.check_model(onnx.load(path))
+            print("✅ Modèles ONNX validés avec succès")
             
-            # Tester l'inférence ONNX
+            # Tester l'inférence ONNX sur tout le jeu de test, pour chaque opset
             try:
-                import onnxruntime as ort
+                from local_inference import LocalInferenceBackend
                 
-                # Créer une session d'inférence
-                ort_session = ort.InferenceSession(onnx_path)
-                
-                # Test avec quelques échantillons
-                X_test_sample = X_test[:3].astype(np.float32)
-                
-                # Prédiction ONNX
-                ort_inputs = {ort_session.get_inputs()[0].name: X_test_sample}
-                ort_outputs = ort_session.run(None, ort_inputs)
-                
-                # Prédiction scikit-learn pour comparaison
-                sklearn_pred = model.predict(X_test_sample)
-                onnx_pred = ort_outputs[0]
-                
-                print(f"🔍 Test d'inférence:")
-                print(f"  Scikit-learn: {sklearn_pred}")
-                print(f"  ONNX: {onnx_pred}")
-                
-                # Vérifier la cohérence
-                if np.array_equal(sklearn_pred, onnx_pred):
-                    print("✅ Modèles scikit-learn et ONNX cohérents")
-                else:
-                    print("⚠️  Différence entre modèles scikit-learn et ONNX")
+                with span("onnx_verify"):
+                    for opset, path in onnx_paths.items():
+                        backend = LocalInferenceBackend(path)
+                        consistent, mismatches, max_proba_diff = check_fused_parity(
+                            backend, model, X_test, scaler)
+                    
+                        print(f"🔍 Test d'inférence opset {opset} ({len(X_test)} échantillons, "
+                              f"chargement ONNX {backend.load_time_s * 1000:.1f}ms):")
+                        print(f"  Prédictions différentes: {mismatches}")
+                        print(f"  Écart max des probabilités: {max_proba_diff:.2e}")
+                    
+                        # Vérifier la cohérence
+                        if consistent:
+                            print("✅ Modèles scikit-learn et ONNX cohérents")
+                        else:
+                            print(f"⚠️  Différence entre modèles scikit-learn et ONNX "
+                                  f"(tolérance {PARITY_ATOL:.0e} sur les probabilités)")
                     
             except ImportError:
                 print("⚠️  ONNXRuntime non disponible - test d'inférence ignoré")
@@ -155,9 +396,12 @@ def train_model_with_onnx(data_path="data", output_path="models"):
         except ImportError:
             print("⚠️  Package onnx non disponible - validation ignorée")
             
-    except ImportError:
+    except ImportError as e:
+        if requested_opsets:
+            raise RuntimeError(f"Export ONNX des opsets {requested_opsets} impossible: {e}") from e
         print("⚠️  skl2onnx non disponible - export ONNX ignoré")
         print("💡 Pour activer ONNX: pip install skl2onnx onnx onnxruntime")
+        onnx_paths = {}
         onnx_path = None
     
     # 3. Sauvegarder les métadonnées du modèle
@@ -165,6 +409,9 @@ def train_model_with_onnx(data_path="data", output_path="models"):
         "model_type": "RandomForestClassifier",
         "n_estimators": n_estimators,
         "max_depth": max_depth,
+        "training": training,
+        "sweep": ({k: sweep[k] for k in ("test_accuracy", "onnx_bytes", "onnx_load_ms",
+                                         "latency_ms", "cost")} if sweep else None),
         "train_accuracy": float(train_accuracy),
         "test_accuracy": float(test_accuracy),
         "feature_names": feature_names,
@@ -174,12 +421,16 @@ def train_model_with_onnx(data_path="data", output_path="models"):
         "classification_report": classification_report(y_test, y_pred, target_names=target_names, output_dict=True),
         "model_formats": {
             "pickle": "iris_model.pkl",
-            "onnx": "iris_model.onnx" if onnx_path else None
+            "onnx": "iris_model.onnx" if onnx_path else None,
+            "onnx_opsets": {str(opset): os.path.basename(path)
+                            for opset, path in onnx_paths.items()},
+            "scaler": "scaler.pkl" if scaler is not None else None
         },
         "input_schema": {
             "type": "float32",
             "shape": [None, len(feature_names)],
-            "features": feature_names
+            "features": feature_names,
+            "scaling": "in_graph" if onnx_path and scaler is not None else "client"
         },
         "output_schema": {
             "type": "int64",
@@ -192,23 +443,38 @@ def train_model_with_onnx(data_path="data", output_path="models"):
         pickle.dump(model_metadata, f)
     
     # Sauvegarder également en JSON pour faciliter la lecture
-    import json
     model_metadata_json_path = os.path.join(output_path, 'model_metadata.json')
     with open(model_metadata_json_path, 'w') as f:
         json.dump(model_metadata, f, indent=2)
     
+    # 4. Manifeste des artefacts (formats, opsets, empreintes, tenseurs) réutilisé par l'évaluation
+    with span("manifest"):
+        from model_artifacts import artifact_entry, onnx_entry, write_artifact_manifest
+        from step_cache import library_versions
+        artifacts = [artifact_entry(model_pkl_path, "sklearn", model_type="RandomForestClassifier")]
+        if scaler is not None:
+            artifacts.append(artifact_entry(os.path.join(output_path, 'scaler.pkl'), "sklearn-scaler"))
+        if onnx_paths:
+            artifacts += [onnx_entry(path, opset, scaling="in_graph" if scaler is not None else "client")
+                          for opset, path in onnx_paths.items()]
+        write_artifact_manifest(output_path, artifacts, metadata={
+            "n_features": int(X_train.shape[1]),
+            "library_versions": library_versions("scikit-learn", "skl2onnx", "onnx"),
+        })
+    
     print(f"\n💾 Métadonnées sauvegardées:")
     print(f"  📄 {model_metadata_path}")
     print(f"  📄 {model_metadata_json_path}")
+    print(f"  📄 {os.path.join(output_path, 'artifacts.json')}")
     
     print("\n🎉 Entraînement et export terminés avec succès!")
     
     # Résumé des fichiers créés
     print("\n📁 Fichiers créés:")
     print(f"  🤖 Modèle scikit-learn: iris_model.pkl")
-    if onnx_path:
-        print(f"  🔄 Modèle ONNX: iris_model.onnx")
-    print(f"  📋 Métadonnées: model_metadata.pkl/.json")
+    for opset, path in onnx_paths.items():
+        print(f"  🔄 Modèle ONNX (opset {opset}): {os.path.basename(path)}")
+    print(f"  📋 Métadonnées: model_metadata.pkl/.json, artifacts.json")
     
     # Recommandation pour Model Registry
     print("\n🏛️ Pour Model Registry OpenShift AI:")
@@ -227,4 +493,37 @@ if __name__ == "__main__":
                        help="Chemin de sortie pour le modèle entraîné")
     
     args = parser.parse_args()
-    train_model_with_onnx(args.data_path, args.output_path)
\ No newline at end of file
+    
+    # Cache de l'étape: mêmes données, même code et mêmes hyperparamètres -> sorties restaurées
+    from model_artifacts import MANIFEST_NAME, read_artifact_manifest
+    from step_cache import env_params, library_versions, module_paths, run_cached
+    
+    def train_outputs():
+        manifest = read_artifact_manifest(args.output_path) or {"artifacts": []}
+        names = {"model_metadata.pkl", "model_metadata.json", "sweep_report.json", MANIFEST_NAME}
+        names.update(entry["file"] for entry in manifest["artifacts"])
+        return [os.path.join(args.output_path, name) for name in sorted(names)]
+    
+    # Entrées de la clé de cache: les données, et le modèle de base en mode incrémental
+    cache_inputs = [args.data_path]
+    if os.getenv('INCREMENTAL_TRAINING', 'false').lower() == 'true':
+        cache_inputs.append(os.getenv('INCREMENTAL_BASE_MODEL',
+                                      os.path.join(args.output_path, 'iris_model.pkl')))
+    
+    instrumentation.start("train", started=instrumentation.IMPORTED_AT)
+    with span("compute"):
+        run_cached(
+            "train",
+            lambda: train_model_with_onnx(args.data_path, args.output_path),
+            outputs=train_outputs,
+            inputs=cache_inputs,
+            code=module_paths("train_model.py", "artifact_store.py", "onnx_export.py",
+                              "model_artifacts.py", "local_inference.py", "forest_compiler.py",
+                              "triton_config.py"),
+            params={"opsets": ONNX_OPSETS,
+                    **env_params("N_ESTIMATORS", "MAX_DEPTH", "RANDOM_STATE", "SWEEP_",
+                                 "ACCURACY_TOLERANCE", "INCREMENTAL_", "MAX_TOTAL_ESTIMATORS",
+                                 "ONNX_TARGET_OPSETS"),
+                    **library_versions("numpy", "scikit-learn", "skl2onnx", "onnx", "onnxruntime")},
+        )
+    instrumentation.finish()
@@ -0,0 +1,272 @@
+import itertools
+import os
+import queue
+import threading
+import time
+from dataclasses import asdict, dataclass, replace
+
+import numpy as np
+
+from local_inference import LocalInferenceBackend
+from triton_config import TritonModelSettings, clamp_preferred_batch_sizes
+
+# Attente maximale d'une requête simulée avant d'abandonner le point de la grille
+REQUEST_TIMEOUT_S = 10.0
+
+
+@dataclass
+class TuningCandidate:
+    """Un point de la grille: instances, threads ORT et paramètres du batcher dynamique"""
+    instance_count: int
+    intra_op_threads: int
+    max_batch_size: int
+    max_queue_delay_us: int
+
+
+class _Request:
+    __slots__ = ("features", "enqueued_at", "done")
+
+    def __init__(self, features):
+        self.features = features
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+
+
+class SchedulerSimulator:
+    """
+    Simulation locale du scheduler de Triton pour un modèle ONNX
+
+    - un thread "dynamic batcher" regroupe les requêtes jusqu'à max_batch_size ou
+      jusqu'à ce que la plus ancienne ait attendu max_queue_delay_us;
+    - instance_count instances (une session ONNX Runtime chacune) consomment les batches;
+    - des clients en boucle fermée envoient des requêtes d'une ligne.
+    """
+
+    def __init__(self, onnx_path, candidate, preferred_batch_sizes=None):
+        self.candidate = candidate
+        self.preferred_batch_sizes = sorted(preferred_batch_sizes or [])
+        self.instances = [
+            LocalInferenceBackend(onnx_path, intra_op_threads=candidate.intra_op_threads,
+                                  inter_op_threads=1)
+            for _ in range(candidate.instance_count)
+        ]
+        self._requests = queue.Queue()
+        self._batches = queue.Queue(maxsize=candidate.instance_count)
+        self._stop = threading.Event()
+        self._error = None
+        self.batch_sizes = []
+
+    def _target_size(self, queued):
+        """Plus grande taille préférée atteignable, sinon max_batch_size"""
+        reachable = [b for b in self.preferred_batch_sizes if b <= queued]
+        return reachable[-1] if reachable else self.candidate.max_batch_size
+
+    def _fail(self, error, pending=()):
+        """Mémorise la première erreur d'un worker et débloque les clients en attente"""
+        if self._error is None:
+            self._error = error
+        self._stop.set()
+        for request in pending:
+            request.done.set()
+
+    def _batcher(self):
+        try:
+            self._batch_requests()
+        except Exception as e:
+            self._fail(e)
+
+    def _batch_requests(self):
+        max_delay = self.candidate.max_queue_delay_us / 1e6
+        while not self._stop.is_set():
+            try:
+                first = self._requests.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            batch = [first]
+            deadline = first.enqueued_at + max_delay
+            while len(batch) < self.candidate.max_batch_size:
+                if len(batch) >= self._target_size(len(batch) + self._requests.qsize()):
+                    break
+                remaining = deadline - time.perf_counter()
+                try:
+                    if remaining > 0:
+                        batch.append(self._requests.get(timeout=remaining))
+                    else:
+                        batch.append(self._requests.get_nowait())
+                except queue.Empty:
+                    break
+            while not self._stop.is_set():
+                try:
+                    self._batches.put(batch, timeout=0.05)
+                    break
+                except queue.Full:
+                    continue
+
+    def _instance(self, backend):
+        while not self._stop.is_set():
+            try:
+                batch = self._batches.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            try:
+                backend.predict_with_proba(np.concatenate([r.features for r in batch]))
+            except Exception as e:
+                self._fail(e, batch)
+                return
+            self.batch_sizes.append(len(batch))
+            for request in batch:
+                request.done.set()
+
+    def _wait(self, request, timeout_s):
+        """Attend la réponse; False si la simulation s'arrête sur erreur ou après timeout_s"""
+        deadline = request.enqueued_at + timeout_s
+        while not request.done.wait(0.05):
+            if self._stop.is_set():
+                return False
+            if time.perf_counter() > deadline:
+                self._fail(TimeoutError(f"requête sans réponse après {timeout_s}s"))
+                return False
+        return self._error is None
+
+    def run(self, concurrency, duration_s, features, request_timeout_s=REQUEST_TIMEOUT_S):
+        """
+        Clients en boucle fermée pendant duration_s; lève RuntimeError si un worker échoue
+        ou si une requête reste sans réponse plus de request_timeout_s
+        """
+        latencies = []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration_s
+
+        def client(worker_id):
+            row = features[worker_id % len(features)].reshape(1, -1)
+            local = []
+            while time.perf_counter() < deadline and not self._stop.is_set():
+                request = _Request(row)
+                self._requests.put(request)
+                if not self._wait(request, request_timeout_s):
+                    break
+                local.append(time.perf_counter() - request.enqueued_at)
+            with lock:
+                latencies.extend(local)
+
+        threads = [threading.Thread(target=self._batcher, daemon=True)]
+        threads += [threading.Thread(target=self._instance, args=(backend,), daemon=True)
+                    for backend in self.instances]
+        for thread in threads:
+            thread.start()
+
+        started = time.perf_counter()
+        clients = [threading.Thread(target=client, args=(i,), daemon=True)
+                   for i in range(concurrency)]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        self._stop.set()
+        for thread in threads:
+            thread.join()
+        if self._error is not None:
+            raise RuntimeError(f"Simulation interrompue: {self._error}") from self._error
+
+        latencies_ms = np.asarray(latencies) * 1000.0
+        return {
+            "throughput_rps": len(latencies) / elapsed if elapsed > 0 else 0.0,
+            "latency_p50_ms": float(np.percentile(latencies_ms, 50)) if len(latencies) else None,
+            "latency_p99_ms": float(np.percentile(latencies_ms, 99)) if len(latencies) else None,
+            "mean_batch_size": float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+            "requests": len(latencies),
+        }
+
+
+def _env_list(key, default):
+    value = os.getenv(key)
+    if not value:
+        return default
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def candidate_grid():
+    """Grille de recherche, surchargeable par les variables AUTOTUNE_*"""
+    return [
+        TuningCandidate(*values)
+        for values in itertools.product(
+            _env_list("AUTOTUNE_INSTANCE_COUNTS", [1, 2]),
+            _env_list("AUTOTUNE_INTRA_OP_THREADS", [1, 2]),
+            _env_list("AUTOTUNE_MAX_BATCH_SIZES", [32, 256]),
+            _env_list("AUTOTUNE_QUEUE_DELAYS_US", [0, 100, 1000]),
+        )
+    ]
+
+
+def pareto_frontier(results):
+    """Points non dominés: débit maximal et latence p99 minimale"""
+    frontier = []
+    for r in results:
+        dominated = any(
+            o["throughput_rps"] >= r["throughput_rps"] and o["latency_p99_ms"] <= r["latency_p99_ms"]
+            and (o["throughput_rps"] > r["throughput_rps"] or o["latency_p99_ms"] < r["latency_p99_ms"])
+            for o in results
+        )
+        if not dominated:
+            frontier.append(r)
+    return sorted(frontier, key=lambda r: r["latency_p99_ms"])
+
+
+def autotune(onnx_path, features, concurrency=None, duration_s=None, p99_budget_ms=None,
+             base_settings=None):
+    """
+    Balaye la grille contre le modèle ONNX exporté et retourne
+    (TritonModelSettings retenus, rapport sérialisable JSON)
+
+    Choix: débit maximal parmi les points de la frontière de Pareto dont le p99
+    respecte le budget (AUTOTUNE_P99_BUDGET_MS); sans budget, débit maximal.
+    """
+    concurrency = concurrency or int(os.getenv("AUTOTUNE_CONCURRENCY", 32))
+    duration_s = duration_s or float(os.getenv("AUTOTUNE_DURATION_S", 1.0))
+    if p99_budget_ms is None and os.getenv("AUTOTUNE_P99_BUDGET_MS"):
+        p99_budget_ms = float(os.getenv("AUTOTUNE_P99_BUDGET_MS"))
+    base_settings = base_settings or TritonModelSettings.from_env()
+    features = np.asarray(features, dtype=np.float32)
+
+    results = []
+    for candidate in candidate_grid():
+        preferred = clamp_preferred_batch_sizes(base_settings.preferred_batch_sizes,
+                                                candidate.max_batch_size)
+        simulator = SchedulerSimulator(onnx_path, candidate, preferred)
+        stats = simulator.run(concurrency, duration_s, features)
+        if stats["requests"] == 0:
+            continue
+        results.append({**asdict(candidate), **stats})
+        print(f"  ⚙️ inst={candidate.instance_count} intra={candidate.intra_op_threads} "
+              f"batch≤{candidate.max_batch_size} délai={candidate.max_queue_delay_us}µs -> "
+              f"{stats['throughput_rps']:.0f} req/s, p99 {stats['latency_p99_ms']:.2f}ms")
+
+    if not results:
+        raise RuntimeError("Aucun résultat d'autotuning")
+
+    frontier = pareto_frontier(results)
+    eligible = [r for r in frontier
+                if p99_budget_ms is None or r["latency_p99_ms"] <= p99_budget_ms]
+    best = max(eligible or frontier, key=lambda r: r["throughput_rps"])
+
+    settings = replace(base_settings,
+                       instance_count=best["instance_count"],
+                       intra_op_thread_count=best["intra_op_threads"],
+                       inter_op_thread_count=1,
+                       max_batch_size=best["max_batch_size"],
+                       max_queue_delay_microseconds=best["max_queue_delay_us"],
+                       preferred_batch_sizes=clamp_preferred_batch_sizes(
+                           base_settings.preferred_batch_sizes, best["max_batch_size"]))
+
+    report = {
+        "concurrency": concurrency,
+        "duration_s": duration_s,
+        "p99_budget_ms": p99_budget_ms,
+        "budget_met": bool(eligible) or p99_budget_ms is None,
+        "results": results,
+        "pareto_frontier": frontier,
+        "best": best,
+    }
+    return settings, report
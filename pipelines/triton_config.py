@@ -0,0 +1,218 @@
+import os
+from dataclasses import dataclass, field, replace
+from typing import List, Optional
+
+# Modèle servi et tenseurs du graphe exporté (onnx_export.py, sorties skl2onnx sans zipmap):
+# config.pbtxt, clients (scripts/triton_client.py) et stub KServe utilisent ces mêmes noms
+MODEL_NAME = "iris_model"
+INPUT_NAME = "float_input"
+LABEL_OUTPUT = "label"
+PROBABILITIES_OUTPUT = "probabilities"
+OUTPUT_NAMES = [LABEL_OUTPUT, PROBABILITIES_OUTPUT]
+
+# Types d'éléments ONNX (onnx.TensorProto) -> types Triton
+ONNX_TO_TRITON_TYPES = {
+    1: "TYPE_FP32",
+    2: "TYPE_UINT8",
+    3: "TYPE_INT8",
+    6: "TYPE_INT32",
+    7: "TYPE_INT64",
+    9: "TYPE_BOOL",
+    10: "TYPE_FP16",
+    11: "TYPE_FP64",
+}
+
+
+@dataclass
+class TensorSpec:
+    """Entrée/sortie du modèle telle que déclarée dans config.pbtxt"""
+    name: str
+    data_type: str
+    dims: List[int]
+    reshape: Optional[List[int]] = None
+
+
+@dataclass
+class TritonModelSettings:
+    """
+    Paramètres de génération de config.pbtxt pour le backend ONNX Runtime de Triton
+
+    max_batch_size > 0 active le batching: la première dimension des tenseurs
+    ONNX devient la dimension de batch implicite de Triton.
+    """
+    name: str = MODEL_NAME
+    platform: str = "onnxruntime_onnx"
+    default_model_filename: str = f"{MODEL_NAME}.onnx"
+
+    # Batching dynamique
+    max_batch_size: int = 1024
+    dynamic_batching: bool = True
+    preferred_batch_sizes: List[int] = field(default_factory=lambda: [64, 256])
+    max_queue_delay_microseconds: int = 100
+
+    # Instances et threads ONNX Runtime
+    instance_count: int = 2
+    instance_kind: str = "KIND_CPU"
+    intra_op_thread_count: int = 1
+    inter_op_thread_count: int = 1
+    graph_optimization_level: int = 1
+    cpu_execution_accelerators: List[str] = field(default_factory=list)
+
+    inputs: List[TensorSpec] = field(default_factory=list)
+    outputs: List[TensorSpec] = field(default_factory=list)
+
+    @classmethod
+    def from_env(cls, **overrides):
+        """Valeurs par défaut surchargées par les variables TRITON_* du pipeline"""
+        def env_int(key, default):
+            return int(os.getenv(key, default))
+
+        preferred = os.getenv("TRITON_PREFERRED_BATCH_SIZES")
+        accelerators = os.getenv("TRITON_CPU_ACCELERATORS", "")
+        defaults = cls()
+        settings = cls(
+            max_batch_size=env_int("TRITON_MAX_BATCH_SIZE", defaults.max_batch_size),
+            dynamic_batching=os.getenv("TRITON_DYNAMIC_BATCHING", "true").lower() == "true",
+            preferred_batch_sizes=([int(v) for v in preferred.split(",") if v.strip()]
+                                   if preferred else defaults.preferred_batch_sizes),
+            max_queue_delay_microseconds=env_int("TRITON_MAX_QUEUE_DELAY_US",
+                                                 defaults.max_queue_delay_microseconds),
+            instance_count=env_int("TRITON_INSTANCE_COUNT", defaults.instance_count),
+            intra_op_thread_count=env_int("TRITON_INTRA_OP_THREADS",
+                                          defaults.intra_op_thread_count),
+            inter_op_thread_count=env_int("TRITON_INTER_OP_THREADS",
+                                          defaults.inter_op_thread_count),
+            cpu_execution_accelerators=[a.strip() for a in accelerators.split(",") if a.strip()],
+        )
+        return replace(settings, **overrides)
+
+    def with_io_from_onnx(self, onnx_path):
+        """Copie des paramètres avec entrées/sorties lues dans le graphe ONNX"""
+        inputs, outputs = read_onnx_io(onnx_path, batching=self.max_batch_size > 0)
+        return replace(self, inputs=inputs, outputs=outputs)
+
+
+def _tensor_spec(value_info, batching):
+    tensor_type = value_info.type.tensor_type
+    data_type = ONNX_TO_TRITON_TYPES.get(tensor_type.elem_type)
+    if data_type is None:
+        raise ValueError(f"Type ONNX non supporté pour {value_info.name}: {tensor_type.elem_type}")
+
+    dims = [d.dim_value if d.HasField("dim_value") else -1 for d in tensor_type.shape.dim]
+    if not batching:
+        return TensorSpec(value_info.name, data_type, dims)
+
+    # La dimension de batch est implicite; un tenseur [N] devient [1] remis à plat par reshape
+    dims = dims[1:]
+    if not dims:
+        return TensorSpec(value_info.name, data_type, [1], reshape=[])
+    return TensorSpec(value_info.name, data_type, dims)
+
+
+def read_onnx_io(onnx_path, batching=True):
+    """Lit noms, types et formes des entrées/sorties du graphe ONNX exporté"""
+    import onnx
+
+    graph = onnx.load(str(onnx_path), load_external_data=False).graph
+    initializers = {init.name for init in graph.initializer}
+    inputs = [_tensor_spec(v, batching) for v in graph.input if v.name not in initializers]
+    outputs = [_tensor_spec(v, batching) for v in graph.output]
+    return inputs, outputs
+
+
+def clamp_preferred_batch_sizes(preferred_batch_sizes, max_batch_size):
+    """
+    Tailles préférées ramenées à max_batch_size (Triton refuse une taille préférée
+    supérieure): [64, 256] avec max_batch_size=32 devient [32] au lieu d'une liste vide
+    """
+    return sorted({min(b, max_batch_size) for b in preferred_batch_sizes if b > 0})
+
+
+def _render_dims(dims):
+    return f"[ {', '.join(str(d) for d in dims)} ]" if dims else "[ ]"
+
+
+def _render_tensors(tensors):
+    blocks = []
+    for tensor in tensors:
+        lines = [
+            "  {",
+            f'    name: "{tensor.name}"',
+            f"    data_type: {tensor.data_type}",
+            f"    dims: {_render_dims(tensor.dims)}",
+        ]
+        if tensor.reshape is not None:
+            lines.append(f"    reshape: {{ shape: {_render_dims(tensor.reshape)} }}")
+        lines.append("  }")
+        blocks.append("\n".join(lines))
+    return ",\n".join(blocks)
+
+
+def _render_parameter(key, value):
+    return f'parameters {{ key: "{key}" value: {{ string_value: "{value}" }} }}'
+
+
+def render_config(settings):
+    """Génère le contenu de config.pbtxt"""
+    if not settings.inputs or not settings.outputs:
+        raise ValueError("Entrées/sorties manquantes: utiliser with_io_from_onnx()")
+
+    sections = [
+        f'name: "{settings.name}"',
+        f'platform: "{settings.platform}"',
+        f"max_batch_size: {settings.max_batch_size}",
+        f'default_model_filename: "{settings.default_model_filename}"',
+        f"input [\n{_render_tensors(settings.inputs)}\n]",
+        f"output [\n{_render_tensors(settings.outputs)}\n]",
+        "instance_group [\n"
+        "  {\n"
+        f"    count: {settings.instance_count}\n"
+        f"    kind: {settings.instance_kind}\n"
+        "  }\n"
+        "]",
+    ]
+
+    if settings.max_batch_size > 0 and settings.dynamic_batching:
+        preferred = clamp_preferred_batch_sizes(settings.preferred_batch_sizes,
+                                                settings.max_batch_size)
+        if preferred != sorted(settings.preferred_batch_sizes):
+            print(f"⚠️  preferred_batch_size {settings.preferred_batch_sizes} ramené à {preferred} "
+                  f"(max_batch_size={settings.max_batch_size})")
+        lines = ["dynamic_batching {"]
+        if preferred:
+            lines.append(f"  preferred_batch_size: {_render_dims(preferred)}")
+        lines.append(f"  max_queue_delay_microseconds: {settings.max_queue_delay_microseconds}")
+        lines.append("}")
+        sections.append("\n".join(lines))
+
+    optimization = ["optimization {", f"  graph: {{ level: {settings.graph_optimization_level} }}"]
+    if settings.cpu_execution_accelerators:
+        accelerators = ", ".join(f'{{ name: "{name}" }}'
+                                 for name in settings.cpu_execution_accelerators)
+        optimization.append(f"  execution_accelerators {{ cpu_execution_accelerator: [ {accelerators} ] }}")
+    optimization.append("}")
+    sections.append("\n".join(optimization))
+
+    sections.append(_render_parameter("intra_op_thread_count", settings.intra_op_thread_count))
+    sections.append(_render_parameter("inter_op_thread_count", settings.inter_op_thread_count))
+
+    return "\n".join(sections) + "\n"
+
+
+def write_triton_config(settings, config_path):
+    """Écrit config.pbtxt et retourne un résumé des paramètres (pour les métadonnées)"""
+    content = render_config(settings)
+    with open(config_path, "w") as f:
+        f.write(content)
+    return {
+        "max_batch_size": settings.max_batch_size,
+        "dynamic_batching": settings.dynamic_batching and settings.max_batch_size > 0,
+        "preferred_batch_sizes": clamp_preferred_batch_sizes(settings.preferred_batch_sizes,
+                                                             settings.max_batch_size),
+        "max_queue_delay_microseconds": settings.max_queue_delay_microseconds,
+        "instance_count": settings.instance_count,
+        "intra_op_thread_count": settings.intra_op_thread_count,
+        "inter_op_thread_count": settings.inter_op_thread_count,
+        "inputs": [t.name for t in settings.inputs],
+        "outputs": [t.name for t in settings.outputs],
+    }
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Benchmark de charge et de latence pour le modèle Iris servi par Triton
+Génère du trafic en boucle fermée (concurrence fixe) ou ouverte (QPS cible)
+"""
+
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from server_metrics import attribute_latency, format_attribution
+from triton_client import (SAMPLE_DATA, InferenceError, TritonHTTPClient, encode_binary_request,
+                           load_local_backend, prepare_triton_request)
+
+PERCENTILES = {"p50": 50, "p90": 90, "p99": 99, "p999": 99.9}
+
+
+def build_batch(batch_size: int) -> List[List[float]]:
+    """
+    Construit un batch en répétant les échantillons de référence
+    """
+    samples = list(SAMPLE_DATA.values())
+    return [samples[i % len(samples)] for i in range(batch_size)]
+
+
+def latency_summary(latencies_s: List[float]) -> Dict[str, Optional[float]]:
+    """
+    Résumé des latences en millisecondes (moyenne, percentiles, max)
+    """
+    if not latencies_s:
+        summary: Dict[str, Optional[float]] = {"mean": None, "max": None}
+        summary.update({name: None for name in PERCENTILES})
+        return summary
+
+    values = np.asarray(latencies_s) * 1000.0
+    summary = {"mean": float(values.mean()), "max": float(values.max())}
+    for name, q in PERCENTILES.items():
+        summary[name] = float(np.percentile(values, q))
+    return summary
+
+
+class LoadGenerator:
+    """
+    Envoie des requêtes depuis `concurrency` threads pendant `duration` secondes
+
+    - qps=None: boucle fermée, chaque worker renvoie dès la réponse reçue
+    - qps=N: boucle ouverte, les envois sont planifiés à intervalle fixe et la
+      latence est mesurée depuis l'instant prévu (pas de coordinated omission)
+    """
+
+    def __init__(self, send: Callable[[], Any], concurrency: int,
+                 duration: float, qps: Optional[float] = None):
+        self.send = send
+        self.concurrency = max(1, concurrency)
+        self.duration = duration
+        self.qps = qps
+
+        self._lock = threading.Lock()
+        self._next_index = 0
+        self._latencies: List[float] = []
+        self._errors: Counter = Counter()
+
+    def _next_slot(self, start: float, deadline: float) -> Optional[float]:
+        """Réserve le prochain instant d'envoi planifié (boucle ouverte)"""
+        with self._lock:
+            scheduled = start + self._next_index / self.qps
+            if scheduled >= deadline:
+                return None
+            self._next_index += 1
+            return scheduled
+
+    def _record(self, latency: Optional[float], error: Optional[str]) -> None:
+        with self._lock:
+            if error is None:
+                self._latencies.append(latency)
+            else:
+                self._errors[error] += 1
+
+    def _call(self, started: float) -> None:
+        try:
+            self.send()
+        except InferenceError as e:
+            self._record(None, e.label)
+        except Exception as e:
+            # Erreur inattendue du backend (ONNX Runtime, décodage): comptée, le worker continue
+            self._record(None, type(e).__name__)
+        else:
+            self._record(time.perf_counter() - started, None)
+
+    def _worker(self, start: float, deadline: float) -> None:
+        while True:
+            if self.qps:
+                scheduled = self._next_slot(start, deadline)
+                if scheduled is None:
+                    return
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                self._call(scheduled)
+            else:
+                now = time.perf_counter()
+                if now >= deadline:
+                    return
+                self._call(now)
+
+    def run(self) -> Dict[str, Any]:
+        start = time.perf_counter()
+        deadline = start + self.duration
+
+        threads = [threading.Thread(target=self._worker, args=(start, deadline), daemon=True)
+                   for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        elapsed = time.perf_counter() - start
+        n_errors = sum(self._errors.values())
+        n_total = len(self._latencies) + n_errors
+
+        return {
+            "elapsed_s": elapsed,
+            "requests": n_total,
+            "successes": len(self._latencies),
+            "errors": n_errors,
+            "error_rate": (n_errors / n_total) if n_total else 0.0,
+            "errors_by_type": dict(self._errors),
+            "throughput_rps": len(self._latencies) / elapsed if elapsed > 0 else 0.0,
+            "latency_ms": latency_summary(self._latencies)
+        }
+
+
+def _http_sender(client: TritonHTTPClient, batch_size: int,
+                 binary: bool) -> Callable[[], Any]:
+    # La requête est encodée une fois: on mesure le transport et le serveur
+    if binary:
+        body, header_length = encode_binary_request(build_batch(batch_size))
+        return lambda: client.infer_encoded(body, header_length)
+
+    triton_request = prepare_triton_request(build_batch(batch_size), client.model_name)
+    return lambda: client.infer_request(triton_request)
+
+
+def _grpc_sender(client: Any, batch_size: int) -> Callable[[], Any]:
+    from triton_grpc import build_infer_request
+
+    request = build_infer_request(build_batch(batch_size), client.model_name,
+                                  client.model_version)
+    return lambda: client.infer_encoded(request)
+
+
+def _local_sender(backend: Any, batch_size: int) -> Callable[[], Any]:
+    features = np.asarray(build_batch(batch_size), dtype=np.float32)
+    return lambda: backend.infer(features)
+
+
+def run_benchmark(base_url: str, model_name: str, model_version: str,
+                  batch_sizes: List[int], concurrency: int = 1,
+                  duration: float = 10.0, qps: Optional[float] = None,
+                  warmup: float = 1.0, timeout: float = 30.0,
+                  binary: bool = False, transport: str = "http",
+                  server_metrics: Optional[Any] = None) -> Dict[str, Any]:
+    """
+    Balaye les tailles de batch et retourne le rapport complet (sérialisable JSON)
+    transport="grpc": base_url est alors l'adresse gRPC (host:port)
+    transport="local": base_url est le chemin du modèle (.onnx ou .pkl), exécuté
+    en process pour comparer la latence serveur à la latence brute du modèle
+    server_metrics (ServerMetricsScraper): relevés serveur avant/après chaque batch,
+    décomposition file / entrée / calcul / sortie face à la latence client
+    """
+    if transport == "grpc":
+        from triton_grpc import TritonGRPCClient
+
+        client = TritonGRPCClient(base_url, model_name, model_version, timeout=timeout)
+        inference_url = base_url
+        payload = "protobuf_raw"
+    elif transport == "local":
+        client = load_local_backend(base_url)
+        inference_url = base_url
+        payload = "in_process"
+    else:
+        client = TritonHTTPClient(base_url, model_name, model_version,
+                                  timeout=timeout, pool_size=concurrency)
+        inference_url = client.infer_url
+        payload = "binary" if binary else "json"
+    results = []
+
+    for batch_size in batch_sizes:
+        if transport == "grpc":
+            send = _grpc_sender(client, batch_size)
+        elif transport == "local":
+            send = _local_sender(client, batch_size)
+        else:
+            send = _http_sender(client, batch_size, binary)
+
+        if warmup > 0:
+            LoadGenerator(send, concurrency, warmup).run()
+
+        scrape = server_metrics is not None and transport != "local"
+        before = server_metrics.snapshot() if scrape else None
+        stats = LoadGenerator(send, concurrency, duration, qps=qps).run()
+        stats["throughput_rows_per_s"] = stats["throughput_rps"] * batch_size
+        attribution = None
+        if scrape:
+            stats["server"] = server_metrics.breakdown(before, server_metrics.snapshot())
+            attribution = attribute_latency(stats["server"], stats["latency_ms"], model_version)
+            stats["latency_attribution"] = attribution
+        results.append({"batch_size": batch_size, **stats})
+
+        latency = stats["latency_ms"]
+        p99 = f"{latency['p99']:.2f}ms" if latency["p99"] is not None else "n/a"
+        print(f"📊 {transport:<4} batch={batch_size:<5} {stats['throughput_rps']:>9.1f} req/s  "
+              f"p99={p99}  erreurs={stats['errors']}")
+        if attribution:
+            print(format_attribution(attribution))
+
+    client.close()
+    return {
+        "config": {
+            "url": inference_url,
+            "model_name": model_name,
+            "model_version": model_version,
+            "transport": transport,
+            "mode": "open_loop" if qps else "closed_loop",
+            "payload": payload,
+            "concurrency": concurrency,
+            "target_qps": qps,
+            "duration_s": duration,
+            "warmup_s": warmup,
+            "batch_sizes": batch_sizes
+        },
+        "results": results
+    }
+
+
+def compare_transports(http_url: str, grpc_url: str, model_name: str, model_version: str,
+                       batch_sizes: List[int], **kwargs: Any) -> Dict[str, Any]:
+    """
+    Exécute le même balayage en HTTP puis en gRPC et calcule les ratios gRPC/HTTP
+    """
+    reports = {
+        "http": run_benchmark(http_url, model_name, model_version, batch_sizes,
+                              transport="http", **kwargs),
+        "grpc": run_benchmark(grpc_url, model_name, model_version, batch_sizes,
+                              transport="grpc", **kwargs),
+    }
+
+    comparison = []
+    for http_result, grpc_result in zip(reports["http"]["results"], reports["grpc"]["results"]):
+        http_p50 = http_result["latency_ms"]["p50"]
+        grpc_p50 = grpc_result["latency_ms"]["p50"]
+        comparison.append({
+            "batch_size": http_result["batch_size"],
+            "throughput_ratio_grpc_vs_http": (
+                grpc_result["throughput_rps"] / http_result["throughput_rps"]
+                if http_result["throughput_rps"] else None),
+            "p50_latency_ratio_grpc_vs_http": (
+                grpc_p50 / http_p50 if http_p50 and grpc_p50 is not None else None)
+        })
+
+    return {"transports": reports, "comparison": comparison}
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Scoring en masse de fichiers JSONL / CSV / NPY via Triton
+Lecture en flux par chunks, requêtes batchées en parallèle borné, écriture au fil
+de l'eau et reprise depuis le dernier offset validé après une panne
+"""
+
+import csv
+import itertools
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterator, List, Optional, TextIO, Tuple
+
+import numpy as np
+
+from triton_client import TritonHTTPClient
+
+N_FEATURES = 4
+CHECKPOINT_SUFFIX = ".checkpoint.json"
+
+
+def _row_from_json(line: str) -> List[float]:
+    """Accepte [f1, f2, f3, f4] ou {"features": [...]} / {"data": [...]}"""
+    record = json.loads(line)
+    if isinstance(record, dict):
+        record = record.get("features", record.get("data"))
+    if not isinstance(record, list) or len(record) != N_FEATURES:
+        raise ValueError(f"Ligne invalide (4 features attendues): {line.strip()[:80]}")
+    return record
+
+
+def _iter_text_lines(handle: TextIO, start_row: int) -> Iterator[str]:
+    """Lignes non vides à partir de start_row (les lignes sautées ne sont pas parsées)"""
+    lines = (line for line in handle if line.strip())
+    return itertools.islice(lines, start_row, None)
+
+
+def iter_jsonl_chunks(path: str, chunk_size: int, start_row: int = 0) -> Iterator[np.ndarray]:
+    with open(path, "r") as f:
+        lines = _iter_text_lines(f, start_row)
+        while True:
+            chunk = list(itertools.islice(lines, chunk_size))
+            if not chunk:
+                return
+            yield np.asarray([_row_from_json(line) for line in chunk], dtype=np.float32)
+
+
+def iter_csv_chunks(path: str, chunk_size: int, start_row: int = 0) -> Iterator[np.ndarray]:
+    """CSV avec ou sans en-tête; les 4 premières colonnes sont les features"""
+    with open(path, "r", newline="") as f:
+        first = f.readline()
+        try:
+            [float(value) for value in next(csv.reader([first]))[:N_FEATURES]]
+            has_header = False
+        except ValueError:
+            has_header = True
+        f.seek(0)
+        if has_header:
+            f.readline()
+
+        lines = _iter_text_lines(f, start_row)
+        while True:
+            chunk = list(itertools.islice(lines, chunk_size))
+            if not chunk:
+                return
+            array = np.loadtxt(chunk, delimiter=",", dtype=np.float32, ndmin=2,
+                               usecols=range(N_FEATURES))
+            yield array
+
+
+def iter_npy_chunks(path: str, chunk_size: int, start_row: int = 0) -> Iterator[np.ndarray]:
+    """Tableau [N, 4] ouvert en mmap: seules les pages du chunk courant sont lues"""
+    array = np.load(path, mmap_mode="r")
+    if array.ndim != 2 or array.shape[1] != N_FEATURES:
+        raise ValueError(f"Tableau [N, {N_FEATURES}] attendu, reçu {array.shape}")
+    for start in range(start_row, array.shape[0], chunk_size):
+        yield np.asarray(array[start:start + chunk_size], dtype=np.float32)
+
+
+READERS = {
+    ".jsonl": iter_jsonl_chunks,
+    ".csv": iter_csv_chunks,
+    ".npy": iter_npy_chunks,
+}
+
+
+def iter_chunks(path: str, chunk_size: int, start_row: int = 0) -> Iterator[np.ndarray]:
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in READERS:
+        raise ValueError(f"Format non supporté: {extension} (attendu: {', '.join(READERS)})")
+    return READERS[extension](path, chunk_size, start_row)
+
+
+class ResultWriter:
+    """
+    Écrit les résultats (JSONL ou CSV selon l'extension) et un checkpoint
+    {rows, bytes} mis à jour atomiquement après chaque chunk écrit
+    """
+
+    def __init__(self, path: str, resume: bool):
+        self.path = path
+        self.checkpoint_path = path + CHECKPOINT_SUFFIX
+        self.csv = path.lower().endswith(".csv")
+        self.rows = 0
+
+        checkpoint = self._read_checkpoint() if resume else None
+        if checkpoint:
+            self.rows = checkpoint["rows"]
+            self._handle = open(path, "r+")
+            # Supprime une éventuelle écriture partielle postérieure au checkpoint
+            self._handle.truncate(checkpoint["bytes"])
+            self._handle.seek(checkpoint["bytes"])
+        else:
+            self._handle = open(path, "w")
+            if self.csv:
+                self._handle.write("row,prediction,prob_setosa,prob_versicolor,prob_virginica\n")
+            self._save_checkpoint()
+
+    def _read_checkpoint(self) -> Optional[Dict[str, int]]:
+        if not (os.path.exists(self.checkpoint_path) and os.path.exists(self.path)):
+            return None
+        with open(self.checkpoint_path, "r") as f:
+            return json.load(f)
+
+    def _save_checkpoint(self) -> None:
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"rows": self.rows, "bytes": self._handle.tell()}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def write(self, predictions: np.ndarray, probabilities: Optional[np.ndarray]) -> None:
+        lines = []
+        for i, prediction in enumerate(predictions.tolist()):
+            row = self.rows + i
+            probs = probabilities[i].tolist() if probabilities is not None else None
+            if self.csv:
+                values = ",".join(f"{p:.6f}" for p in probs) if probs else ",,"
+                lines.append(f"{row},{prediction},{values}\n")
+            else:
+                lines.append(json.dumps({"row": row, "prediction": prediction,
+                                         "probabilities": probs}) + "\n")
+        self._handle.write("".join(lines))
+        self.rows += len(predictions)
+        self._save_checkpoint()
+
+    def close(self, completed: bool) -> None:
+        self._handle.close()
+        if completed and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+
+def _score_chunk(client: TritonHTTPClient,
+                 chunk: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    result = client.infer(chunk)
+    predictions = np.asarray(result["predictions"]).reshape(len(chunk))
+    probabilities = result["probabilities"]
+    if probabilities is not None:
+        probabilities = np.asarray(probabilities).reshape(len(chunk), -1)
+    return predictions, probabilities
+
+
+def run_bulk_scoring(client: TritonHTTPClient, input_path: str, output_path: str,
+                     chunk_size: int = 1024, parallelism: int = 4,
+                     resume: bool = False) -> Dict[str, Any]:
+    """
+    Score input_path vers output_path; au plus `parallelism` chunks en vol, les
+    résultats sont écrits dans l'ordre pour que le checkpoint reste un offset simple.
+    En cas d'erreur l'exception est propagée et le checkpoint permet --resume.
+    """
+    writer = ResultWriter(output_path, resume)
+    start_row = writer.rows
+    started = time.perf_counter()
+    completed = False
+
+    pending: Deque[Future] = deque()
+    try:
+        with ThreadPoolExecutor(max_workers=parallelism) as executor:
+            for chunk in iter_chunks(input_path, chunk_size, start_row):
+                if len(pending) >= parallelism:
+                    writer.write(*pending.popleft().result())
+                pending.append(executor.submit(_score_chunk, client, chunk))
+            while pending:
+                writer.write(*pending.popleft().result())
+        completed = True
+    finally:
+        writer.close(completed)
+
+    elapsed = time.perf_counter() - started
+    scored = writer.rows - start_row
+    return {
+        "input": input_path,
+        "output": output_path,
+        "resumed_from_row": start_row,
+        "rows_scored": scored,
+        "total_rows": writer.rows,
+        "elapsed_s": elapsed,
+        "rows_per_s": scored / elapsed if elapsed > 0 else 0.0
+    }
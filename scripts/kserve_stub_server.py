@@ -0,0 +1,612 @@
+#!/usr/bin/env python3
+"""
+Serveur KServe v2 local (stand-in) pour tester le client Triton hors cluster
+Imite les endpoints health / metadata / infer / stats de Triton Inference Server,
+ainsi que ses métriques Prometheus (/metrics, mêmes noms nv_inference_*)
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Même modèle et mêmes tenseurs que le config.pbtxt généré par le pipeline
+from triton_client import (BINARY_HEADER, DEFAULT_MODEL_NAME, DEFAULT_MODEL_VERSION, INPUT_NAME,
+                           LABEL_OUTPUT, OUTPUT_NAMES, PROBABILITIES_OUTPUT)
+
+try:
+    import grpc
+    from tritonclient.grpc import service_pb2, service_pb2_grpc
+except ImportError:
+    grpc = None
+
+N_FEATURES = 4
+N_CLASSES = 3
+
+_NUMPY_DTYPES = {"FP32": np.dtype("<f4"), "INT64": np.dtype("<i8")}
+
+_MODEL_PATH_RE = re.compile(
+    r"^/v2/models/(?P<name>[^/]+)(?:/versions/(?P<version>[^/]+))?(?P<action>/infer|/ready|/stats)?$"
+)
+
+# Étapes mesurées par requête, comme les statistiques de Triton
+STAGES = ("queue", "compute_input", "compute_infer", "compute_output")
+
+
+def predict_iris(features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Classifieur Iris déterministe (arbre de décision classique sur les pétales)
+    Retourne (predictions int64 [N], probabilities float32 [N, 3])
+    """
+    petal_length = features[:, 2]
+    petal_width = features[:, 3]
+
+    predictions = np.where(petal_length < 2.45, 0,
+                           np.where(petal_width < 1.75, 1, 2)).astype(np.int64)
+
+    probabilities = np.full((len(features), N_CLASSES), 0.05, dtype=np.float32)
+    probabilities[np.arange(len(features)), predictions] = 0.90
+    return predictions, probabilities
+
+
+class InferenceStats:
+    """
+    Compteurs cumulés du modèle au format de Triton: durées en ns par étape
+    (success, fail, queue, compute_input, compute_infer, compute_output),
+    lignes inférées (inference_count) et exécutions du modèle (execution_count)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {stage: [0, 0] for stage in ("success", "fail") + STAGES}
+        self.inference_count = 0
+        self.execution_count = 0
+        self.last_inference = 0
+
+    def record(self, stage: str, duration_ns: int) -> None:
+        with self._lock:
+            self._stages[stage][0] += 1
+            self._stages[stage][1] += duration_ns
+
+    def record_execution(self, batch_size: int) -> None:
+        with self._lock:
+            self.inference_count += batch_size
+            self.execution_count += 1
+            self.last_inference = int(time.time() * 1000)
+
+    def model_stats(self, name: str, version: str) -> Dict[str, Any]:
+        """Entrée model_stats de GET /v2/models/<nom>/versions/<v>/stats"""
+        with self._lock:
+            return {
+                "name": name,
+                "version": version,
+                "last_inference": self.last_inference,
+                "inference_count": self.inference_count,
+                "execution_count": self.execution_count,
+                "inference_stats": {stage: {"count": count, "ns": ns}
+                                    for stage, (count, ns) in self._stages.items()},
+            }
+
+    def prometheus_lines(self, name: str, version: str) -> List[str]:
+        """Séries nv_inference_* de l'endpoint /metrics de Triton (durées cumulées en µs)"""
+        stats = self.model_stats(name, version)
+        inference_stats = stats["inference_stats"]
+        labels = f'{{model="{name}",version="{version}"}}'
+        values = {
+            "nv_inference_request_success": inference_stats["success"]["count"],
+            "nv_inference_request_failure": inference_stats["fail"]["count"],
+            "nv_inference_count": stats["inference_count"],
+            "nv_inference_exec_count": stats["execution_count"],
+            "nv_inference_request_duration_us": (inference_stats["success"]["ns"]
+                                                 + inference_stats["fail"]["ns"]) // 1000,
+        }
+        values.update({f"nv_inference_{stage}_duration_us": inference_stats[stage]["ns"] // 1000
+                       for stage in STAGES})
+        lines = []
+        for metric, value in values.items():
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{labels} {value}")
+        return lines
+
+
+class StubModel:
+    """
+    Modèle servi par le stand-in: nom, version et comportement simulé
+    instance_count limite les exécutions simultanées (instance_group de Triton):
+    les requêtes en surnombre attendent et ce temps est compté dans la file (queue)
+    """
+
+    def __init__(self, name: str = DEFAULT_MODEL_NAME,
+                 version: str = DEFAULT_MODEL_VERSION,
+                 latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0,
+                 error_rate: float = 0.0,
+                 instance_count: Optional[int] = None):
+        self.name = name
+        self.version = version
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.stats = InferenceStats()
+        self._instances = threading.BoundedSemaphore(instance_count) if instance_count else None
+
+    def record_request(self, started_ns: int, success: bool) -> None:
+        """Durée totale de la requête (réception -> réponse), en succès ou en échec"""
+        self.stats.record("success" if success else "fail", time.perf_counter_ns() - started_ns)
+
+    @contextmanager
+    def _stage(self, stage: str) -> Iterator[None]:
+        started = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.stats.record(stage, time.perf_counter_ns() - started)
+
+    @contextmanager
+    def _instance(self) -> Iterator[None]:
+        with self._stage("queue"):
+            if self._instances is not None:
+                self._instances.acquire()
+        try:
+            yield
+        finally:
+            if self._instances is not None:
+                self._instances.release()
+
+    def metadata(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "versions": [self.version],
+            "platform": "onnxruntime_onnx",
+            "inputs": [
+                {"name": INPUT_NAME, "datatype": "FP32", "shape": [-1, N_FEATURES]}
+            ],
+            "outputs": [
+                {"name": LABEL_OUTPUT, "datatype": "INT64", "shape": [-1]},
+                {"name": PROBABILITIES_OUTPUT, "datatype": "FP32", "shape": [-1, N_CLASSES]}
+            ]
+        }
+
+    def simulate_compute(self) -> None:
+        """Simule le temps de calcul du modèle (latence + gigue)"""
+        delay_ms = self.latency_ms
+        if self.jitter_ms:
+            delay_ms += random.uniform(0, self.jitter_ms)
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000.0)
+
+    def infer(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Exécute la requête v2; les données de sortie sont des tableaux NumPy,
+        la sérialisation (JSON ou binaire) est laissée au handler HTTP
+        """
+        inputs = request.get("inputs") or []
+        if len(inputs) != 1:
+            raise ValueError("Une seule entrée attendue")
+
+        tensor = inputs[0]
+        if tensor.get("name") != INPUT_NAME:
+            raise ValueError(f"Entrée inconnue: {tensor.get('name')} (attendu {INPUT_NAME})")
+        shape = tensor.get("shape") or []
+        if len(shape) != 2 or shape[1] != N_FEATURES:
+            raise ValueError(f"Shape invalide: {shape} (attendu [N, {N_FEATURES}])")
+
+        requested = [o["name"] for o in request.get("outputs") or []]
+        if not requested:
+            requested = list(OUTPUT_NAMES)
+        unknown = set(requested) - set(OUTPUT_NAMES)
+        if unknown:
+            raise ValueError(f"Sortie inconnue: {', '.join(sorted(unknown))}")
+
+        with self._instance():
+            with self._stage("compute_input"):
+                features = np.asarray(tensor["data"], dtype=np.float32).reshape(shape)
+            with self._stage("compute_infer"):
+                self.simulate_compute()
+                predictions, probabilities = predict_iris(features)
+            with self._stage("compute_output"):
+                tensors = {LABEL_OUTPUT: np.ascontiguousarray(predictions),
+                           PROBABILITIES_OUTPUT: np.ascontiguousarray(probabilities)}
+            self.stats.record_execution(len(features))
+
+        outputs = []
+        for name in requested:
+            outputs.append({"name": name, "datatype": "INT64" if name == LABEL_OUTPUT else "FP32",
+                            "shape": list(tensors[name].shape), "data": tensors[name]})
+
+        return {
+            "model_name": self.name,
+            "model_version": self.version,
+            "id": request.get("id", ""),
+            "outputs": outputs
+        }
+
+
+class KServeStubHandler(BaseHTTPRequestHandler):
+    """
+    Handler HTTP implémentant le sous-ensemble du protocole KServe v2 utilisé par le client
+    """
+
+    # HTTP/1.1 pour permettre le keep-alive côté client
+    protocol_version = "HTTP/1.1"
+    # En-têtes et corps sont écrits séparément: sans TCP_NODELAY, Nagle + ACK
+    # retardé ajoutent ~40ms par requête sur une connexion réutilisée
+    disable_nagle_algorithm = True
+    server: "KServeStubHTTPServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: int, message: str) -> None:
+        self._send_json(status, {"error": message})
+
+    def _read_infer_request(self, body: bytes) -> Dict[str, Any]:
+        """
+        Décode une requête JSON ou binaire (extension binary data de Triton)
+        """
+        header_length = self.headers.get(BINARY_HEADER)
+        if header_length is None:
+            return json.loads(body)
+
+        header_length = int(header_length)
+        request = json.loads(body[:header_length])
+        offset = header_length
+        for tensor in request.get("inputs", []):
+            size = (tensor.get("parameters") or {}).get("binary_data_size")
+            if size is None:
+                continue
+            dtype = _NUMPY_DTYPES[tensor["datatype"]]
+            tensor["data"] = np.frombuffer(body, dtype=dtype, count=size // dtype.itemsize,
+                                           offset=offset)
+            offset += size
+        return request
+
+    def _send_infer_response(self, request: Dict[str, Any], response: Dict[str, Any]) -> None:
+        """
+        Sérialise les sorties en binaire si le client l'a demandé, sinon en JSON
+        """
+        binary_all = (request.get("parameters") or {}).get("binary_data_output", False)
+        binary_names = {o["name"] for o in request.get("outputs") or []
+                        if (o.get("parameters") or {}).get("binary_data", binary_all)}
+
+        chunks = []
+        for output in response["outputs"]:
+            data = output["data"]
+            if output["name"] in binary_names or (binary_all and not binary_names):
+                raw = np.ascontiguousarray(data, dtype=_NUMPY_DTYPES[output["datatype"]])
+                output["parameters"] = {"binary_data_size": raw.nbytes}
+                chunks.append(raw.tobytes())
+                del output["data"]
+            else:
+                output["data"] = data.ravel().tolist()
+
+        if not chunks:
+            self._send_json(200, response)
+            return
+
+        header = json.dumps(response).encode("utf-8")
+        body = b"".join([header] + chunks)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header(BINARY_HEADER, str(len(header)))
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _resolve_model(self, name: str, version: Optional[str]) -> Optional[StubModel]:
+        model = self.server.model
+        if name != model.name:
+            return None
+        if version is not None and version != model.version:
+            return None
+        return model
+
+    def _send_metrics(self) -> None:
+        """Format texte Prometheus, comme le port 8002 de Triton"""
+        model = self.server.model
+        body = ("\n".join(model.stats.prometheus_lines(model.name, model.version)) + "\n").encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if self.path in ("/v2/health/ready", "/v2/health/live"):
+            self._send_json(200, {})
+            return
+        if self.path == "/metrics":
+            self._send_metrics()
+            return
+        if self.path == "/v2":
+            self._send_json(200, {"name": "kserve-stub", "version": "0.1",
+                                  "extensions": []})
+            return
+
+        match = _MODEL_PATH_RE.match(self.path)
+        if not match or match.group("action") == "/infer":
+            self._send_error(404, f"Route inconnue: {self.path}")
+            return
+
+        model = self._resolve_model(match.group("name"), match.group("version"))
+        if model is None:
+            self._send_error(404, f"Modèle inconnu: {self.path}")
+            return
+
+        if match.group("action") == "/ready":
+            self._send_json(200, {})
+        elif match.group("action") == "/stats":
+            self._send_json(200, {"model_stats": [model.stats.model_stats(model.name,
+                                                                          model.version)]})
+        else:
+            self._send_json(200, model.metadata())
+
+    def do_POST(self) -> None:
+        started = time.perf_counter_ns()
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+
+        match = _MODEL_PATH_RE.match(self.path)
+        if not match or match.group("action") != "/infer":
+            self._send_error(404, f"Route inconnue: {self.path}")
+            return
+
+        model = self._resolve_model(match.group("name"), match.group("version"))
+        if model is None:
+            self._send_error(404, f"Modèle inconnu: {self.path}")
+            return
+
+        if model.error_rate and random.random() < model.error_rate:
+            self._send_error(500, "Erreur simulée par le stand-in")
+            model.record_request(started, success=False)
+            return
+
+        try:
+            request = self._read_infer_request(body)
+            response = model.infer(request)
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+            self._send_error(400, str(e))
+            model.record_request(started, success=False)
+            return
+
+        self._send_infer_response(request, response)
+        model.record_request(started, success=True)
+
+
+class KServeStubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], model: StubModel, verbose: bool = False):
+        super().__init__(address, KServeStubHandler)
+        self.model = model
+        self.verbose = verbose
+
+
+if grpc is not None:
+    class StubGRPCServicer(service_pb2_grpc.GRPCInferenceServiceServicer):
+        """
+        Sous-ensemble de GRPCInferenceService: santé, métadonnées, infer unaire et streaming
+        """
+
+        def __init__(self, model: StubModel):
+            self.model = model
+
+        def ServerLive(self, request, context):
+            return service_pb2.ServerLiveResponse(live=True)
+
+        def ServerReady(self, request, context):
+            return service_pb2.ServerReadyResponse(ready=True)
+
+        def _check_model(self, name: str, version: str, context) -> None:
+            if name != self.model.name or (version and version != self.model.version):
+                context.abort(grpc.StatusCode.NOT_FOUND, f"Modèle inconnu: {name} v{version}")
+
+        def ModelReady(self, request, context):
+            self._check_model(request.name, request.version, context)
+            return service_pb2.ModelReadyResponse(ready=True)
+
+        def ModelMetadata(self, request, context):
+            self._check_model(request.name, request.version, context)
+            metadata = self.model.metadata()
+            response = service_pb2.ModelMetadataResponse(name=metadata["name"],
+                                                         versions=metadata["versions"],
+                                                         platform=metadata["platform"])
+            for key, target in (("inputs", response.inputs), ("outputs", response.outputs)):
+                for tensor in metadata[key]:
+                    target.add(name=tensor["name"], datatype=tensor["datatype"],
+                               shape=tensor["shape"])
+            return response
+
+        def _infer(self, request) -> "service_pb2.ModelInferResponse":
+            """Convertit la requête protobuf vers le format dict de StubModel.infer"""
+            inputs = []
+            for i, tensor in enumerate(request.inputs):
+                if i < len(request.raw_input_contents):
+                    data = np.frombuffer(request.raw_input_contents[i],
+                                         dtype=_NUMPY_DTYPES[tensor.datatype])
+                else:
+                    data = np.asarray(tensor.contents.fp32_contents, dtype=np.float32)
+                inputs.append({"name": tensor.name, "shape": list(tensor.shape), "data": data})
+
+            result = self.model.infer({"id": request.id, "inputs": inputs,
+                                       "outputs": [{"name": o.name} for o in request.outputs]})
+
+            response = service_pb2.ModelInferResponse(model_name=self.model.name,
+                                                      model_version=self.model.version,
+                                                      id=request.id)
+            for output in result["outputs"]:
+                response.outputs.add(name=output["name"], datatype=output["datatype"],
+                                     shape=output["shape"])
+                raw = np.ascontiguousarray(output["data"], dtype=_NUMPY_DTYPES[output["datatype"]])
+                response.raw_output_contents.append(raw.tobytes())
+            return response
+
+        def ModelInfer(self, request, context):
+            started = time.perf_counter_ns()
+            self._check_model(request.model_name, request.model_version, context)
+            if self.model.error_rate and random.random() < self.model.error_rate:
+                self.model.record_request(started, success=False)
+                context.abort(grpc.StatusCode.INTERNAL, "Erreur simulée par le stand-in")
+            try:
+                response = self._infer(request)
+            except (KeyError, TypeError, ValueError) as e:
+                self.model.record_request(started, success=False)
+                context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+            self.model.record_request(started, success=True)
+            return response
+
+        def ModelStreamInfer(self, request_iterator, context) -> Iterator[Any]:
+            for request in request_iterator:
+                started = time.perf_counter_ns()
+                try:
+                    if (request.model_name != self.model.name or
+                            (request.model_version and request.model_version != self.model.version)):
+                        raise ValueError(f"Modèle inconnu: {request.model_name}")
+                    response = self._infer(request)
+                except (KeyError, TypeError, ValueError) as e:
+                    self.model.record_request(started, success=False)
+                    yield service_pb2.ModelStreamInferResponse(error_message=str(e))
+                else:
+                    self.model.record_request(started, success=True)
+                    yield service_pb2.ModelStreamInferResponse(infer_response=response)
+
+
+class StubGRPCServer:
+    """
+    Stand-in gRPC en process (context manager), même modèle que le stand-in HTTP
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 model: Optional[StubModel] = None, max_workers: int = 16):
+        if grpc is None:
+            raise ImportError("grpcio et tritonclient[grpc] requis: pip install 'tritonclient[grpc]'")
+        from triton_grpc import channel_options
+
+        self.model = model or StubModel()
+        self._server = grpc.server(ThreadPoolExecutor(max_workers=max_workers),
+                                   options=channel_options())
+        service_pb2_grpc.add_GRPCInferenceServiceServicer_to_server(
+            StubGRPCServicer(self.model), self._server)
+        self._host = host
+        self._port = self._server.add_insecure_port(f"{host}:{port}")
+
+    @property
+    def url(self) -> str:
+        return f"{self._host}:{self._port}"
+
+    def start(self) -> "StubGRPCServer":
+        self._server.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.stop(grace=None)
+
+    def __enter__(self) -> "StubGRPCServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+class StubServer:
+    """
+    Lance le stand-in KServe v2 dans un thread (utilisable comme context manager)
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 model: Optional[StubModel] = None, verbose: bool = False):
+        self.model = model or StubModel()
+        self._httpd = KServeStubHTTPServer((host, port), self.model, verbose=verbose)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        name="kserve-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in KServe v2 local pour le modèle Iris")
+    parser.add_argument("--host", default="127.0.0.1", help="Adresse d'écoute")
+    parser.add_argument("--port", type=int, default=8000, help="Port HTTP")
+    parser.add_argument("--model-name", "-m", default=DEFAULT_MODEL_NAME, help="Nom du modèle")
+    parser.add_argument("--model-version", "-v", default=DEFAULT_MODEL_VERSION,
+                        help="Version du modèle")
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="Temps de calcul simulé par requête (ms)")
+    parser.add_argument("--jitter-ms", type=float, default=0.0,
+                        help="Gigue aléatoire ajoutée au temps de calcul (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Proportion de requêtes en erreur 500 simulée")
+    parser.add_argument("--instance-count", type=int, default=None,
+                        help="Exécutions simultanées max, les autres attendent en file "
+                             "(illimité par défaut)")
+    parser.add_argument("--grpc-port", type=int, default=None,
+                        help="Port gRPC (désactivé par défaut, 8001 chez Triton)")
+    parser.add_argument("--verbose", action="store_true", help="Logger chaque requête")
+
+    args = parser.parse_args()
+
+    model = StubModel(args.model_name, args.model_version,
+                      latency_ms=args.latency_ms,
+                      jitter_ms=args.jitter_ms,
+                      error_rate=args.error_rate,
+                      instance_count=args.instance_count)
+    server = KServeStubHTTPServer((args.host, args.port), model, verbose=args.verbose)
+
+    grpc_server = None
+    if args.grpc_port is not None:
+        grpc_server = StubGRPCServer(args.host, args.grpc_port, model=model).start()
+
+    print(f"🧪 Stand-in KServe v2 démarré sur http://{args.host}:{args.port}")
+    if grpc_server:
+        print(f"   gRPC: {grpc_server.url}")
+    print(f"   Modèle: {model.name} v{model.version}")
+    print(f"   Métriques: http://{args.host}:{args.port}/metrics")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Arrêt du stand-in")
+    finally:
+        server.server_close()
+        if grpc_server:
+            grpc_server.stop()
+
+
+if __name__ == "__main__":
+    main()
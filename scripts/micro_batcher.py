@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Micro-batching côté client pour les appelants qui scorent une ligne à la fois
+Regroupe les appels concurrents en une requête [N, 4] vers Triton puis redistribue
+les prédictions à chaque appelant
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+import numpy as np
+
+from triton_client import (DEFAULT_MODEL_NAME, DEFAULT_MODEL_VERSION,
+                           AsyncTritonClient)
+
+METRICS_WINDOW = 10000
+
+
+class _Pending:
+    """Ligne en attente: features, future de l'appelant et instant de soumission"""
+
+    __slots__ = ("row", "future", "submitted_at")
+
+    def __init__(self, row: List[float], future: asyncio.Future, submitted_at: float):
+        self.row = row
+        self.future = future
+        self.submitted_at = submitted_at
+
+
+def _distribution(values: Deque[float], scale: float = 1.0) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"mean": None, "p50": None, "p99": None, "max": None}
+    array = np.asarray(values, dtype=np.float64) * scale
+    return {
+        "mean": float(array.mean()),
+        "p50": float(np.percentile(array, 50)),
+        "p99": float(np.percentile(array, 99)),
+        "max": float(array.max())
+    }
+
+
+class MicroBatcher:
+    """
+    Agrège les appels predict(row) concurrents en batches
+
+    Un batch part dès qu'il atteint max_batch_size ou que la plus ancienne ligne
+    a attendu max_delay_ms. En mode adaptatif, si aucun batch n'est en vol le
+    batch part immédiatement: la latence reste minimale à faible charge et la
+    taille des batches croît d'elle-même quand le serveur est occupé.
+    """
+
+    def __init__(self, client: AsyncTritonClient, max_batch_size: int = 64,
+                 max_delay_ms: float = 5.0, max_concurrent_batches: int = 4,
+                 adaptive: bool = True):
+        self.client = client
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay_ms / 1000.0
+        self.max_concurrent_batches = max_concurrent_batches
+        self.adaptive = adaptive
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._in_flight: set = set()
+
+        self._batch_sizes: Deque[int] = deque(maxlen=METRICS_WINDOW)
+        self._queue_delays: Deque[float] = deque(maxlen=METRICS_WINDOW)
+        self._n_batches = 0
+        self._n_rows = 0
+        self._n_failed_batches = 0
+
+    async def start(self) -> "MicroBatcher":
+        if self._collector is None:
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._collector = asyncio.create_task(self._collect())
+        return self
+
+    async def stop(self) -> None:
+        """Vide la file, attend les batches en vol puis arrête le collecteur"""
+        if self._collector is None:
+            return
+        await self._queue.put(None)
+        await self._collector
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        self._collector = None
+
+    async def __aenter__(self) -> "MicroBatcher":
+        return await self.start()
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.stop()
+
+    async def predict(self, row: List[float]) -> Dict[str, Any]:
+        """
+        Score une ligne; retourne {"prediction": int, "probabilities": [...]}
+        Lève l'InferenceError du batch si la requête groupée échoue
+        """
+        if self._collector is None:
+            raise RuntimeError("MicroBatcher non démarré (utiliser start() ou async with)")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_Pending(row, future, time.perf_counter()))
+        return await future
+
+    def _idle(self) -> bool:
+        return not self._in_flight
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            deadline = loop.time() + self.max_delay
+
+            while len(batch) < self.max_batch_size:
+                # Prendre d'abord tout ce qui est déjà en file
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    if self.adaptive and self._idle():
+                        break
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._slots.acquire()
+            task = asyncio.create_task(self._dispatch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _dispatch(self, batch: List[_Pending]) -> None:
+        dispatched_at = time.perf_counter()
+        for item in batch:
+            self._queue_delays.append(dispatched_at - item.submitted_at)
+        self._batch_sizes.append(len(batch))
+        self._n_batches += 1
+        self._n_rows += len(batch)
+
+        try:
+            features = np.asarray([item.row for item in batch], dtype=np.float32)
+            result = await self.client.infer(features)
+            predictions = np.asarray(result["predictions"]).reshape(len(batch))
+            probabilities = result["probabilities"]
+            if probabilities is not None:
+                probabilities = np.asarray(probabilities).reshape(len(batch), -1)
+        except Exception as e:
+            self._n_failed_batches += 1
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+
+        for i, item in enumerate(batch):
+            if item.future.done():
+                continue
+            item.future.set_result({
+                "prediction": int(predictions[i]),
+                "probabilities": probabilities[i].tolist() if probabilities is not None else None
+            })
+
+    def metrics(self) -> Dict[str, Any]:
+        """Taille de batch obtenue et délai passé en file (ms), fenêtre glissante"""
+        return {
+            "batches": self._n_batches,
+            "rows": self._n_rows,
+            "failed_batches": self._n_failed_batches,
+            "batch_size": _distribution(self._batch_sizes),
+            "queue_delay_ms": _distribution(self._queue_delays, scale=1000.0)
+        }
+
+
+async def _demo(url: str, model_name: str, model_version: str, n_callers: int,
+                requests_per_caller: int, batcher_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Simule n_callers appelants concurrents qui scorent chacun des lignes une par une
+    """
+    latencies: List[float] = []
+
+    async with AsyncTritonClient(url, model_name, model_version, binary=True) as client:
+        async with MicroBatcher(client, **batcher_kwargs) as batcher:
+            async def caller():
+                for _ in range(requests_per_caller):
+                    row = [random.uniform(4.0, 8.0), random.uniform(2.0, 4.5),
+                           random.uniform(1.0, 7.0), random.uniform(0.1, 2.5)]
+                    started = time.perf_counter()
+                    await batcher.predict(row)
+                    latencies.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(caller() for _ in range(n_callers)))
+            elapsed = time.perf_counter() - started
+
+            report = batcher.metrics()
+
+    report["elapsed_s"] = elapsed
+    report["rows_per_s"] = len(latencies) / elapsed if elapsed > 0 else 0.0
+    report["caller_latency_ms"] = _distribution(deque(latencies), scale=1000.0)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Démo de micro-batching client vers Triton")
+    parser.add_argument("--url", "-u", help="URL de base du service (défaut: stand-in local)")
+    parser.add_argument("--model-name", "-m", default=DEFAULT_MODEL_NAME, help="Nom du modèle")
+    parser.add_argument("--model-version", "-v", default=DEFAULT_MODEL_VERSION,
+                        help="Version du modèle")
+    parser.add_argument("--callers", type=int, default=200, help="Appelants concurrents")
+    parser.add_argument("--requests-per-caller", type=int, default=20,
+                        help="Lignes scorées par appelant")
+    parser.add_argument("--max-batch-size", type=int, default=64, help="Taille max d'un batch")
+    parser.add_argument("--max-delay-ms", type=float, default=5.0,
+                        help="Attente max de la plus ancienne ligne (ms)")
+    parser.add_argument("--max-concurrent-batches", type=int, default=4,
+                        help="Batches simultanément en vol")
+    parser.add_argument("--no-adaptive", action="store_true",
+                        help="Toujours attendre max-delay-ms même si le serveur est libre")
+
+    args = parser.parse_args()
+
+    batcher_kwargs = {
+        "max_batch_size": args.max_batch_size,
+        "max_delay_ms": args.max_delay_ms,
+        "max_concurrent_batches": args.max_concurrent_batches,
+        "adaptive": not args.no_adaptive
+    }
+
+    stub_server = None
+    url = args.url
+    if not url:
+        from kserve_stub_server import StubModel, StubServer
+        stub_server = StubServer(model=StubModel(args.model_name, args.model_version)).start()
+        url = stub_server.url
+
+    try:
+        report = asyncio.run(_demo(url, args.model_name, args.model_version, args.callers,
+                                   args.requests_per_caller, batcher_kwargs))
+    finally:
+        if stub_server:
+            stub_server.stop()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Cache de prédictions LRU/TTL devant le client d'inférence
+Clé: nom/version du modèle + vecteur de features quantifié; seuls les défauts de
+cache d'un batch sont envoyés au serveur
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from triton_client import Features, InferenceError
+
+CacheKey = Tuple[str, str, bytes]
+
+DEFAULT_VERSION_CHECK_INTERVAL_S = 30.0
+
+
+class PredictionCache:
+    """
+    Cache borné (éviction LRU) avec expiration (TTL), thread-safe
+
+    Les features sont arrondies à `decimals` décimales avant hachage pour que
+    5.1 et 5.1000001 partagent la même entrée; -0.0 est ramené à 0.0.
+    """
+
+    def __init__(self, max_entries: int = 100_000, ttl_s: Optional[float] = 300.0,
+                 decimals: int = 4, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.decimals = decimals
+        self._clock = clock
+
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def keys_for(self, model_name: str, model_version: str,
+                 features: np.ndarray) -> List[CacheKey]:
+        """Clés canoniques d'un batch [N, F] (quantification vectorisée)"""
+        quantized = np.round(np.asarray(features, dtype=np.float64), self.decimals) + 0.0
+        return [(model_name, model_version, row.tobytes()) for row in quantized]
+
+    def get(self, key: CacheKey) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, value = entry
+            if self.ttl_s is not None and self._clock() - stored_at > self.ttl_s:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: CacheKey, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, model_name: Optional[str] = None,
+                   keep_version: Optional[str] = None) -> int:
+        """
+        Supprime les entrées d'un modèle (toutes si model_name est None), en
+        conservant éventuellement celles de keep_version. Retourne le nombre supprimé.
+        """
+        with self._lock:
+            stale = [key for key in self._entries
+                     if (model_name is None or key[0] == model_name)
+                     and (keep_version is None or key[1] != keep_version)]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
+
+
+class CachedInferenceClient:
+    """
+    Enveloppe un client exposant infer(rows) (HTTP, gRPC ou backend local)
+
+    Dans un batch, seules les lignes absentes du cache (dédupliquées) sont
+    envoyées. Toutes les version_check_interval_s secondes (None ou 0: jamais),
+    les métadonnées de la version ciblée par le client (/versions/<v>) sont
+    relues: si cette version n'est plus servie ou si sa description change
+    (redéploiement), le cache du modèle est vidé.
+    """
+
+    def __init__(self, client: Any, cache: Optional[PredictionCache] = None,
+                 version_check_interval_s: Optional[float] = DEFAULT_VERSION_CHECK_INTERVAL_S):
+        self.client = client
+        self.cache = cache or PredictionCache()
+        # Backend local: pas de métadonnées serveur à surveiller
+        self.version_check_interval_s = (version_check_interval_s
+                                         if hasattr(client, "model_metadata") else None)
+
+        self.model_name = client.model_name
+        self._served_version = str(client.model_version)
+        self._deployment: Optional[str] = None
+        self._last_version_check: Optional[float] = None
+        self._version_lock = threading.Lock()
+
+    @property
+    def model_version(self) -> str:
+        return self._served_version
+
+    def set_model_version(self, version: Any) -> None:
+        """Déclare une nouvelle version servie et invalide les entrées des autres versions"""
+        version = str(version)
+        with self._version_lock:
+            if version == self._served_version:
+                return
+            self._served_version = version
+        self.cache.invalidate(self.model_name, keep_version=version)
+
+    def _deployment_signature(self) -> Optional[str]:
+        """
+        Description de la version ciblée (liste des versions exclue: en déployer une
+        autre ne change pas les prédictions de celle-ci); None si elle n'est plus servie
+        """
+        try:
+            metadata = self.client.model_metadata()
+        except InferenceError:
+            return None
+        versions = [str(v) for v in metadata.get("versions") or []]
+        if versions and self._served_version not in versions:
+            return None
+        return json.dumps({k: v for k, v in metadata.items() if k != "versions"},
+                          sort_keys=True, default=str)
+
+    def _maybe_check_version(self) -> None:
+        if not self.version_check_interval_s:
+            return
+        with self._version_lock:
+            now = time.monotonic()
+            # Premier appel: relevé de référence avant de mettre quoi que ce soit en cache
+            if (self._last_version_check is not None
+                    and now - self._last_version_check < self.version_check_interval_s):
+                return
+            self._last_version_check = now
+        signature = self._deployment_signature()
+        with self._version_lock:
+            changed = signature is None or (self._deployment is not None
+                                            and signature != self._deployment)
+            self._deployment = signature
+        if changed:
+            self.cache.invalidate(self.model_name)
+
+    def infer(self, rows: Features, timeout: Optional[float] = None) -> Dict[str, Any]:
+        self._maybe_check_version()
+        features = np.asarray(rows, dtype=np.float32)
+        if features.ndim == 1:
+            features = features.reshape(1, -1)
+
+        version = self._served_version
+        keys = self.cache.keys_for(self.model_name, version, features)
+        cached: List[Optional[Tuple[int, np.ndarray]]] = [self.cache.get(key) for key in keys]
+
+        # Défauts de cache dédupliqués: une seule ligne envoyée par clé
+        miss_index: Dict[Hashable, int] = {}
+        miss_rows: List[int] = []
+        for i, (key, value) in enumerate(zip(keys, cached)):
+            if value is None and key not in miss_index:
+                miss_index[key] = len(miss_rows)
+                miss_rows.append(i)
+
+        fetched: List[Tuple[int, Optional[np.ndarray]]] = []
+        if miss_rows:
+            result = self.client.infer(features[miss_rows], timeout=timeout)
+            predictions = np.asarray(result["predictions"]).reshape(len(miss_rows))
+            probabilities = result["probabilities"]
+            if probabilities is not None:
+                probabilities = np.asarray(probabilities, dtype=np.float32).reshape(
+                    len(miss_rows), -1)
+            for j, i in enumerate(miss_rows):
+                value = (int(predictions[j]),
+                         probabilities[j].copy() if probabilities is not None else None)
+                fetched.append(value)
+                self.cache.put(keys[i], value)
+
+        values = [value if value is not None else fetched[miss_index[key]]
+                  for key, value in zip(keys, cached)]
+        predictions = np.fromiter((v[0] for v in values), dtype=np.int64, count=len(values))
+        probabilities = (np.stack([v[1] for v in values])
+                         if values and values[0][1] is not None else None)
+        return {"predictions": predictions, "probabilities": probabilities,
+                "shape": [len(values)]}
+
+    def model_metadata(self) -> Dict[str, Any]:
+        return self.client.model_metadata()
+
+    def close(self) -> None:
+        self.client.close()
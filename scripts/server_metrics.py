@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Métriques côté serveur pour le benchmark: relevés Prometheus (/metrics, port 8002 chez Triton)
+et statistiques KServe v2 (/v2/models/<nom>/versions/<v>/stats) avant et après un run,
+pour séparer la file d'attente et le calcul du serveur de la latence observée par le client
+"""
+
+import re
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+
+STAGES = ("queue", "compute_input", "compute_infer", "compute_output")
+
+# Compteurs Prometheus de Triton (durées cumulées en microsecondes)
+PROMETHEUS_COUNTERS = {
+    "success": "nv_inference_request_success",
+    "failure": "nv_inference_request_failure",
+    "inferences": "nv_inference_count",
+    "executions": "nv_inference_exec_count",
+    "request_us": "nv_inference_request_duration_us",
+    **{f"{stage}_us": f"nv_inference_{stage}_duration_us" for stage in STAGES},
+}
+
+_SAMPLE_RE = re.compile(r"^(?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(?P<labels>[^}]*)\})?\s+"
+                        r"(?P<value>\S+)")
+_LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+Sample = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def parse_prometheus(text: str) -> Dict[Sample, float]:
+    """
+    Format texte Prometheus -> {(métrique, labels triés): valeur}
+    Les commentaires (# HELP / # TYPE) et les timestamps sont ignorés
+    """
+    samples: Dict[Sample, float] = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        match = _SAMPLE_RE.match(line)
+        if not match:
+            continue
+        labels = tuple(sorted(_LABEL_RE.findall(match.group("labels") or "")))
+        try:
+            samples[(match.group("name"), labels)] = float(match.group("value"))
+        except ValueError:
+            continue
+    return samples
+
+
+def _per_request(total: float, count: float) -> Optional[float]:
+    return total / count if count else None
+
+
+def _ms(value: Optional[float], per_ms: float) -> Optional[float]:
+    return value / per_ms if value is not None else None
+
+
+def prometheus_breakdown(before: Dict[Sample, float], after: Dict[Sample, float],
+                         model_name: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Deltas des compteurs nv_inference_* par version du modèle; durées moyennes en ms
+    par requête (Triton cumule file et calcul sur toutes les requêtes, succès ou échec)
+    """
+    deltas: Dict[str, Dict[str, float]] = {}
+    metric_keys = {metric: key for key, metric in PROMETHEUS_COUNTERS.items()}
+    for (metric, labels), value in after.items():
+        key = metric_keys.get(metric)
+        label_map = dict(labels)
+        if key is None or label_map.get("model") != model_name:
+            continue
+        version = label_map.get("version", "")
+        delta = value - before.get((metric, labels), 0.0)
+        bucket = deltas.setdefault(version, {})
+        bucket[key] = bucket.get(key, 0.0) + delta
+
+    breakdown = {}
+    for version, delta in sorted(deltas.items()):
+        requests_count = delta.get("success", 0.0) + delta.get("failure", 0.0)
+        breakdown[version] = {
+            "requests": int(requests_count),
+            "failures": int(delta.get("failure", 0.0)),
+            "inferences": int(delta.get("inferences", 0.0)),
+            "executions": int(delta.get("executions", 0.0)),
+            "request_ms": _ms(_per_request(delta.get("request_us", 0.0), requests_count), 1e3),
+            **{f"{stage}_ms": _ms(_per_request(delta.get(f"{stage}_us", 0.0), requests_count), 1e3)
+               for stage in STAGES},
+        }
+    return breakdown
+
+
+def statistics_breakdown(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Deltas de la réponse /stats par version; chaque étape a son propre compteur
+    (durées moyennes en ms par requête comptée dans l'étape)
+    """
+    previous = {entry["version"]: entry for entry in before.get("model_stats", [])}
+    breakdown = {}
+    for entry in after.get("model_stats", []):
+        old = previous.get(entry["version"], {})
+        old_stats = old.get("inference_stats", {})
+
+        def delta(stage: str) -> Tuple[int, int]:
+            new = entry["inference_stats"].get(stage, {})
+            prev = old_stats.get(stage, {})
+            return (int(new.get("count", 0)) - int(prev.get("count", 0)),
+                    int(new.get("ns", 0)) - int(prev.get("ns", 0)))
+
+        success, fail = delta("success"), delta("fail")
+        requests_count = success[0] + fail[0]
+        stages = {stage: delta(stage) for stage in STAGES}
+        breakdown[entry["version"]] = {
+            "requests": requests_count,
+            "failures": fail[0],
+            "inferences": int(entry.get("inference_count", 0)) - int(old.get("inference_count", 0)),
+            "executions": int(entry.get("execution_count", 0)) - int(old.get("execution_count", 0)),
+            "request_ms": _ms(_per_request(success[1] + fail[1], requests_count), 1e6),
+            **{f"{stage}_ms": _ms(_per_request(ns, count), 1e6)
+               for stage, (count, ns) in stages.items()},
+        }
+    return breakdown
+
+
+class ServerMetricsScraper:
+    """
+    Relève les métriques du serveur autour d'un run de benchmark
+    metrics_url: endpoint Prometheus (défaut: <base_url>/metrics, http://<hôte>:8002/metrics
+    chez Triton); les statistiques v2 sont lues sur base_url (HTTP)
+    Une source indisponible est signalée une fois puis ignorée
+    """
+
+    def __init__(self, base_url: str, model_name: str, model_version: str,
+                 metrics_url: Optional[str] = None, timeout: float = 10.0):
+        self.base_url = base_url.rstrip("/")
+        self.model_name = model_name
+        self.model_version = model_version
+        self.metrics_url = metrics_url or f"{self.base_url}/metrics"
+        self.stats_url = f"{self.base_url}/v2/models/{model_name}/versions/{model_version}/stats"
+        self.timeout = timeout
+        self._session = requests.Session()
+        self._disabled: Dict[str, str] = {}
+
+    def _get(self, source: str, url: str) -> Optional[requests.Response]:
+        if source in self._disabled:
+            return None
+        try:
+            response = self._session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            return response
+        except requests.exceptions.RequestException as e:
+            self._disabled[source] = str(e)
+            print(f"⚠️  Métriques serveur ({source}) indisponibles: {e}")
+            return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Relevé instantané {"prometheus": échantillons, "statistics": réponse /stats}"""
+        metrics = self._get("prometheus", self.metrics_url)
+        stats = self._get("statistics", self.stats_url)
+        return {
+            "prometheus": parse_prometheus(metrics.text) if metrics is not None else None,
+            "statistics": stats.json() if stats is not None else None,
+        }
+
+    def breakdown(self, before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+        """Décomposition serveur par source et par version entre deux relevés"""
+        result: Dict[str, Any] = {}
+        if before["prometheus"] is not None and after["prometheus"] is not None:
+            result["prometheus"] = prometheus_breakdown(before["prometheus"], after["prometheus"],
+                                                        self.model_name)
+        if before["statistics"] is not None and after["statistics"] is not None:
+            result["statistics"] = statistics_breakdown(before["statistics"], after["statistics"])
+        return result
+
+    def close(self) -> None:
+        self._session.close()
+
+
+def attribute_latency(server: Dict[str, Any], client_latency_ms: Dict[str, Optional[float]],
+                      model_version: str) -> Optional[Dict[str, Any]]:
+    """
+    Moyennes serveur de la version testée (statistiques v2 en priorité, Prometheus sinon)
+    face à la latence moyenne du client: l'écart est le réseau, la (dé)sérialisation HTTP/gRPC
+    et le temps passé côté client
+    """
+    for source in ("statistics", "prometheus"):
+        versions = server.get(source) or {}
+        stats = versions.get(model_version)
+        if stats and stats["requests"] and stats["request_ms"] is not None:
+            break
+    else:
+        return None
+
+    client_mean = client_latency_ms.get("mean")
+    stages = {stage: stats[f"{stage}_ms"] for stage in STAGES}
+    attributed = sum(value for value in stages.values() if value is not None)
+    return {
+        "source": source,
+        "model_version": model_version,
+        "server_requests": stats["requests"],
+        "client_mean_ms": client_mean,
+        "server_request_ms": stats["request_ms"],
+        **{f"{stage}_ms": value for stage, value in stages.items()},
+        "server_other_ms": max(stats["request_ms"] - attributed, 0.0),
+        "network_and_client_ms": (max(client_mean - stats["request_ms"], 0.0)
+                                  if client_mean is not None else None),
+    }
+
+
+def format_attribution(attribution: Dict[str, Any]) -> str:
+    """Ligne de décomposition affichée à côté du résultat client"""
+    def fmt(value: Optional[float]) -> str:
+        return f"{value:.3f}" if value is not None else "n/a"
+
+    return (f"   🖥️  serveur v{attribution['model_version']} ({attribution['source']}): "
+            f"requête {fmt(attribution['server_request_ms'])}ms = "
+            f"file {fmt(attribution['queue_ms'])} + entrée {fmt(attribution['compute_input_ms'])} + "
+            f"calcul {fmt(attribution['compute_infer_ms'])} + "
+            f"sortie {fmt(attribution['compute_output_ms'])} + "
+            f"autre {fmt(attribution['server_other_ms'])} | "
+            f"client {fmt(attribution['client_mean_ms'])}ms -> réseau/client "
+            f"{fmt(attribution['network_and_client_ms'])}ms")
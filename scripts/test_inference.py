@@ -9,63 +9,50 @@ import json
 import numpy as np
 import argparse
 import sys
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Union
 
-# Configuration par défaut
-DEFAULT_MODEL_NAME = "iris_classifier"
-DEFAULT_MODEL_VERSION = "1"
+from prediction_cache import DEFAULT_VERSION_CHECK_INTERVAL_S
+from triton_client import (BINARY_HEADER, DEFAULT_MODEL_NAME, DEFAULT_MODEL_VERSION,
+                           REPO_ROOT, SAMPLE_DATA, decode_infer_response,
+                           encode_binary_request, extract_outputs, load_local_backend,
+                           prepare_triton_request)
 
-# Données de test Iris (features: sepal_length, sepal_width, petal_length, petal_width)
-SAMPLE_DATA = {
-    "setosa": [5.1, 3.5, 1.4, 0.2],
-    "versicolor": [6.2, 2.9, 4.3, 1.3],
-    "virginica": [6.3, 3.3, 6.0, 2.5]
-}
+# Session partagée: réutilise la connexion TCP/TLS entre les appels
+_SESSION = requests.Session()
 
 # Mapping des classes
 CLASS_NAMES = ["setosa", "versicolor", "virginica"]
 
-def prepare_triton_request(input_data: List[List[float]], 
-                          model_name: str = DEFAULT_MODEL_NAME) -> Dict[str, Any]:
-    """
-    Prépare la requête au format Triton Inference Server v2 protocol
-    """
-    return {
-        "inputs": [
-            {
-                "name": "input_features",
-                "shape": [len(input_data), 4],
-                "datatype": "FP32",
-                "data": [item for sublist in input_data for item in sublist]
-            }
-        ],
-        "outputs": [
-            {
-                "name": "predictions"
-            },
-            {
-                "name": "probabilities"
-            }
-        ]
-    }
+# Modèle exporté par le pipeline (mode local)
+DEFAULT_LOCAL_MODEL = REPO_ROOT / "models" / "iris_model.onnx"
 
-def send_inference_request(url: str, data: Dict[str, Any], 
-                          timeout: int = 30) -> requests.Response:
+def send_inference_request(url: str, data: Union[Dict[str, Any], bytes], 
+                          timeout: int = 30,
+                          exit_on_error: bool = True,
+                          header_length: Optional[int] = None) -> requests.Response:
     """
     Envoie une requête d'inférence au serveur Triton
+    Avec header_length, data est un corps binaire (extension binary data de Triton)
+    Avec exit_on_error=False l'exception est propagée (mode benchmark)
     """
-    headers = {
-        "Content-Type": "application/json",
-    }
+    if header_length is None:
+        headers = {"Content-Type": "application/json"}
+        body = json.dumps(data)
+    else:
+        headers = {"Content-Type": "application/octet-stream",
+                   BINARY_HEADER: str(header_length)}
+        body = data
     
     try:
-        response = requests.post(url, 
-                               headers=headers, 
-                               data=json.dumps(data), 
-                               timeout=timeout)
+        response = _SESSION.post(url, 
+                                 headers=headers, 
+                                 data=body, 
+                                 timeout=timeout)
         response.raise_for_status()
         return response
     except requests.exceptions.RequestException as e:
+        if not exit_on_error:
+            raise
         print(f"❌ Erreur lors de la requête: {e}")
         sys.exit(1)
 
@@ -73,30 +60,11 @@ def parse_triton_response(response: requests.Response) -> Dict[str, Any]:
     """
     Parse la réponse du serveur Triton
     """
+    header_length = response.headers.get(BINARY_HEADER)
     try:
-        result = response.json()
-        
-        # Extraire les prédictions
-        predictions_output = None
-        probabilities_output = None
-        
-        for output in result.get("outputs", []):
-            if output["name"] == "predictions":
-                predictions_output = output
-            elif output["name"] == "probabilities":
-                probabilities_output = output
-        
-        if not predictions_output:
-            raise ValueError("Sortie 'predictions' non trouvée dans la réponse")
-        
-        predictions = predictions_output["data"]
-        probabilities = probabilities_output["data"] if probabilities_output else None
-        
-        return {
-            "predictions": predictions,
-            "probabilities": probabilities,
-            "shape": predictions_output["shape"]
-        }
+        result = decode_infer_response(response.content,
+                                       int(header_length) if header_length else None)
+        return extract_outputs(result)
     except (json.JSONDecodeError, KeyError, ValueError) as e:
         print(f"❌ Erreur lors du parsing de la réponse: {e}")
         print(f"Réponse brute: {response.text}")
@@ -120,12 +88,11 @@ def format_results(parsed_response: Dict[str, Any],
         print(f"\n📊 Échantillon: {sample_name}")
         print(f"   Prédiction: {pred_class_name} (classe {pred_class_idx})")
         
-        if probabilities:
-            # Afficher les probabilités pour chaque classe
+        if probabilities is not None:
+            # Afficher les probabilités pour chaque classe (liste JSON à plat ou tableau binaire)
             print("   Probabilités:")
-            start_idx = i * 3
-            for j, class_name in enumerate(CLASS_NAMES):
-                prob = probabilities[start_idx + j]
+            row_probabilities = np.asarray(probabilities).reshape(-1, len(CLASS_NAMES))[i]
+            for class_name, prob in zip(CLASS_NAMES, row_probabilities):
                 print(f"     - {class_name}: {prob:.4f} ({prob*100:.2f}%)")
 
 def test_health_check(base_url: str) -> bool:
@@ -168,39 +135,201 @@ def test_model_metadata(base_url: str, model_name: str, model_version: str) -> b
         print(f"❌ Erreur métadonnées: {e}")
         return False
 
-def main():
-    parser = argparse.ArgumentParser(description="Test d'inférence pour le modèle Iris Triton")
-    parser.add_argument("--url", "-u", 
-                       default="http://iris-classifier-triton-rhods-notebooks.apps.your-cluster.com",
-                       help="URL de base du service d'inférence")
-    parser.add_argument("--model-name", "-m", 
-                       default=DEFAULT_MODEL_NAME,
-                       help="Nom du modèle")
-    parser.add_argument("--model-version", "-v", 
-                       default=DEFAULT_MODEL_VERSION,
-                       help="Version du modèle")
-    parser.add_argument("--samples", "-s", 
-                       nargs="+",
-                       default=["setosa", "versicolor", "virginica"],
-                       choices=list(SAMPLE_DATA.keys()),
-                       help="Échantillons à tester")
-    parser.add_argument("--custom-data", 
-                       help="Données personnalisées au format JSON: [[5.1,3.5,1.4,0.2]]")
+def run_bench(args: argparse.Namespace) -> None:
+    """
+    Exécute le benchmark de charge et affiche le rapport JSON
+    """
+    from bench_inference import compare_transports, run_benchmark
     
-    args = parser.parse_args()
+    mode = f"QPS cible {args.qps}" if args.qps else "boucle fermée"
+    print(f"\n⏱️  Benchmark {args.transport}: {mode}, concurrence {args.concurrency}, "
+          f"{args.duration}s par batch, batches {args.batch_sizes}")
+    
+    server_metrics = None
+    if args.server_metrics:
+        from server_metrics import ServerMetricsScraper
+        server_metrics = ServerMetricsScraper(args.url, args.model_name, args.model_version,
+                                              metrics_url=args.metrics_url)
+    
+    bench_kwargs = {
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "qps": args.qps,
+        "warmup": args.warmup,
+        "binary": args.binary,
+        "server_metrics": server_metrics
+    }
+    if args.transport == "both":
+        report = compare_transports(args.url, args.grpc_url, args.model_name,
+                                    args.model_version, args.batch_sizes, **bench_kwargs)
+    else:
+        url = {"grpc": args.grpc_url, "local": args.model_path}.get(args.transport, args.url)
+        report = run_benchmark(url, args.model_name, args.model_version,
+                               batch_sizes=args.batch_sizes,
+                               transport=args.transport,
+                               **bench_kwargs)
+    
+    if server_metrics:
+        server_metrics.close()
+    
+    report_json = json.dumps(report, indent=2)
+    print(report_json)
+    if args.bench_output:
+        with open(args.bench_output, "w") as f:
+            f.write(report_json)
+        print(f"💾 Rapport sauvegardé: {args.bench_output}")
+
+def run_bulk(args: argparse.Namespace) -> None:
+    """
+    Score un fichier JSONL/CSV/NPY complet en flux et écrit les résultats au fil de l'eau
+    """
+    from bulk_scoring import run_bulk_scoring
+    from triton_client import InferenceError, TritonHTTPClient
+    
+    if not args.input or not args.output:
+        print("❌ --input et --output sont requis en mode bulk")
+        sys.exit(1)
+    
+    print(f"\n📦 Scoring en masse: {args.input} -> {args.output} "
+          f"(chunks de {args.chunk_size}, {args.parallelism} en parallèle)")
+    
+    if args.transport == "grpc":
+        from triton_grpc import TritonGRPCClient
+        client = TritonGRPCClient(args.grpc_url, args.model_name, args.model_version)
+    elif args.transport == "local":
+        client = load_local_backend(args.model_path)
+    else:
+        client = TritonHTTPClient(args.url, args.model_name, args.model_version,
+                                  pool_size=args.parallelism, binary=args.binary)
+    
+    if args.cache_size > 0:
+        from prediction_cache import CachedInferenceClient, PredictionCache
+        cache = PredictionCache(max_entries=args.cache_size,
+                                ttl_s=args.cache_ttl,
+                                decimals=args.cache_decimals)
+        client = CachedInferenceClient(client, cache,
+                                       version_check_interval_s=args.cache_version_check)
+    
+    try:
+        summary = run_bulk_scoring(client, args.input, args.output,
+                                   chunk_size=args.chunk_size,
+                                   parallelism=args.parallelism,
+                                   resume=args.resume)
+    except (InferenceError, ValueError) as e:
+        print(f"❌ Scoring interrompu: {e}")
+        print("💡 Relancer avec --resume pour reprendre au dernier chunk écrit")
+        sys.exit(1)
+    finally:
+        client.close()
+    
+    if args.cache_size > 0:
+        summary["cache"] = client.cache.stats()
+    
+    print(f"✅ {summary['rows_scored']} lignes scorées "
+          f"({summary['rows_per_s']:.0f} lignes/s, reprise à la ligne {summary['resumed_from_row']})")
+    print(json.dumps(summary, indent=2))
+
+def test_grpc_server(grpc_url: str, model_name: str, model_version: str) -> bool:
+    """
+    Vérifie la santé et les métadonnées du modèle via gRPC
+    """
+    from triton_client import InferenceError
+    from triton_grpc import TritonGRPCClient
+    
+    with TritonGRPCClient(grpc_url, model_name, model_version, timeout=10) as client:
+        if not client.is_ready():
+            print(f"❌ Serveur gRPC non prêt: {grpc_url}")
+            return False
+        try:
+            metadata = client.model_metadata()
+        except InferenceError as e:
+            print(f"❌ Erreur métadonnées gRPC: {e}")
+            return False
+    
+    print(f"✅ Serveur gRPC accessible, modèle {model_name} v{model_version} disponible")
+    print(f"   Platform: {metadata.get('platform', 'N/A')}")
+    return True
+
+def run_grpc_infer(args: argparse.Namespace, input_data: List[List[float]],
+                   sample_names: List[str]) -> None:
+    """
+    Inférence unaire via gRPC et affichage des résultats
+    """
+    import time
+    from triton_client import InferenceError
+    from triton_grpc import TritonGRPCClient
+    
+    print(f"\n🔄 Envoi de la requête d'inférence gRPC...")
+    print(f"URL: {args.grpc_url}")
+    
+    with TritonGRPCClient(args.grpc_url, args.model_name, args.model_version) as client:
+        started = time.perf_counter()
+        try:
+            parsed_response = client.infer(input_data)
+        except InferenceError as e:
+            print(f"❌ Erreur lors de la requête: {e}")
+            sys.exit(1)
+        elapsed = time.perf_counter() - started
+    
+    format_results(parsed_response, sample_names)
+    
+    print(f"\n✅ Test d'inférence gRPC terminé avec succès!")
+    print(f"Temps de réponse: {elapsed:.3f}s")
+
+def run_local_infer(args: argparse.Namespace, input_data: List[List[float]],
+                    sample_names: List[str]) -> None:
+    """
+    Inférence en process (ONNX Runtime ou pickle), sans serveur
+    """
+    import time
+    
+    backend = load_local_backend(args.model_path)
+    print(f"\n🔄 Inférence locale ({backend.format}): {args.model_path}")
+    print(f"   Chargement: {backend.load_time_s * 1000:.1f}ms")
+    
+    started = time.perf_counter()
+    parsed_response = backend.infer(input_data)
+    elapsed = time.perf_counter() - started
     
+    format_results(parsed_response, sample_names)
+    
+    print(f"\n✅ Test d'inférence locale terminé avec succès!")
+    print(f"Temps d'inférence: {elapsed * 1000:.3f}ms")
+
+def run_cli(args: argparse.Namespace) -> None:
+    """
+    Vérifie le serveur puis exécute l'inférence simple ou le benchmark
+    """
     print("🚀 DÉMARRAGE DU TEST D'INFÉRENCE TRITON")
     print("=" * 50)
-    print(f"URL: {args.url}")
+    if args.transport == "local":
+        print(f"Modèle local: {args.model_path}")
+    if args.transport in ("http", "both"):
+        print(f"URL: {args.url}")
+    if args.transport in ("grpc", "both"):
+        print(f"gRPC: {args.grpc_url}")
     print(f"Modèle: {args.model_name} v{args.model_version}")
     
-    # Test de santé du serveur
-    if not test_health_check(args.url):
-        sys.exit(1)
+    if args.transport in ("http", "both"):
+        # Test de santé du serveur
+        if not test_health_check(args.url):
+            sys.exit(1)
+        
+        # Test des métadonnées du modèle
+        if not test_model_metadata(args.url, args.model_name, args.model_version):
+            sys.exit(1)
     
-    # Test des métadonnées du modèle
-    if not test_model_metadata(args.url, args.model_name, args.model_version):
-        sys.exit(1)
+    if args.transport in ("grpc", "both"):
+        if not test_grpc_server(args.grpc_url, args.model_name, args.model_version):
+            sys.exit(1)
+    
+    if args.mode == "bench":
+        run_bench(args)
+        return
+    
+    if args.mode == "bulk":
+        run_bulk(args)
+        return
     
     # Préparer les données d'entrée
     if args.custom_data:
@@ -216,17 +345,27 @@ def main():
     
     print(f"\n📋 Test avec {len(input_data)} échantillon(s)")
     
-    # Préparer la requête Triton
-    triton_request = prepare_triton_request(input_data, args.model_name)
+    if args.transport == "grpc":
+        run_grpc_infer(args, input_data, sample_names)
+        return
+    
+    if args.transport == "local":
+        run_local_infer(args, input_data, sample_names)
+        return
     
     # URL d'inférence
     inference_url = f"{args.url}/v2/models/{args.model_name}/versions/{args.model_version}/infer"
     
-    print(f"\n🔄 Envoi de la requête d'inférence...")
+    print(f"\n🔄 Envoi de la requête d'inférence{' (binaire)' if args.binary else ''}...")
     print(f"URL: {inference_url}")
     
-    # Envoyer la requête
-    response = send_inference_request(inference_url, triton_request)
+    # Préparer et envoyer la requête Triton
+    if args.binary:
+        body, header_length = encode_binary_request(np.asarray(input_data, dtype=np.float32))
+        response = send_inference_request(inference_url, body, header_length=header_length)
+    else:
+        triton_request = prepare_triton_request(input_data, args.model_name)
+        response = send_inference_request(inference_url, triton_request)
     
     # Parser et afficher les résultats
     parsed_response = parse_triton_response(response)
@@ -236,5 +375,111 @@ def main():
     print(f"Status: {response.status_code}")
     print(f"Temps de réponse: {response.elapsed.total_seconds():.3f}s")
 
+def main():
+    parser = argparse.ArgumentParser(description="Test d'inférence pour le modèle Iris Triton")
+    parser.add_argument("--url", "-u", 
+                       default="http://iris-classifier-triton-rhods-notebooks.apps.your-cluster.com",
+                       help="URL de base du service d'inférence")
+    parser.add_argument("--model-name", "-m", 
+                       default=DEFAULT_MODEL_NAME,
+                       help="Nom du modèle")
+    parser.add_argument("--model-version", "-v", 
+                       default=DEFAULT_MODEL_VERSION,
+                       help="Version du modèle")
+    parser.add_argument("--samples", "-s", 
+                       nargs="+",
+                       default=["setosa", "versicolor", "virginica"],
+                       choices=list(SAMPLE_DATA.keys()),
+                       help="Échantillons à tester")
+    parser.add_argument("--custom-data", 
+                       help="Données personnalisées au format JSON: [[5.1,3.5,1.4,0.2]]")
+    parser.add_argument("--mode",
+                       choices=["infer", "bench", "bulk"],
+                       default="infer",
+                       help="infer: requête unique, bench: benchmark de charge, "
+                            "bulk: scoring d'un fichier complet")
+    parser.add_argument("--transport",
+                       choices=["http", "grpc", "both", "local"],
+                       default="http",
+                       help="Transport KServe v2 (both: comparaison HTTP/gRPC en mode bench, "
+                            "local: ONNX Runtime en process sans réseau)")
+    parser.add_argument("--grpc-url",
+                       default="localhost:8001",
+                       help="Adresse gRPC host:port du service d'inférence")
+    parser.add_argument("--model-path",
+                       default=str(DEFAULT_LOCAL_MODEL),
+                       help="Modèle .onnx ou .pkl pour --transport local")
+    parser.add_argument("--binary",
+                       action="store_true",
+                       help="Tenseurs bruts via l'extension binaire Triton au lieu de listes JSON")
+    parser.add_argument("--stub",
+                       action="store_true",
+                       help="Démarrer un stand-in KServe v2 local et l'utiliser comme serveur")
+    
+    bench_group = parser.add_argument_group("benchmark (--mode bench)")
+    bench_group.add_argument("--concurrency", type=int, default=4,
+                             help="Nombre de requêtes simultanées")
+    bench_group.add_argument("--qps", type=float, default=None,
+                             help="QPS cible (boucle ouverte); sans valeur: boucle fermée")
+    bench_group.add_argument("--duration", type=float, default=10.0,
+                             help="Durée de mesure par taille de batch (secondes)")
+    bench_group.add_argument("--warmup", type=float, default=1.0,
+                             help="Durée de chauffe par taille de batch (secondes)")
+    bench_group.add_argument("--batch-sizes", type=int, nargs="+", default=[1],
+                             help="Tailles de batch à balayer")
+    bench_group.add_argument("--server-metrics", action="store_true",
+                             help="Relève /metrics (Prometheus) et /stats (v2) avant et après "
+                                  "chaque batch: file, entrée, calcul et sortie côté serveur")
+    bench_group.add_argument("--metrics-url",
+                             help="Endpoint Prometheus (défaut: <url>/metrics, "
+                                  "http://<hôte>:8002/metrics pour Triton)")
+    bench_group.add_argument("--bench-output",
+                             help="Fichier JSON où écrire le rapport du benchmark")
+    
+    bulk_group = parser.add_argument_group("scoring en masse (--mode bulk)")
+    bulk_group.add_argument("--input",
+                            help="Fichier d'entrée .jsonl, .csv ou .npy ([N, 4])")
+    bulk_group.add_argument("--output",
+                            help="Fichier de résultats .jsonl ou .csv")
+    bulk_group.add_argument("--chunk-size", type=int, default=1024,
+                            help="Lignes par requête batchée")
+    bulk_group.add_argument("--parallelism", type=int, default=4,
+                            help="Requêtes batchées simultanément en vol")
+    bulk_group.add_argument("--resume", action="store_true",
+                            help="Reprendre depuis le dernier checkpoint de --output")
+    bulk_group.add_argument("--cache-size", type=int, default=0,
+                            help="Entrées du cache de prédictions LRU (0: désactivé)")
+    bulk_group.add_argument("--cache-ttl", type=float, default=300.0,
+                            help="Durée de vie d'une entrée du cache (secondes)")
+    bulk_group.add_argument("--cache-decimals", type=int, default=4,
+                            help="Décimales conservées pour la clé de cache")
+    bulk_group.add_argument("--cache-version-check", type=float,
+                            default=DEFAULT_VERSION_CHECK_INTERVAL_S,
+                            help="Intervalle (secondes) de vérification de la version servie; "
+                                 "le cache est vidé si elle est redéployée (0: désactivé)")
+    
+    args = parser.parse_args()
+    
+    if args.transport == "both" and args.mode != "bench":
+        parser.error("--transport both n'est disponible qu'en mode bench")
+    
+    stub_servers = []
+    if args.stub:
+        from kserve_stub_server import StubGRPCServer, StubModel, StubServer
+        stub_model = StubModel(args.model_name, args.model_version)
+        # Les métriques serveur sont lues en HTTP, y compris pour un benchmark gRPC
+        if args.transport in ("http", "both") or args.server_metrics:
+            stub_servers.append(StubServer(model=stub_model).start())
+            args.url = stub_servers[-1].url
+        if args.transport in ("grpc", "both"):
+            stub_servers.append(StubGRPCServer(model=stub_model).start())
+            args.grpc_url = stub_servers[-1].url
+    
+    try:
+        run_cli(args)
+    finally:
+        for stub_server in stub_servers:
+            stub_server.stop()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+Client d'inférence KServe v2 réutilisable pour le modèle Iris servi par Triton
+Session HTTP poolée (keep-alive) en synchrone, variante asyncio basée sur aiohttp
+"""
+
+import asyncio
+import json
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# Racine du dépôt: modules du pipeline dans pipelines/, modèle exporté dans models/
+REPO_ROOT = Path(__file__).resolve().parents[1]
+PIPELINES_DIR = str(REPO_ROOT / "pipelines")
+
+# Noms du modèle et des tenseurs: ceux du config.pbtxt généré par le pipeline
+try:
+    from triton_config import (INPUT_NAME, LABEL_OUTPUT, MODEL_NAME, OUTPUT_NAMES,
+                               PROBABILITIES_OUTPUT)
+except ImportError:
+    sys.path.append(PIPELINES_DIR)
+    from triton_config import (INPUT_NAME, LABEL_OUTPUT, MODEL_NAME, OUTPUT_NAMES,
+                               PROBABILITIES_OUTPUT)
+
+DEFAULT_MODEL_NAME = MODEL_NAME
+DEFAULT_MODEL_VERSION = "1"
+DEFAULT_TIMEOUT = 30.0
+
+# Extension binaire Triton: longueur de l'en-tête JSON en tête du corps
+BINARY_HEADER = "Inference-Header-Content-Length"
+
+# Types v2 -> dtype NumPy (Triton sérialise en little-endian)
+DATATYPE_TO_NUMPY = {
+    "BOOL": np.dtype("?"),
+    "UINT8": np.dtype("u1"),
+    "INT8": np.dtype("i1"),
+    "INT32": np.dtype("<i4"),
+    "INT64": np.dtype("<i8"),
+    "FP16": np.dtype("<f2"),
+    "FP32": np.dtype("<f4"),
+    "FP64": np.dtype("<f8"),
+}
+
+Features = Union[List[List[float]], np.ndarray]
+
+# Données de test Iris (features: sepal_length, sepal_width, petal_length, petal_width)
+SAMPLE_DATA = {
+    "setosa": [5.1, 3.5, 1.4, 0.2],
+    "versicolor": [6.2, 2.9, 4.3, 1.3],
+    "virginica": [6.3, 3.3, 6.0, 2.5]
+}
+
+
+def load_local_backend(model_path: str, **session_kwargs: Any):
+    """
+    Charge le backend d'inférence en process (pipelines/local_inference.py)
+    """
+    if PIPELINES_DIR not in sys.path:
+        sys.path.append(PIPELINES_DIR)
+    from local_inference import LocalInferenceBackend
+    return LocalInferenceBackend(model_path, **session_kwargs)
+
+
+class InferenceError(Exception):
+    """
+    Erreur structurée renvoyée par le client au lieu d'un sys.exit
+
+    kind: "timeout", "connection", "http", "grpc" ou "decode"
+    """
+
+    def __init__(self, message: str, kind: str, url: Optional[str] = None,
+                 status_code: Optional[int] = None, body: Optional[str] = None):
+        super().__init__(message)
+        self.kind = kind
+        self.url = url
+        self.status_code = status_code
+        self.body = body
+
+    @property
+    def label(self) -> str:
+        """Étiquette courte pour agréger les erreurs (ex: http_503, grpc_14, timeout)"""
+        if self.kind in ("http", "grpc") and self.status_code is not None:
+            return f"{self.kind}_{self.status_code}"
+        return self.kind
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"message": str(self), "kind": self.kind, "url": self.url,
+                "status_code": self.status_code}
+
+
+def prepare_triton_request(input_data: Features,
+                          model_name: str = DEFAULT_MODEL_NAME) -> Dict[str, Any]:
+    """
+    Prépare la requête au format Triton Inference Server v2 protocol
+    """
+    if isinstance(input_data, np.ndarray):
+        data = input_data.astype(np.float32, copy=False).ravel().tolist()
+    else:
+        data = [item for sublist in input_data for item in sublist]
+
+    return {
+        "inputs": [
+            {
+                "name": INPUT_NAME,
+                "shape": [len(input_data), 4],
+                "datatype": "FP32",
+                "data": data
+            }
+        ],
+        "outputs": [{"name": name} for name in OUTPUT_NAMES]
+    }
+
+
+def encode_binary_request(features: Features) -> Tuple[bytes, int]:
+    """
+    Encode une requête avec l'extension binaire Triton (en-tête JSON + tenseur FP32 brut)
+    Retourne (corps, longueur de l'en-tête JSON) pour Inference-Header-Content-Length
+    """
+    array = np.ascontiguousarray(features, dtype=DATATYPE_TO_NUMPY["FP32"])
+    if array.ndim == 1:
+        array = array.reshape(1, -1)
+
+    header = {
+        "inputs": [
+            {
+                "name": INPUT_NAME,
+                "shape": list(array.shape),
+                "datatype": "FP32",
+                "parameters": {"binary_data_size": array.nbytes}
+            }
+        ],
+        "outputs": [{"name": name, "parameters": {"binary_data": True}}
+                    for name in OUTPUT_NAMES]
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+    # Une seule copie mémoire du buffer NumPy, sans conversion élément par élément
+    return b"".join((header_bytes, memoryview(array).cast("B"))), len(header_bytes)
+
+
+def decode_infer_response(body: bytes, header_length: Optional[int]) -> Dict[str, Any]:
+    """
+    Décode une réponse v2, binaire ou JSON
+
+    Les sorties binaires sont des vues np.frombuffer sur le corps (zéro copie,
+    en lecture seule) remises à la forme annoncée par le serveur.
+    """
+    if header_length is None:
+        return json.loads(body)
+
+    result = json.loads(body[:header_length])
+    offset = header_length
+    for output in result.get("outputs", []):
+        size = (output.get("parameters") or {}).get("binary_data_size")
+        if size is None:
+            continue
+        dtype = DATATYPE_TO_NUMPY[output["datatype"]]
+        output["data"] = np.frombuffer(body, dtype=dtype, count=size // dtype.itemsize,
+                                       offset=offset).reshape(output["shape"])
+        offset += size
+    return result
+
+
+def extract_outputs(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Extrait prédictions et probabilités d'une réponse v2 déjà décodée
+    """
+    outputs = {output["name"]: output for output in result.get("outputs", [])}
+
+    predictions_output = outputs.get(LABEL_OUTPUT)
+    if not predictions_output:
+        raise ValueError(f"Sortie '{LABEL_OUTPUT}' non trouvée dans la réponse")
+
+    probabilities_output = outputs.get(PROBABILITIES_OUTPUT)
+    return {
+        "predictions": predictions_output["data"],
+        "probabilities": probabilities_output["data"] if probabilities_output else None,
+        "shape": predictions_output["shape"]
+    }
+
+
+class TritonHTTPClient:
+    """
+    Client synchrone avec une session requests poolée (connexions keep-alive)
+
+    Thread-safe: le nombre de requêtes en vol est borné par max_in_flight et le
+    pool garde jusqu'à pool_size connexions ouvertes vers le serveur.
+    Avec binary=True les tenseurs transitent via l'extension binaire Triton
+    (les sorties sont alors des tableaux NumPy), sinon en listes JSON.
+    """
+
+    def __init__(self, base_url: str, model_name: str = DEFAULT_MODEL_NAME,
+                 model_version: str = DEFAULT_MODEL_VERSION,
+                 timeout: float = DEFAULT_TIMEOUT, pool_size: int = 10,
+                 max_in_flight: Optional[int] = None, max_retries: int = 0,
+                 binary: bool = False):
+        self.base_url = base_url.rstrip("/")
+        self.model_name = model_name
+        self.model_version = model_version
+        self.timeout = timeout
+        self.binary = binary
+
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                              max_retries=max_retries, pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._in_flight = threading.BoundedSemaphore(max_in_flight or pool_size)
+
+    @property
+    def model_url(self) -> str:
+        return f"{self.base_url}/v2/models/{self.model_name}/versions/{self.model_version}"
+
+    @property
+    def infer_url(self) -> str:
+        return f"{self.model_url}/infer"
+
+    def _request(self, method: str, url: str, timeout: Optional[float] = None,
+                 **kwargs: Any) -> requests.Response:
+        with self._in_flight:
+            try:
+                response = self.session.request(method, url,
+                                                timeout=timeout or self.timeout,
+                                                **kwargs)
+            except requests.exceptions.Timeout as e:
+                raise InferenceError(f"Timeout: {e}", "timeout", url=url) from e
+            except requests.exceptions.RequestException as e:
+                raise InferenceError(f"Connexion impossible: {e}", "connection", url=url) from e
+
+        if response.status_code >= 400:
+            raise InferenceError(f"HTTP {response.status_code}: {response.text[:200]}",
+                                 "http", url=url, status_code=response.status_code,
+                                 body=response.text)
+        return response
+
+    def _json(self, response: requests.Response) -> Dict[str, Any]:
+        try:
+            return response.json()
+        except ValueError as e:
+            raise InferenceError(f"Réponse JSON invalide: {e}", "decode",
+                                 url=response.url, status_code=response.status_code,
+                                 body=response.text) from e
+
+    def is_ready(self) -> bool:
+        """Vrai si /v2/health/ready répond 200"""
+        try:
+            self._request("GET", f"{self.base_url}/v2/health/ready")
+            return True
+        except InferenceError:
+            return False
+
+    def model_metadata(self) -> Dict[str, Any]:
+        return self._json(self._request("GET", self.model_url))
+
+    def infer_request(self, request: Dict[str, Any],
+                      timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Envoie une requête v2 déjà construite et retourne la réponse brute décodée"""
+        response = self._request("POST", self.infer_url, timeout=timeout,
+                                 data=json.dumps(request))
+        return self._json(response)
+
+    def infer_encoded(self, body: bytes, header_length: int,
+                      timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Envoie un corps déjà encodé par encode_binary_request et décode la réponse"""
+        response = self._request("POST", self.infer_url, timeout=timeout, data=body,
+                                 headers={"Content-Type": "application/octet-stream",
+                                          BINARY_HEADER: str(header_length)})
+        header_length = response.headers.get(BINARY_HEADER)
+        try:
+            return decode_infer_response(response.content,
+                                         int(header_length) if header_length else None)
+        except (KeyError, ValueError) as e:
+            raise InferenceError(f"Réponse invalide: {e}", "decode", url=self.infer_url,
+                                 status_code=response.status_code) from e
+
+    def infer(self, rows: Features,
+              timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Inférence sur un batch de lignes, retourne predictions/probabilities/shape"""
+        if self.binary:
+            result = self.infer_encoded(*encode_binary_request(rows), timeout=timeout)
+        else:
+            result = self.infer_request(prepare_triton_request(rows, self.model_name), timeout)
+        try:
+            return extract_outputs(result)
+        except (KeyError, ValueError) as e:
+            raise InferenceError(str(e), "decode", url=self.infer_url) from e
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "TritonHTTPClient":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class AsyncTritonClient:
+    """
+    Client asyncio (aiohttp) pour pousser des milliers de requêtes depuis un process
+
+    Les connexions sont réutilisées via un TCPConnector (keep-alive) et le nombre
+    de requêtes en vol est borné par un sémaphore.
+    """
+
+    def __init__(self, base_url: str, model_name: str = DEFAULT_MODEL_NAME,
+                 model_version: str = DEFAULT_MODEL_VERSION,
+                 timeout: float = DEFAULT_TIMEOUT, max_in_flight: int = 100,
+                 keepalive_timeout: float = 30.0, binary: bool = False):
+        if aiohttp is None:
+            raise ImportError("aiohttp requis pour AsyncTritonClient: pip install aiohttp")
+
+        self.base_url = base_url.rstrip("/")
+        self.model_name = model_name
+        self.model_version = model_version
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+        self.keepalive_timeout = keepalive_timeout
+        self.binary = binary
+
+        self._session: Optional["aiohttp.ClientSession"] = None
+        self._in_flight: Optional[asyncio.Semaphore] = None
+
+    @property
+    def model_url(self) -> str:
+        return f"{self.base_url}/v2/models/{self.model_name}/versions/{self.model_version}"
+
+    @property
+    def infer_url(self) -> str:
+        return f"{self.model_url}/infer"
+
+    async def open(self) -> "AsyncTritonClient":
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_in_flight,
+                                             keepalive_timeout=self.keepalive_timeout)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={"Content-Type": "application/json"})
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        return self
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self) -> "AsyncTritonClient":
+        return await self.open()
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.close()
+
+    async def _request(self, method: str, url: str, timeout: Optional[float] = None,
+                       data: Union[str, bytes, None] = None,
+                       headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        await self.open()
+        client_timeout = aiohttp.ClientTimeout(total=timeout or self.timeout)
+
+        async with self._in_flight:
+            try:
+                async with self._session.request(method, url, data=data, headers=headers,
+                                                 timeout=client_timeout) as response:
+                    body = await response.read()
+                    status = response.status
+                    header_length = response.headers.get(BINARY_HEADER)
+            except asyncio.TimeoutError as e:
+                raise InferenceError("Timeout", "timeout", url=url) from e
+            except aiohttp.ClientError as e:
+                raise InferenceError(f"Connexion impossible: {e}", "connection", url=url) from e
+
+        if status >= 400:
+            text = body.decode("utf-8", errors="replace")
+            raise InferenceError(f"HTTP {status}: {text[:200]}", "http",
+                                 url=url, status_code=status, body=text)
+        if not body:
+            return {}
+        try:
+            return decode_infer_response(body, int(header_length) if header_length else None)
+        except (KeyError, ValueError) as e:
+            raise InferenceError(f"Réponse invalide: {e}", "decode",
+                                 url=url, status_code=status) from e
+
+    async def is_ready(self) -> bool:
+        try:
+            await self._request("GET", f"{self.base_url}/v2/health/ready")
+            return True
+        except InferenceError:
+            return False
+
+    async def model_metadata(self) -> Dict[str, Any]:
+        return await self._request("GET", self.model_url)
+
+    async def infer_request(self, request: Dict[str, Any],
+                            timeout: Optional[float] = None) -> Dict[str, Any]:
+        return await self._request("POST", self.infer_url, timeout=timeout,
+                                   data=json.dumps(request))
+
+    async def infer_encoded(self, body: bytes, header_length: int,
+                            timeout: Optional[float] = None) -> Dict[str, Any]:
+        return await self._request("POST", self.infer_url, timeout=timeout, data=body,
+                                   headers={"Content-Type": "application/octet-stream",
+                                            BINARY_HEADER: str(header_length)})
+
+    async def infer(self, rows: Features,
+                    timeout: Optional[float] = None) -> Dict[str, Any]:
+        if self.binary:
+            result = await self.infer_encoded(*encode_binary_request(rows), timeout=timeout)
+        else:
+            result = await self.infer_request(prepare_triton_request(rows, self.model_name),
+                                              timeout)
+        try:
+            return extract_outputs(result)
+        except (KeyError, ValueError) as e:
+            raise InferenceError(str(e), "decode", url=self.infer_url) from e
+
+    async def infer_many(self, batches: Sequence[Features],
+                         timeout: Optional[float] = None) -> List[Any]:
+        """
+        Lance tous les batches en parallèle (bornés par max_in_flight)
+        Retourne, dans l'ordre, le résultat ou l'InferenceError de chaque batch
+        """
+        tasks = [self.infer(rows, timeout) for rows in batches]
+        return await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Transport gRPC (protocole KServe v2 / GRPCInferenceService) pour le modèle Iris
+Même API que TritonHTTPClient: santé, métadonnées, inférence unaire et streaming
+Les messages protobuf sont ceux de tritonclient[grpc]
+"""
+
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+import numpy as np
+
+from triton_client import (DATATYPE_TO_NUMPY, DEFAULT_MODEL_NAME, DEFAULT_MODEL_VERSION,
+                           DEFAULT_TIMEOUT, INPUT_NAME, OUTPUT_NAMES, Features,
+                           InferenceError, extract_outputs)
+
+try:
+    import grpc
+    from google.protobuf.json_format import MessageToDict
+    from tritonclient.grpc import service_pb2, service_pb2_grpc
+except ImportError:
+    grpc = None
+
+DEFAULT_GRPC_URL = "localhost:8001"
+MAX_MESSAGE_BYTES = 256 * 1024 * 1024
+
+_GRPC_ERROR_KINDS = {
+    "DEADLINE_EXCEEDED": "timeout",
+    "UNAVAILABLE": "connection",
+}
+
+
+def require_grpc() -> None:
+    if grpc is None:
+        raise ImportError("grpcio et tritonclient[grpc] requis: pip install 'tritonclient[grpc]'")
+
+
+def channel_options() -> list:
+    """Options de canal: messages volumineux (gros batches) et keep-alive HTTP/2"""
+    return [
+        ("grpc.max_send_message_length", MAX_MESSAGE_BYTES),
+        ("grpc.max_receive_message_length", MAX_MESSAGE_BYTES),
+        ("grpc.keepalive_time_ms", 30000),
+        ("grpc.keepalive_permit_without_calls", 1),
+    ]
+
+
+def _to_inference_error(error: "grpc.RpcError", url: str) -> InferenceError:
+    code = error.code()
+    kind = _GRPC_ERROR_KINDS.get(code.name, "grpc")
+    return InferenceError(f"gRPC {code.name}: {error.details()}", kind, url=url,
+                          status_code=code.value[0], body=error.details())
+
+
+def build_infer_request(features: Features, model_name: str = DEFAULT_MODEL_NAME,
+                        model_version: str = DEFAULT_MODEL_VERSION,
+                        request_id: str = "") -> "service_pb2.ModelInferRequest":
+    """
+    ModelInferRequest avec le tenseur FP32 en raw_input_contents (pas de conversion par élément)
+    """
+    require_grpc()
+    array = np.ascontiguousarray(features, dtype=DATATYPE_TO_NUMPY["FP32"])
+    if array.ndim == 1:
+        array = array.reshape(1, -1)
+
+    request = service_pb2.ModelInferRequest(model_name=model_name,
+                                            model_version=model_version,
+                                            id=request_id)
+    tensor = request.inputs.add()
+    tensor.name = INPUT_NAME
+    tensor.datatype = "FP32"
+    tensor.shape.extend(array.shape)
+    for name in OUTPUT_NAMES:
+        request.outputs.add().name = name
+    request.raw_input_contents.append(array.tobytes())
+    return request
+
+
+def decode_infer_response(response: "service_pb2.ModelInferResponse") -> Dict[str, Any]:
+    """
+    Convertit une ModelInferResponse en dict au format v2 (sorties en tableaux NumPy)
+    """
+    outputs = []
+    for i, output in enumerate(response.outputs):
+        dtype = DATATYPE_TO_NUMPY[output.datatype]
+        shape = list(output.shape)
+        if i < len(response.raw_output_contents):
+            data = np.frombuffer(response.raw_output_contents[i], dtype=dtype).reshape(shape)
+        else:
+            contents = output.contents
+            values = (contents.int64_contents if output.datatype == "INT64"
+                      else contents.fp32_contents)
+            data = np.asarray(values, dtype=dtype).reshape(shape)
+        outputs.append({"name": output.name, "datatype": output.datatype,
+                        "shape": shape, "data": data})
+    return {"model_name": response.model_name, "model_version": response.model_version,
+            "id": response.id, "outputs": outputs}
+
+
+class TritonGRPCClient:
+    """
+    Client gRPC synchrone; un canal HTTP/2 unique multiplexe toutes les requêtes
+    (thread-safe, pas de pool de connexions à gérer)
+    """
+
+    def __init__(self, url: str = DEFAULT_GRPC_URL, model_name: str = DEFAULT_MODEL_NAME,
+                 model_version: str = DEFAULT_MODEL_VERSION,
+                 timeout: float = DEFAULT_TIMEOUT, secure: bool = False):
+        require_grpc()
+        self.url = url
+        self.model_name = model_name
+        self.model_version = model_version
+        self.timeout = timeout
+
+        if secure:
+            self.channel = grpc.secure_channel(url, grpc.ssl_channel_credentials(),
+                                               options=channel_options())
+        else:
+            self.channel = grpc.insecure_channel(url, options=channel_options())
+        self.stub = service_pb2_grpc.GRPCInferenceServiceStub(self.channel)
+
+    def is_ready(self) -> bool:
+        try:
+            response = self.stub.ServerReady(service_pb2.ServerReadyRequest(),
+                                             timeout=self.timeout)
+            return response.ready
+        except grpc.RpcError:
+            return False
+
+    def model_metadata(self) -> Dict[str, Any]:
+        try:
+            response = self.stub.ModelMetadata(
+                service_pb2.ModelMetadataRequest(name=self.model_name,
+                                                 version=self.model_version),
+                timeout=self.timeout)
+        except grpc.RpcError as e:
+            raise _to_inference_error(e, self.url) from e
+        return MessageToDict(response, preserving_proto_field_name=True)
+
+    def infer_encoded(self, request: "service_pb2.ModelInferRequest",
+                      timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Envoie une ModelInferRequest déjà construite (cf. build_infer_request)"""
+        try:
+            response = self.stub.ModelInfer(request, timeout=timeout or self.timeout)
+        except grpc.RpcError as e:
+            raise _to_inference_error(e, self.url) from e
+        try:
+            return decode_infer_response(response)
+        except (KeyError, ValueError) as e:
+            raise InferenceError(f"Réponse invalide: {e}", "decode", url=self.url) from e
+
+    def _extract(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """extract_outputs, avec les mêmes erreurs "decode" que le client HTTP"""
+        try:
+            return extract_outputs(result)
+        except (KeyError, ValueError) as e:
+            raise InferenceError(str(e), "decode", url=self.url) from e
+
+    def infer(self, rows: Features, timeout: Optional[float] = None) -> Dict[str, Any]:
+        request = build_infer_request(rows, self.model_name, self.model_version)
+        return self._extract(self.infer_encoded(request, timeout))
+
+    def infer_stream(self, batches: Iterable[Features]) -> Iterator[Dict[str, Any]]:
+        """
+        Inférence en streaming bidirectionnel (ModelStreamInfer) sur un seul appel
+        Les résultats sont produits au fil de l'eau; une erreur du serveur sur un
+        élément du flux lève une InferenceError
+        """
+        def requests_iter():
+            for i, rows in enumerate(batches):
+                yield build_infer_request(rows, self.model_name, self.model_version,
+                                          request_id=str(i))
+
+        try:
+            for message in self.stub.ModelStreamInfer(requests_iter()):
+                if message.error_message:
+                    raise InferenceError(message.error_message, "grpc", url=self.url)
+                try:
+                    result = decode_infer_response(message.infer_response)
+                except (KeyError, ValueError) as e:
+                    raise InferenceError(f"Réponse invalide: {e}", "decode", url=self.url) from e
+                yield self._extract(result)
+        except grpc.RpcError as e:
+            raise _to_inference_error(e, self.url) from e
+
+    def close(self) -> None:
+        self.channel.close()
+
+    def __enter__(self) -> "TritonGRPCClient":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
@@ -0,0 +1,9 @@
+import sys
+from pathlib import Path
+
+# Les modules du dépôt s'importent par leur nom, comme dans les étapes Elyra et les scripts
+REPO_ROOT = Path(__file__).resolve().parents[1]
+for directory in ("pipelines", "scripts"):
+    path = str(REPO_ROOT / directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+
+from bench_inference import LoadGenerator, run_benchmark
+from kserve_stub_server import StubModel, StubServer
+from triton_client import InferenceError, REPO_ROOT
+
+
+def test_benchmark_against_stub_counts_injected_errors():
+    with StubServer(model=StubModel(error_rate=0.2)) as server:
+        report = run_benchmark(server.url, "iris_model", "1", [1, 8], concurrency=2,
+                               duration=0.3, warmup=0.0)
+
+    for result in report["results"]:
+        assert result["successes"] > 0
+        assert result["requests"] == result["successes"] + result["errors"]
+        assert set(result["errors_by_type"]) <= {"http_500"}
+
+
+def test_unexpected_backend_errors_are_counted():
+    calls = []
+
+    def send():
+        calls.append(None)
+        if len(calls) % 2:
+            raise KeyError("probabilities")
+        raise InferenceError("HTTP 503", "http", status_code=503)
+
+    stats = LoadGenerator(send, concurrency=2, duration=0.1).run()
+
+    assert stats["successes"] == 0
+    assert stats["errors"] == len(calls)
+    assert set(stats["errors_by_type"]) == {"KeyError", "http_503"}
+
+
+def test_bench_does_not_import_test_inference():
+    code = "import sys, bench_inference; assert 'test_inference' not in sys.modules"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            env={**os.environ, "PYTHONPATH": str(REPO_ROOT / "scripts")})
+
+    assert result.returncode == 0, result.stderr
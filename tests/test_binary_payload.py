@@ -0,0 +1,42 @@
+import json
+
+import numpy as np
+import pytest
+
+from kserve_stub_server import StubServer, predict_iris
+from triton_client import (SAMPLE_DATA, TritonHTTPClient, decode_infer_response,
+                           encode_binary_request)
+
+ROWS = np.asarray(list(SAMPLE_DATA.values()) * 4, dtype=np.float32)
+
+
+def test_request_is_json_header_then_raw_tensor():
+    body, header_length = encode_binary_request(ROWS)
+    header = json.loads(body[:header_length])
+
+    assert header["inputs"][0]["shape"] == list(ROWS.shape)
+    assert header["inputs"][0]["parameters"]["binary_data_size"] == ROWS.nbytes
+    assert body[header_length:] == ROWS.tobytes()
+
+
+def test_response_outputs_are_decoded_in_place():
+    labels = np.array([0, 2], dtype="<i8")
+    header = json.dumps({"outputs": [{"name": "label", "datatype": "INT64", "shape": [2],
+                                      "parameters": {"binary_data_size": labels.nbytes}}]}).encode()
+
+    result = decode_infer_response(header + labels.tobytes(), len(header))
+
+    np.testing.assert_array_equal(result["outputs"][0]["data"], labels)
+
+
+@pytest.mark.parametrize("binary", [True, False])
+def test_stub_round_trip(binary):
+    expected_labels, expected_probabilities = predict_iris(ROWS)
+    with StubServer() as server, TritonHTTPClient(server.url, binary=binary) as client:
+        result = client.infer(ROWS)
+
+    np.testing.assert_array_equal(np.ravel(result["predictions"]), expected_labels)
+    np.testing.assert_allclose(np.reshape(result["probabilities"], expected_probabilities.shape),
+                               expected_probabilities)
+    if binary:
+        assert isinstance(result["predictions"], np.ndarray)
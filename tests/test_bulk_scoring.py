@@ -0,0 +1,69 @@
+import json
+
+import numpy as np
+import pytest
+
+from bulk_scoring import CHECKPOINT_SUFFIX, ResultWriter, run_bulk_scoring
+from kserve_stub_server import StubServer
+from triton_client import SAMPLE_DATA, TritonHTTPClient
+
+PROBABILITIES = np.full((2, 3), 1 / 3, dtype=np.float32)
+
+
+@pytest.mark.parametrize("name", ["predictions.jsonl", "predictions.csv"])
+def test_resume_truncates_partial_write(tmp_path, name):
+    path = tmp_path / name
+    writer = ResultWriter(str(path), resume=False)
+    writer.write(np.array([0, 1]), PROBABILITIES)
+    writer.close(completed=False)
+    committed = path.read_bytes()
+
+    # Panne pendant l'écriture d'un gros chunk: données partielles après le checkpoint,
+    # plus longues que ce qui sera réécrit
+    with open(path, "ab") as f:
+        f.write(b'{"row": 2, "prediction": 1}\n' * 100 + b'{"row": 102, "predic')
+
+    writer = ResultWriter(str(path), resume=True)
+    assert writer.rows == 2
+    writer.write(np.array([2, 0]), PROBABILITIES)
+    writer.close(completed=True)
+
+    content = path.read_bytes()
+    assert content.startswith(committed)
+    tail = content[len(committed):].decode().splitlines()
+    if name.endswith(".csv"):
+        assert [line.split(",")[:2] for line in tail] == [["2", "2"], ["3", "0"]]
+    else:
+        assert [(row["row"], row["prediction"]) for row in map(json.loads, tail)] == [(2, 2), (3, 0)]
+    assert not (tmp_path / (name + CHECKPOINT_SUFFIX)).exists()
+
+
+def test_resume_after_failed_chunk_scores_remaining_rows(tmp_path):
+    features = np.asarray(list(SAMPLE_DATA.values()) * 10, dtype=np.float32)
+    input_path = tmp_path / "features.npy"
+    output_path = tmp_path / "predictions.jsonl"
+    np.save(input_path, features)
+
+    with StubServer() as server, TritonHTTPClient(server.url) as client:
+        calls = []
+        infer = client.infer
+
+        def failing_infer(rows, timeout=None):
+            calls.append(len(rows))
+            if len(calls) == 3:
+                raise ValueError("panne simulée")
+            return infer(rows, timeout)
+
+        client.infer = failing_infer
+        with pytest.raises(ValueError):
+            run_bulk_scoring(client, str(input_path), str(output_path), chunk_size=4,
+                             parallelism=1)
+
+        client.infer = infer
+        summary = run_bulk_scoring(client, str(input_path), str(output_path), chunk_size=4,
+                                   parallelism=1, resume=True)
+
+    rows = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert summary["resumed_from_row"] == 8
+    assert [row["row"] for row in rows] == list(range(len(features)))
+    assert [row["prediction"] for row in rows] == [0, 1, 2] * 10
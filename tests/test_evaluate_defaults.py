@@ -0,0 +1,32 @@
+import json
+from pathlib import Path
+
+import latency_profile
+import triton_autotune
+from evaluate_register_model import autotune_triton_config, profile_serving_latency
+
+PIPELINE = Path(__file__).resolve().parents[1] / "pipelines" / "iris.pipeline"
+
+
+def test_expensive_steps_are_off_by_default(monkeypatch):
+    calls = []
+    monkeypatch.delenv("TRITON_AUTOTUNE", raising=False)
+    monkeypatch.delenv("LATENCY_PROFILE", raising=False)
+    monkeypatch.setattr(triton_autotune, "autotune", lambda *args, **kwargs: calls.append("autotune"))
+    monkeypatch.setattr(latency_profile, "profile_serving",
+                        lambda *args, **kwargs: calls.append("latency_profile"))
+
+    assert autotune_triton_config("iris_model.onnx", None) == (None, None)
+    assert profile_serving_latency({}, "iris_model.onnx", None, None) is None
+    assert calls == []
+
+
+def test_pipeline_keeps_expensive_steps_off():
+    nodes = json.loads(PIPELINE.read_text())["pipelines"][0]["nodes"]
+    evaluate = next(node["app_data"]["component_parameters"] for node in nodes
+                    if node["app_data"]["component_parameters"]["filename"]
+                    == "evaluate_register_model.py")
+    env = {item["env_var"]: item["value"] for item in evaluate["env_vars"]}
+
+    assert env["TRITON_AUTOTUNE"] == "false"
+    assert env["LATENCY_PROFILE"] == "false"
@@ -0,0 +1,42 @@
+import importlib.util
+import json
+from pathlib import Path
+
+import pytest
+
+from evaluate_register_model import preflight
+
+PIPELINE = Path(__file__).resolve().parents[1] / "pipelines" / "iris.pipeline"
+
+
+@pytest.fixture
+def without_registry(monkeypatch):
+    find_spec = importlib.util.find_spec
+    monkeypatch.setattr(importlib.util, "find_spec",
+                        lambda name, *args: None if name == "model_registry"
+                        else find_spec(name, *args))
+
+
+def test_missing_registry_is_optional_by_default(monkeypatch, without_registry):
+    monkeypatch.delenv("MODEL_REGISTRY_REQUIRED", raising=False)
+
+    assert preflight()["registry"] is False
+
+
+def test_missing_registry_fails_when_required(monkeypatch, without_registry):
+    monkeypatch.setenv("MODEL_REGISTRY_REQUIRED", "true")
+
+    with pytest.raises(RuntimeError, match="model_registry"):
+        preflight()
+
+
+def test_pipeline_installs_registry_dependencies():
+    nodes = json.loads(PIPELINE.read_text())["pipelines"][0]["nodes"]
+    evaluate = next(node["app_data"]["component_parameters"] for node in nodes
+                    if node["app_data"]["component_parameters"]["filename"]
+                    == "evaluate_register_model.py")
+    env = {item["env_var"]: item["value"] for item in evaluate["env_vars"]}
+
+    assert env["MODEL_REGISTRY_REQUIRED"] == "true"
+    assert set(env["PIP_EXTRA_PACKAGES"].split()) >= {"model-registry==0.2.7a1", "aiohttp-retry",
+                                                      "onnxruntime", "skl2onnx"}
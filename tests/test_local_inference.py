@@ -0,0 +1,49 @@
+import pickle
+
+import numpy as np
+import pytest
+from sklearn.datasets import load_iris
+from sklearn.ensemble import RandomForestClassifier
+
+from local_inference import COMPILED_FOREST_MAX_BATCH, LocalInferenceBackend
+
+
+@pytest.fixture(scope="module")
+def model_path(tmp_path_factory):
+    X, y = load_iris(return_X_y=True)
+    model = RandomForestClassifier(n_estimators=10, random_state=42).fit(X, y)
+    path = tmp_path_factory.mktemp("models") / "iris_model.pkl"
+    with open(path, "wb") as f:
+        pickle.dump(model, f)
+    return path
+
+
+def _used_predictor(model_path, n_rows, **options):
+    """Prédicteur(s) appelé(s) pour un batch de n_rows lignes: 'compiled' et/ou 'sklearn'"""
+    backend = LocalInferenceBackend(model_path, **options)
+    used = []
+    for name, predictor in (("compiled", backend.forest), ("sklearn", backend.model)):
+        if predictor is None:
+            continue
+        original = predictor.predict_proba
+        predictor.predict_proba = lambda X, name=name, original=original: (used.append(name)
+                                                                           or original(X))
+    backend.predict_with_proba(np.zeros((n_rows, 4), dtype=np.float32))
+    return used
+
+
+def test_auto_uses_compiled_forest_for_small_batches_only(model_path):
+    assert _used_predictor(model_path, COMPILED_FOREST_MAX_BATCH) == ["compiled"]
+    assert _used_predictor(model_path, COMPILED_FOREST_MAX_BATCH + 1) == ["sklearn"]
+
+
+@pytest.mark.parametrize("forest_backend, expected", [("sklearn", "sklearn"),
+                                                      ("compiled", "compiled")])
+def test_forced_forest_backend(model_path, forest_backend, expected):
+    assert _used_predictor(model_path, 1, forest_backend=forest_backend) == [expected]
+    assert _used_predictor(model_path, 4096, forest_backend=forest_backend) == [expected]
+
+
+def test_unknown_forest_backend(model_path):
+    with pytest.raises(ValueError, match="forest_backend"):
+        LocalInferenceBackend(model_path, forest_backend="numba")
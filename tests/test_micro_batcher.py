@@ -0,0 +1,48 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from kserve_stub_server import StubServer, predict_iris
+from micro_batcher import MicroBatcher
+from triton_client import SAMPLE_DATA, AsyncTritonClient
+
+ROWS = list(SAMPLE_DATA.values())
+
+
+@pytest.fixture(scope="module")
+def server():
+    with StubServer() as stub:
+        yield stub
+
+
+def _score(url, rows, **batcher_kwargs):
+    async def run():
+        async with AsyncTritonClient(url, binary=True) as client:
+            async with MicroBatcher(client, adaptive=False, **batcher_kwargs) as batcher:
+                started = time.perf_counter()
+                results = await asyncio.gather(*(batcher.predict(row) for row in rows))
+                return results, time.perf_counter() - started, batcher.metrics()
+
+    return asyncio.run(run())
+
+
+def test_batch_flushes_when_full(server):
+    rows = ROWS * 4
+    results, elapsed, metrics = _score(server.url, rows, max_batch_size=4, max_delay_ms=1000)
+
+    assert elapsed < 1.0
+    assert (metrics["batches"], metrics["batch_size"]["max"]) == (3, 4)
+    expected, _ = predict_iris(np.asarray(rows, dtype=np.float32))
+    assert [result["prediction"] for result in results] == expected.tolist()
+
+
+def test_partial_batch_flushes_after_delay(server):
+    results, elapsed, metrics = _score(server.url, ROWS, max_batch_size=64, max_delay_ms=50)
+
+    assert elapsed >= 0.05
+    assert (metrics["batches"], metrics["rows"]) == (1, len(ROWS))
+    assert [result["prediction"] for result in results] == [0, 1, 2]
@@ -0,0 +1,43 @@
+import sys
+import types
+
+import pytest
+
+import evaluate_register_model
+from evaluate_register_model import register_model_in_registry
+
+METRICS = {"accuracy": 0.97}
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Model Registry factice: enregistre les appels à register_model"""
+    calls = []
+
+    class ModelRegistry:
+        def __init__(self, **kwargs):
+            pass
+
+        def register_model(self, **kwargs):
+            calls.append(kwargs)
+            return types.SimpleNamespace(id="1")
+
+    monkeypatch.setitem(sys.modules, "model_registry",
+                        types.SimpleNamespace(ModelRegistry=ModelRegistry))
+    monkeypatch.setattr(evaluate_register_model, "get_model_registry_config",
+                        lambda: ("https://registry", "token"))
+    return calls
+
+
+def test_nothing_registered_without_upload(registry):
+    assert register_model_in_registry(METRICS, "models/iris_model.onnx", pipeline_id="run-1") is False
+    assert registry == []
+
+
+def test_uploaded_uri_is_registered(registry):
+    uri = "s3://bucket/run-1/models/iris_model/1/iris_model.onnx"
+
+    assert register_model_in_registry(METRICS, "models/iris_model.onnx", pipeline_id="run-1",
+                                      model_uri=uri)
+    assert [call["uri"] for call in registry] == [uri]
+    assert registry[0]["model_format_name"] == "onnx"
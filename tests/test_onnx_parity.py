@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("skl2onnx")
+pytest.importorskip("onnxruntime")
+
+from sklearn.datasets import load_iris
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from local_inference import LocalInferenceBackend, check_parity
+from model_artifacts import export_onnx_opsets
+from onnx_export import PARITY_ATOL, check_fused_parity, convert_to_onnx
+
+
+@pytest.fixture(scope="module")
+def iris_model():
+    X, y = load_iris(return_X_y=True)
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=50, max_depth=10, random_state=42)
+    model.fit(scaler.transform(X), y)
+    return model, scaler, scaler.transform(X)
+
+
+@pytest.mark.parametrize("opset", [11, 9])
+def test_fused_graph_matches_sklearn(tmp_path, iris_model, opset):
+    model, scaler, X_scaled = iris_model
+    path = export_onnx_opsets(model, X_scaled.shape[1], scaler, tmp_path, opsets=(opset,))[opset]
+
+    consistent, mismatches, max_proba_diff = check_fused_parity(
+        LocalInferenceBackend(path), model, X_scaled, scaler)
+
+    assert mismatches == 0
+    assert max_proba_diff <= PARITY_ATOL
+    assert consistent
+
+
+def test_fused_graph_matches_sklearn_off_dataset(tmp_path, iris_model):
+    model, scaler, _ = iris_model
+    path = export_onnx_opsets(model, 4, scaler, tmp_path, opsets=(11,))[11]
+    X_raw = np.random.default_rng(0).uniform(0.0, 8.0, size=(5000, 4))
+
+    consistent, mismatches, max_proba_diff = check_fused_parity(
+        LocalInferenceBackend(path), model, scaler.transform(X_raw), scaler)
+
+    assert consistent, (mismatches, max_proba_diff)
+
+
+def test_forest_only_graph_matches_sklearn(tmp_path, iris_model):
+    model, _, X_scaled = iris_model
+    path = tmp_path / "forest.onnx"
+    path.write_bytes(convert_to_onnx(model, X_scaled.shape[1]).SerializeToString())
+
+    consistent, mismatches, max_proba_diff = check_parity(
+        LocalInferenceBackend(str(path)), model, X_scaled)
+
+    assert consistent, (mismatches, max_proba_diff)
+
+
+class _ShiftedBackend:
+    """Mêmes prédictions que le modèle, probabilités décalées"""
+
+    def __init__(self, model, shift):
+        self.model = model
+        self.shift = shift
+
+    def predict_with_proba(self, features):
+        return self.model.predict(features), self.model.predict_proba(features) + self.shift
+
+
+def test_parity_fails_above_probability_tolerance(iris_model):
+    model, _, X_scaled = iris_model
+
+    consistent, mismatches, max_proba_diff = check_parity(
+        _ShiftedBackend(model, 1e-3), model, X_scaled, atol=1e-5)
+
+    assert mismatches == 0
+    assert max_proba_diff == pytest.approx(1e-3)
+    assert not consistent
@@ -0,0 +1,64 @@
+import numpy as np
+
+from prediction_cache import CachedInferenceClient, PredictionCache
+from triton_client import InferenceError
+
+ROWS = np.array([[5.1, 3.5, 1.4, 0.2], [6.2, 2.9, 4.3, 1.3]], dtype=np.float32)
+
+
+class _FakeClient:
+    """Client pinné sur une version; metadata modifiable pour simuler un redéploiement"""
+
+    model_name = "iris_model"
+
+    def __init__(self, model_version="1"):
+        self.model_version = model_version
+        self.metadata = {"name": "iris_model", "versions": ["1"], "platform": "onnxruntime_onnx"}
+        self.calls = 0
+
+    def model_metadata(self):
+        if self.metadata is None:
+            raise InferenceError("HTTP 404", "http", status_code=404)
+        return self.metadata
+
+    def infer(self, rows, timeout=None):
+        self.calls += 1
+        return {"predictions": np.zeros(len(rows), dtype=np.int64),
+                "probabilities": np.ones((len(rows), 3), dtype=np.float32) / 3}
+
+
+def _client(model_version="1"):
+    fake = _FakeClient(model_version)
+    client = CachedInferenceClient(fake, PredictionCache(ttl_s=None), version_check_interval_s=1e-9)
+    return fake, client
+
+
+def test_version_check_is_on_by_default():
+    assert CachedInferenceClient(_FakeClient()).version_check_interval_s > 0
+
+
+def test_other_versions_do_not_invalidate_pinned_version():
+    fake, client = _client("1")
+    client.infer(ROWS)
+    fake.metadata = {**fake.metadata, "versions": ["1", "10", "2"]}
+    client.infer(ROWS)
+
+    assert fake.calls == 1
+
+
+def test_redeployed_version_invalidates_cache():
+    fake, client = _client("1")
+    client.infer(ROWS)
+    fake.metadata = {**fake.metadata, "platform": "tensorrt_plan"}
+    client.infer(ROWS)
+
+    assert fake.calls == 2
+
+
+def test_removed_version_invalidates_cache():
+    fake, client = _client("1")
+    client.infer(ROWS)
+    fake.metadata = None
+    client.infer(ROWS)
+
+    assert fake.calls == 2
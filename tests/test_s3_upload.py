@@ -0,0 +1,67 @@
+import hashlib
+
+import pytest
+
+pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+from s3_upload import CHECKSUM_METADATA, MB, s3_client, transfer_config, upload_paths
+
+BUCKET = "mlpipeline"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.delenv("AWS_S3_ENDPOINT", raising=False)
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    # Parts minimales acceptées par S3: 5 MB
+    monkeypatch.setenv("S3_MULTIPART_THRESHOLD_MB", "5")
+    monkeypatch.setenv("S3_MULTIPART_CHUNK_MB", "5")
+    with moto.mock_aws():
+        yield s3_client()
+
+
+@pytest.fixture
+def model_repository(tmp_path):
+    version_dir = tmp_path / "iris_model" / "1"
+    version_dir.mkdir(parents=True)
+    (version_dir / "iris_model.onnx").write_bytes(bytes(range(256)) * (12 * MB // 256))
+    (tmp_path / "iris_model" / "config.pbtxt").write_text('name: "iris_model"\n')
+    return tmp_path / "iris_model"
+
+
+def test_large_file_is_uploaded_in_parts(client, model_repository):
+    report = upload_paths([model_repository], BUCKET, "run-1/models", client=client,
+                          config=transfer_config())
+
+    keys = {item["key"]: item for item in report["objects"]}
+    assert set(keys) == {"run-1/models/iris_model/1/iris_model.onnx",
+                         "run-1/models/iris_model/config.pbtxt"}
+    assert report["uploaded"] == 2 and report["skipped"] == 0
+
+    model_file = model_repository / "1" / "iris_model.onnx"
+    head = client.head_object(Bucket=BUCKET, Key="run-1/models/iris_model/1/iris_model.onnx")
+    # ETag multipart: "<md5 des md5 des parts>-<nombre de parts>"
+    assert head["ETag"].strip('"').endswith("-3")
+    assert head["ContentLength"] == model_file.stat().st_size
+    assert head["Metadata"][CHECKSUM_METADATA] == hashlib.sha256(model_file.read_bytes()).hexdigest()
+
+
+def test_unchanged_objects_are_skipped(client, model_repository):
+    upload_paths([model_repository], BUCKET, "run-1/models", client=client)
+
+    report = upload_paths([model_repository], BUCKET, "run-1/models", client=client)
+    assert report["uploaded"] == 0 and report["skipped"] == 2
+    assert report["throughput_mb_s"] is None
+
+    (model_repository / "config.pbtxt").write_text('name: "iris_model"\nmax_batch_size: 32\n')
+    report = upload_paths([model_repository], BUCKET, "run-1/models", client=client)
+    statuses = {item["key"].rsplit("/", 1)[-1]: item["status"] for item in report["objects"]}
+    assert statuses == {"iris_model.onnx": "skipped", "config.pbtxt": "uploaded"}
+
+
+def test_missing_path_fails(client, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        upload_paths([tmp_path / "absent.pkl"], BUCKET, "run-1/models", client=client)
@@ -0,0 +1,42 @@
+import pytest
+
+from step_cache import LocalStepCache, run_cached
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    step_dir = tmp_path / "step"
+    step_dir.mkdir()
+    monkeypatch.chdir(step_dir)
+    return step_dir
+
+
+def _write_model(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("model")
+
+
+def test_absolute_outputs_are_stored_relative_to_workdir(workdir, tmp_path):
+    cache = LocalStepCache(str(tmp_path / "cache"))
+    output = workdir / "models" / "iris_model.pkl"
+
+    hit, _ = run_cached("train", lambda: _write_model(output), outputs=[str(output)], cache=cache)
+    assert not hit
+    output.unlink()
+
+    hit, _ = run_cached("train", lambda: pytest.fail("étape relancée"), outputs=[str(output)],
+                        cache=cache)
+    assert hit
+    assert output.read_text() == "model"
+
+
+def test_outputs_outside_workdir_are_rejected(workdir, tmp_path):
+    cache = LocalStepCache(str(tmp_path / "cache"))
+    outside = tmp_path / "elsewhere" / "iris_model.pkl"
+
+    with pytest.raises(ValueError, match="non cacheable"):
+        run_cached("train", lambda: pytest.fail("étape lancée"), outputs=[str(outside)],
+                   cache=cache)
+    with pytest.raises(ValueError, match="non cacheable"):
+        run_cached("train", lambda: _write_model(outside), outputs=lambda: [str(outside)],
+                   cache=cache)
@@ -0,0 +1,71 @@
+import pickle
+
+import numpy as np
+import pytest
+
+import data_preprocessing
+from artifact_store import load_array
+from streaming_preprocessing import LabelEncoder, preprocess_stream
+
+
+def _write_csv(path, rows, header=("a", "b", "label")):
+    path.write_text("\n".join(",".join(str(v) for v in row) for row in [header, *rows]) + "\n")
+    return str(path)
+
+
+def test_numeric_labels_are_aligned_with_target_names(tmp_path):
+    rng = np.random.default_rng(0)
+    labels = rng.permutation(np.repeat([3, 1, 2], 20))
+    rows = [(float(label), float(label) * 2, label) for label in labels]
+    source = _write_csv(tmp_path / "data.csv", rows)
+
+    metadata = preprocess_stream(source, str(tmp_path / "out"), "label", chunk_size=7)
+
+    assert metadata["target_names"] == ["1", "2", "3"]
+    out = str(tmp_path / "out")
+    for split in ("train", "test"):
+        y = np.asarray(load_array(out, f"y_{split}"))
+        assert set(y.tolist()) <= {0, 1, 2}
+    # Même label brut -> même code final, quel que soit le chunk d'apparition
+    encoder = LabelEncoder()
+    codes = np.concatenate([encoder.encode(chunk) for chunk in np.array_split(labels, 5)])
+    final = encoder.final_codes()[codes]
+    assert [encoder.target_names[code] for code in final] == [str(label) for label in labels]
+
+
+def test_text_labels_keep_order_of_appearance():
+    encoder = LabelEncoder()
+    encoder.encode(np.array(["virginica", "setosa", "virginica"], dtype=object))
+    encoder.encode(np.array(["versicolor", "setosa"], dtype=object))
+    assert encoder.target_names == ["virginica", "setosa", "versicolor"]
+    assert encoder.final_codes().tolist() == [0, 1, 2]
+
+
+def test_text_label_after_numeric_chunks_fails_fast():
+    encoder = LabelEncoder()
+    encoder.encode(np.array(["0", "1"], dtype=object))
+    with pytest.raises(ValueError, match="setosa"):
+        encoder.encode(np.array(["2", "setosa"], dtype=object))
+
+
+def test_ragged_csv_row_reports_line(tmp_path):
+    source = _write_csv(tmp_path / "data.csv", [(1.0, 2.0, 0), (1.0, 0), (3.0, 4.0, 1)])
+    with pytest.raises(ValueError, match="ligne 3"):
+        preprocess_stream(source, str(tmp_path / "out"), "label", chunk_size=10)
+
+
+def _target_names(output_path):
+    with open(output_path / "metadata.pkl", "rb") as f:
+        return pickle.load(f)["target_names"]
+
+
+def test_target_column_argument_wins_over_environment(tmp_path, monkeypatch):
+    rows = [(float(i), float(i % 3), i % 2, i % 3) for i in range(30)]
+    source = _write_csv(tmp_path / "data.csv", rows, header=("a", "b", "other", "label"))
+    monkeypatch.setenv("PREPROCESS_TARGET_COLUMN", "other")
+
+    data_preprocessing.preprocess_data(str(tmp_path / "arg"), source, "label")
+    data_preprocessing.preprocess_data(str(tmp_path / "env"), source)
+
+    assert _target_names(tmp_path / "arg") == ["0", "1", "2"]
+    assert _target_names(tmp_path / "env") == ["0", "1"]
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from train_model import run_sweep, select_candidate
+
+
+def _candidate(n_estimators, accuracy, cost, pickle_bytes=1000):
+    return {"n_estimators": n_estimators, "max_depth": 4, "test_accuracy": accuracy,
+            "cost": cost, "pickle_bytes": pickle_bytes}
+
+
+def test_pareto_front_and_cheapest_within_tolerance():
+    candidates = [
+        _candidate(200, 0.97, 9.0),   # meilleure accuracy
+        _candidate(50, 0.96, 3.0),    # dans la tolérance, moins coûteux
+        _candidate(100, 0.96, 5.0),   # dominé par le précédent
+        _candidate(10, 0.90, 1.0),    # le moins coûteux, hors tolérance
+    ]
+
+    best_accuracy, selected = select_candidate(candidates, tolerance=0.02)
+
+    assert best_accuracy == 0.97
+    assert selected["n_estimators"] == 50
+    assert [c["n_estimators"] for c in candidates if c["pareto"]] == [200, 50, 10]
+    assert [c["n_estimators"] for c in candidates if c["within_tolerance"]] == [200, 50, 100]
+
+
+def test_zero_tolerance_keeps_best_accuracy():
+    candidates = [_candidate(200, 0.97, 9.0), _candidate(50, 0.96, 3.0)]
+
+    _, selected = select_candidate(candidates, tolerance=0.0)
+
+    assert selected["n_estimators"] == 200
+
+
+def test_equal_cost_prefers_smaller_pickle():
+    candidates = [_candidate(100, 0.96, 3.0, pickle_bytes=900),
+                  _candidate(50, 0.96, 3.0, pickle_bytes=500)]
+
+    _, selected = select_candidate(candidates, tolerance=0.01)
+
+    assert selected["n_estimators"] == 50
+
+
+def test_sweep_report_on_iris(tmp_path):
+    pytest.importorskip("skl2onnx")
+    from sklearn.datasets import load_iris
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    X, y = load_iris(return_X_y=True)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=0)
+    scaler = StandardScaler().fit(X_train)
+
+    selected = run_sweep([5, 20], [3], 42, 0.05, scaler.transform(X_train), y_train,
+                         scaler.transform(X_test), y_test, scaler, str(tmp_path))
+
+    report = json.loads((tmp_path / "sweep_report.json").read_text())
+    assert len(report["candidates"]) == 2
+    assert report["selected"]["n_estimators"] == selected["n_estimators"]
+    assert selected["test_accuracy"] >= report["best_accuracy"] - 0.05
@@ -0,0 +1,54 @@
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+
+import triton_autotune
+from triton_autotune import SchedulerSimulator, TuningCandidate
+from triton_config import TritonModelSettings, TensorSpec, clamp_preferred_batch_sizes, render_config
+
+
+FEATURES = np.zeros((4, 4), dtype=np.float32)
+
+
+class _FailingBackend:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def predict_with_proba(self, features):
+        raise ValueError("session ONNX cassée")
+
+
+class _StalledBackend(_FailingBackend):
+    def predict_with_proba(self, features):
+        time.sleep(1.0)
+
+
+def test_worker_error_is_propagated(monkeypatch):
+    monkeypatch.setattr(triton_autotune, "LocalInferenceBackend", _FailingBackend)
+    simulator = SchedulerSimulator("iris_model.onnx", TuningCandidate(1, 1, 8, 0))
+
+    started = time.perf_counter()
+    with pytest.raises(RuntimeError, match="session ONNX cassée"):
+        simulator.run(concurrency=4, duration_s=5.0, features=FEATURES)
+    assert time.perf_counter() - started < 2.0
+
+
+def test_stalled_request_times_out(monkeypatch):
+    monkeypatch.setattr(triton_autotune, "LocalInferenceBackend", _StalledBackend)
+    simulator = SchedulerSimulator("iris_model.onnx", TuningCandidate(1, 1, 8, 0))
+
+    with pytest.raises(RuntimeError, match="sans réponse"):
+        simulator.run(concurrency=2, duration_s=5.0, features=FEATURES, request_timeout_s=0.2)
+
+
+def test_preferred_batch_sizes_are_clamped():
+    assert clamp_preferred_batch_sizes([64, 256], 32) == [32]
+    assert clamp_preferred_batch_sizes([256, 64], 1024) == [64, 256]
+
+    settings = TritonModelSettings(max_batch_size=32,
+                                   inputs=[TensorSpec("float_input", "TYPE_FP32", [4])],
+                                   outputs=[TensorSpec("label", "TYPE_INT64", [1], reshape=[])])
+    assert "preferred_batch_size: [ 32 ]" in render_config(settings)
@@ -0,0 +1,58 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from kserve_stub_server import StubServer, predict_iris
+from triton_client import SAMPLE_DATA, AsyncTritonClient, InferenceError, TritonHTTPClient
+
+ROWS = np.asarray(list(SAMPLE_DATA.values()), dtype=np.float32)
+
+
+@pytest.fixture(scope="module")
+def server():
+    with StubServer() as stub:
+        yield stub
+
+
+def test_sync_client_round_trip(server):
+    expected, _ = predict_iris(ROWS)
+    with TritonHTTPClient(server.url, pool_size=2) as client:
+        assert client.is_ready()
+        assert client.model_metadata()["name"] == "iris_model"
+        result = client.infer(ROWS.tolist())
+
+    np.testing.assert_array_equal(np.ravel(result["predictions"]), expected)
+
+
+def test_async_client_round_trip(server):
+    expected, _ = predict_iris(ROWS)
+
+    async def run():
+        async with AsyncTritonClient(server.url, max_in_flight=4) as client:
+            return await client.infer_many([ROWS[:1], ROWS[1:]])
+
+    first, rest = asyncio.run(run())
+    np.testing.assert_array_equal(
+        np.concatenate([np.ravel(first["predictions"]), np.ravel(rest["predictions"])]), expected)
+
+
+def test_errors_are_structured(server):
+    with TritonHTTPClient(server.url, model_name="inconnu") as client:
+        with pytest.raises(InferenceError) as error:
+            client.infer(ROWS)
+    assert (error.value.kind, error.value.status_code, error.value.label) == ("http", 404, "http_404")
+
+    with TritonHTTPClient("http://127.0.0.1:9", timeout=1) as client:
+        with pytest.raises(InferenceError) as error:
+            client.infer(ROWS)
+    assert error.value.kind == "connection"
+
+    async def run():
+        async with AsyncTritonClient(server.url, model_name="inconnu") as client:
+            return await client.infer_many([ROWS])
+
+    [result] = asyncio.run(run())
+    assert isinstance(result, InferenceError) and result.label == "http_404"
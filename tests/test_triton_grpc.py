@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("tritonclient.grpc")
+
+from kserve_stub_server import StubGRPCServer, StubModel, StubServer
+from triton_client import SAMPLE_DATA, InferenceError, TritonHTTPClient
+from triton_grpc import TritonGRPCClient, service_pb2
+
+ROWS = np.array(list(SAMPLE_DATA.values()) * 3, dtype=np.float32)
+
+
+@pytest.fixture(scope="module")
+def servers():
+    model = StubModel()
+    with StubServer(model=model) as http_server, StubGRPCServer(model=model) as grpc_server:
+        yield http_server.url, grpc_server.url
+
+
+def test_grpc_matches_http(servers):
+    http_url, grpc_url = servers
+    with TritonHTTPClient(http_url) as http_client, TritonGRPCClient(grpc_url) as grpc_client:
+        expected = http_client.infer(ROWS)
+        result = grpc_client.infer(ROWS)
+        streamed = list(grpc_client.infer_stream([ROWS[:2], ROWS[2:]]))
+
+    np.testing.assert_array_equal(np.ravel(result["predictions"]), expected["predictions"])
+    np.testing.assert_allclose(np.reshape(result["probabilities"], (len(ROWS), -1)),
+                               np.reshape(expected["probabilities"], (len(ROWS), -1)))
+    np.testing.assert_array_equal(
+        np.concatenate([np.ravel(item["predictions"]) for item in streamed]),
+        expected["predictions"])
+
+
+def test_malformed_response_is_a_decode_error(servers, monkeypatch):
+    _, grpc_url = servers
+    with TritonGRPCClient(grpc_url) as client:
+        # Réponse sans la sortie "label"
+        monkeypatch.setattr(client.stub, "ModelInfer",
+                            lambda request, timeout=None: service_pb2.ModelInferResponse())
+        with pytest.raises(InferenceError) as error:
+            client.infer(ROWS)
+
+    assert error.value.kind == "decode"
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("skl2onnx")
+pytest.importorskip("onnxruntime")
+
+from sklearn.datasets import load_iris
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from kserve_stub_server import StubModel, StubServer
+from local_inference import LocalInferenceBackend
+from onnx_export import convert_to_onnx
+from triton_client import (DEFAULT_MODEL_NAME, INPUT_NAME, OUTPUT_NAMES, TritonHTTPClient,
+                           prepare_triton_request)
+from triton_config import TritonModelSettings, render_config
+
+
+@pytest.fixture(scope="module")
+def onnx_path(tmp_path_factory):
+    X, y = load_iris(return_X_y=True)
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(scaler.transform(X), y)
+    path = tmp_path_factory.mktemp("models") / "iris_model.onnx"
+    path.write_bytes(convert_to_onnx(model, 4, scaler).SerializeToString())
+    return path
+
+
+def test_generated_config_uses_client_names(onnx_path):
+    settings = TritonModelSettings().with_io_from_onnx(onnx_path)
+
+    assert settings.name == DEFAULT_MODEL_NAME
+    assert [t.name for t in settings.inputs] == [INPUT_NAME]
+    assert [t.name for t in settings.outputs] == OUTPUT_NAMES
+    assert f'name: "{DEFAULT_MODEL_NAME}"' in render_config(settings)
+
+
+def test_stub_mirrors_generated_config(onnx_path):
+    settings = TritonModelSettings().with_io_from_onnx(onnx_path)
+    metadata = StubModel().metadata()
+
+    assert metadata["name"] == settings.name
+    assert [t["name"] for t in metadata["inputs"]] == [t.name for t in settings.inputs]
+    assert [t["name"] for t in metadata["outputs"]] == [t.name for t in settings.outputs]
+
+
+def test_local_backend_answers_client_request(onnx_path):
+    response = LocalInferenceBackend(onnx_path).infer_request(
+        prepare_triton_request([[5.1, 3.5, 1.4, 0.2]]))
+    assert [output["name"] for output in response["outputs"]] == OUTPUT_NAMES
+
+
+@pytest.mark.parametrize("binary", [False, True])
+def test_client_round_trip_against_stub(binary):
+    with StubServer() as server, TritonHTTPClient(server.url, binary=binary) as client:
+        assert [t["name"] for t in client.model_metadata()["inputs"]] == [INPUT_NAME]
+        result = client.infer([[5.1, 3.5, 1.4, 0.2], [6.7, 3.0, 5.2, 2.3]])
+
+    assert np.asarray(result["predictions"]).tolist() == [0, 2]
+    assert np.asarray(result["probabilities"]).reshape(2, -1).shape == (2, 3)